@@ -0,0 +1,343 @@
+"""
+Distributed Camera Assignment
+Shares the camera fleet across beCamera replicas with Redis leases
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import redis
+
+from worker_pool import CameraWorkerPool, WorkerPoolFullError, worker_pool
+
+logger = logging.getLogger(__name__)
+
+# Renew / release a lease only if this node still holds it
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class HashRing:
+    """Consistent hash ring with virtual nodes
+
+    Adding or removing a node only moves the cameras that hash next to its
+    points, roughly 1/N of the fleet, instead of reshuffling everything.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 64):
+        self.nodes = sorted(nodes)
+        self.points: List[int] = []
+        self.owners: List[str] = []
+        ring = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        for point, node in ring:
+            self.points.append(point)
+            self.owners.append(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+    def owner(self, key: str, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Node owning key: the first node clockwise from its hash that is
+        not excluded (None if every node is)"""
+        if not self.points:
+            return None
+        exclude = set(exclude)
+        index = bisect.bisect(self.points, self._hash(key))
+        for step in range(len(self.points)):
+            node = self.owners[(index + step) % len(self.points)]
+            if node not in exclude:
+                return node
+        return None
+
+class CameraCluster:
+    """Coordinates which replica runs which camera
+
+    Redis keys (prefix "becamera"):
+    - {prefix}:cameras         hash camera_id -> task spec (the desired fleet)
+    - {prefix}:nodes           zset node_id -> last heartbeat (Redis server time)
+    - {prefix}:lease:{camera}  node_id holding the camera, expires after lease_ttl
+    - {prefix}:failed:{camera} set of nodes whose stream for the camera ended,
+                               expires failure_backoff after the last failure
+
+    Every heartbeat_interval each node refreshes its heartbeat, builds the
+    ring from live nodes, renews leases on cameras it still owns, releases
+    cameras that now hash elsewhere, and claims unleased cameras that hash to
+    it. A dead node stops renewing, its leases expire and the survivors pick
+    its cameras up; a joining node takes over its share once the previous
+    owners release it on their next pass.
+
+    A camera whose stream ended or failed on its node is released and that
+    node is added to the camera's failed set; the camera then belongs to the
+    next node on the ring outside the set, so it fails over to a replica that
+    may still reach it. Once every live node has failed it, it stays idle
+    until the set expires and the first owner retries.
+
+    The lease map is changed by the reconcile thread and by stop_camera, so
+    every change holds self.lock; the blocking methods must be called off
+    the event loop.
+    """
+
+    def __init__(self, pool: CameraWorkerPool, redis_client: redis.Redis, node_id: Optional[str] = None,
+                 lease_ttl: float = 15.0, heartbeat_interval: float = 5.0, replicas: int = 64,
+                 prefix: str = "becamera", failure_backoff: float = 60.0):
+        self.pool = pool
+        self.redis = redis_client
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.replicas = replicas
+        self.failure_backoff = failure_backoff
+        self.prefix = prefix
+        self.cameras_key = f"{prefix}:cameras"
+        self.nodes_key = f"{prefix}:nodes"
+        self.renew_script = self.redis.register_script(RENEW_SCRIPT)
+        self.release_script = self.redis.register_script(RELEASE_SCRIPT)
+
+        # camera_id -> monotonic time the lease was last confirmed
+        self.leases: Dict[int, float] = {}
+        self.lock = threading.RLock()
+        self.live_nodes: List[str] = []
+        self.ring = HashRing([], replicas)
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"claimed": 0, "released": 0, "lost": 0, "failed_over": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, pool: CameraWorkerPool) -> Optional["CameraCluster"]:
+        """Build a cluster coordinator from CLUSTER_* settings, or None when running standalone"""
+        if os.getenv("CLUSTER_ENABLED", "false").lower() != "true":
+            return None
+        client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "localhost"),
+            port=os.getenv("REDIS_PORT", "6379"),
+            password=os.getenv("REDIS_PASSWORD", None),
+            decode_responses=True
+        )
+        return cls(
+            pool,
+            client,
+            node_id=os.getenv("CLUSTER_NODE_ID") or None,
+            lease_ttl=float(os.getenv("CLUSTER_LEASE_TTL", "15")),
+            heartbeat_interval=float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", "5")),
+            failure_backoff=float(os.getenv("CLUSTER_FAILURE_BACKOFF", "60"))
+        )
+
+    def _lease_key(self, camera_id: int) -> str:
+        return f"{self.prefix}:lease:{camera_id}"
+
+    def _failed_key(self, camera_id: int) -> str:
+        return f"{self.prefix}:failed:{camera_id}"
+
+    async def start(self):
+        """Join the cluster and start the reconcile loop"""
+        self.running = True
+        try:
+            await asyncio.to_thread(self.reconcile)
+        except redis.RedisError as e:
+            # Keep going; the loop retries and the node joins once Redis is back
+            logger.error(f"Cluster node {self.node_id} could not join yet: {e}")
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"Cluster node {self.node_id} joined ({len(self.live_nodes)} live nodes)")
+
+    async def stop(self):
+        """Leave the cluster and hand all cameras back immediately"""
+        self.running = False
+        if self.task is not None:
+            self.task.cancel()
+        await asyncio.to_thread(self._leave)
+        logger.info(f"Cluster node {self.node_id} left")
+
+    def start_camera(self, camera_id: int, stream_url: str, priority: int = 0,
+                     target_fps: Optional[float] = None, config: Optional[Dict] = None) -> bool:
+        """Add a camera to the fleet; False if it is already scheduled"""
+        spec = json.dumps({
+            "stream_url": stream_url,
+            "priority": priority,
+            "target_fps": target_fps,
+            "config": config or {}
+        })
+        return bool(self.redis.hsetnx(self.cameras_key, camera_id, spec))
+
+    def stop_camera(self, camera_id: int) -> bool:
+        """Remove a camera from the fleet; its owner stops it on the next pass"""
+        removed = bool(self.redis.hdel(self.cameras_key, camera_id))
+        with self.lock:
+            if camera_id in self.leases:
+                self._drop(camera_id)
+        return removed
+
+    def get_camera_owner(self, camera_id: int) -> Optional[str]:
+        return self.redis.get(self._lease_key(camera_id))
+
+    def get_status(self) -> Dict:
+        # Called on the event loop: copy the lease map without waiting for
+        # a reconcile pass (list() of a dict is atomic in CPython)
+        return {
+            "node_id": self.node_id,
+            "live_nodes": self.live_nodes,
+            "leased_cameras": sorted(list(self.leases)),
+            "lease_ttl": self.lease_ttl,
+            "stats": dict(self.stats)
+        }
+
+    def reconcile(self):
+        """One heartbeat / rebalance pass (blocking; runs off the event loop)"""
+        with self.lock:
+            self._reconcile()
+
+    def _reconcile(self):
+        self.live_nodes = self._heartbeat()
+        self.ring = HashRing(self.live_nodes, self.replicas)
+        desired = {int(camera_id): json.loads(spec)
+                   for camera_id, spec in self.redis.hgetall(self.cameras_key).items()}
+        failed = self._failed_nodes(desired)
+
+        # Release cameras whose stream ended here, so they fail over
+        for camera_id in list(self.leases):
+            task = self.pool.get_task_status(camera_id)
+            if camera_id in desired and (task is None or task["status"] == "completed"):
+                logger.warning(f"Stream of camera {camera_id} ended"
+                               f"{': ' + task['last_error'] if task and task['last_error'] else ''}, handing it over")
+                self._mark_failed(camera_id)
+                failed.setdefault(camera_id, set()).add(self.node_id)
+                self.stats["failed_over"] += 1
+                self._drop(camera_id)
+
+        # Release cameras that were stopped or now hash to another node
+        for camera_id in list(self.leases):
+            if camera_id not in desired or self._owner(camera_id, failed) != self.node_id:
+                self._drop(camera_id)
+
+        # Renew the rest in one round trip
+        owned = list(self.leases)
+        if owned:
+            pipe = self.redis.pipeline(transaction=False)
+            for camera_id in owned:
+                self.renew_script(keys=[self._lease_key(camera_id)],
+                                  args=[self.node_id, int(self.lease_ttl * 1000)], client=pipe)
+            now = time.monotonic()
+            for camera_id, renewed in zip(owned, pipe.execute()):
+                if renewed:
+                    self.leases[camera_id] = now
+                else:
+                    logger.warning(f"Lost lease on camera {camera_id}")
+                    self.stats["lost"] += 1
+                    self._drop(camera_id, release=False)
+
+        # Claim unleased cameras that hash to this node; a lease still held by
+        # the previous owner is left alone until it releases or expires
+        for camera_id, spec in desired.items():
+            if camera_id in self.leases or self._owner(camera_id, failed) != self.node_id:
+                continue
+            if not self.redis.set(self._lease_key(camera_id), self.node_id,
+                                  nx=True, px=int(self.lease_ttl * 1000)):
+                continue
+            try:
+                self.pool.add_camera_task(camera_id, spec["stream_url"], priority=spec.get("priority", 0),
+                                          target_fps=spec.get("target_fps"), config=spec.get("config"))
+            except WorkerPoolFullError as e:
+                logger.warning(f"Cannot take camera {camera_id}: {e}")
+                self.release_script(keys=[self._lease_key(camera_id)], args=[self.node_id])
+                continue
+            self.leases[camera_id] = time.monotonic()
+            self.stats["claimed"] += 1
+            logger.info(f"Claimed camera {camera_id}")
+
+    def _owner(self, camera_id: int, failed: Dict[int, Set[str]]) -> Optional[str]:
+        return self.ring.owner(str(camera_id), exclude=failed.get(camera_id, ()))
+
+    def _failed_nodes(self, cameras: Iterable[int]) -> Dict[int, Set[str]]:
+        """Nodes each camera's stream recently failed on, in one round trip"""
+        cameras = list(cameras)
+        if not cameras:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        for camera_id in cameras:
+            pipe.smembers(self._failed_key(camera_id))
+        return {camera_id: set(nodes) for camera_id, nodes in zip(cameras, pipe.execute()) if nodes}
+
+    def _mark_failed(self, camera_id: int):
+        pipe = self.redis.pipeline()
+        pipe.sadd(self._failed_key(camera_id), self.node_id)
+        pipe.pexpire(self._failed_key(camera_id), int(self.failure_backoff * 1000))
+        pipe.execute()
+
+    def _heartbeat(self) -> List[str]:
+        """Refresh this node's heartbeat and return the live nodes
+
+        Uses the Redis server clock so node clock skew cannot evict a peer.
+        """
+        seconds, micros = self.redis.time()
+        now = seconds + micros / 1e6
+        pipe = self.redis.pipeline()
+        pipe.zadd(self.nodes_key, {self.node_id: now})
+        pipe.zremrangebyscore(self.nodes_key, "-inf", now - self.lease_ttl)
+        pipe.zrange(self.nodes_key, 0, -1)
+        return pipe.execute()[2]
+
+    def _drop(self, camera_id: int, release: bool = True):
+        """Stop a camera locally and (optionally) hand its lease back"""
+        self.pool.remove_camera_task(camera_id)
+        self.leases.pop(camera_id, None)
+        if release:
+            try:
+                self.release_script(keys=[self._lease_key(camera_id)], args=[self.node_id])
+            except redis.RedisError as e:
+                logger.warning(f"Could not release lease on camera {camera_id}: {e}")
+        self.stats["released"] += 1
+        logger.info(f"Released camera {camera_id}")
+
+    def _fence(self):
+        """Redis unreachable: stop cameras whose leases may have expired elsewhere"""
+        with self.lock:
+            now = time.monotonic()
+            for camera_id, confirmed in list(self.leases.items()):
+                if now - confirmed >= self.lease_ttl:
+                    logger.warning(f"Lease on camera {camera_id} unconfirmed for {self.lease_ttl:.0f}s, stopping it")
+                    self.stats["lost"] += 1
+                    self._drop(camera_id, release=False)
+
+    def _leave(self):
+        with self.lock:
+            for camera_id in list(self.leases):
+                self._drop(camera_id)
+        try:
+            self.redis.zrem(self.nodes_key, self.node_id)
+        except redis.RedisError as e:
+            logger.warning(f"Could not deregister node {self.node_id}: {e}")
+
+    async def _run(self):
+        """Reconcile loop"""
+        while self.running:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await asyncio.to_thread(self.reconcile)
+            except redis.RedisError as e:
+                logger.error(f"Cluster reconcile failed: {e}")
+                self.stats["errors"] += 1
+                await asyncio.to_thread(self._fence)
+            except Exception as e:
+                logger.error(f"Cluster reconcile error: {e}")
+                self.stats["errors"] += 1
+
+# Global cluster coordinator (None unless CLUSTER_ENABLED=true)
+camera_cluster = CameraCluster.from_env(worker_pool)
@@ -0,0 +1,238 @@
+"""
+PostgreSQL Connection Pool
+Process-wide asyncpg pool shared by the API handlers, with health checks,
+acquisition wait metrics and prepared statements for the hot queries
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(Exception):
+    """No connection became free within the acquisition timeout"""
+
+class ConnectionPool:
+    """Bounded pool of asyncpg connections for the event loop
+
+    Holds between min_size and max_size connections; acquire() waits up to
+    timeout seconds for one without blocking the loop. A connection idle
+    for more than check_after seconds is pinged with SELECT 1 before it is
+    handed out, and connections older than max_lifetime are replaced.
+    asyncpg resets connections on release and drops the ones that broke.
+
+    asyncpg runs every query as a named prepared statement and keeps the
+    last statement_cache_size of them per connection, so the handlers' hot
+    queries (fixed SQL text with $n parameters) are parsed and planned once
+    per connection rather than on every request.
+    """
+
+    def __init__(self, connect_kwargs: Dict, min_size: int = 2, max_size: int = 10,
+                 timeout: float = 5.0, check_after: float = 30.0, max_lifetime: float = 3600.0,
+                 statement_cache_size: int = 100):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size: min {min_size}, max {max_size}")
+        self.connect_kwargs = connect_kwargs
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_lifetime = max_lifetime
+        self.statement_cache_size = statement_cache_size
+        self.pool: Optional[asyncpg.Pool] = None
+        # Per backend pid: when the connection was opened and last released
+        self.created_at: Dict[int, float] = {}
+        self.released_at: Dict[int, float] = {}
+        # Connections handed out, and acquire() calls waiting on asyncpg
+        self.in_use = 0
+        self.pending = 0
+        self.waiting = 0
+        self.wait_ms: Deque[float] = deque(maxlen=1000)
+        self.stats = {
+            "acquired": 0,
+            "waited": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "failed_checks": 0,
+            "connect_errors": 0
+        }
+
+    @classmethod
+    def from_env(cls) -> "ConnectionPool":
+        """Build the pool from DB_* settings"""
+        return cls({
+                       "host": os.getenv("DB_HOST", "localhost"),
+                       "port": int(os.getenv("DB_PORT", "5432")),
+                       "database": os.getenv("DB_NAME", "people_counting_db"),
+                       "user": os.getenv("DB_USER", "postgres"),
+                       "password": os.getenv("DB_PASSWORD", "dev_password"),
+                       "timeout": float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+                   },
+                   min_size=int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                   max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                   timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+                   check_after=float(os.getenv("DB_POOL_CHECK_AFTER", "30")),
+                   max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+                   statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")))
+
+    @property
+    def closed(self) -> bool:
+        return self.pool is None
+
+    async def open(self):
+        """Open min_size connections; if the database is down, start empty
+        and connect on first use instead of failing startup"""
+        kwargs = dict(self.connect_kwargs, max_size=self.max_size, init=self._init,
+                      statement_cache_size=self.statement_cache_size)
+        try:
+            self.pool = await asyncpg.create_pool(min_size=self.min_size, **kwargs)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+            logger.error(f"Database pool could not connect at startup: {e}")
+            self.stats["connect_errors"] += 1
+            self.pool = await asyncpg.create_pool(min_size=0, **kwargs)
+        logger.info(f"Database pool opened ({self.pool.get_size()} connections, "
+                    f"min {self.min_size}, max {self.max_size})")
+
+    async def close(self, timeout: float = 10.0):
+        """Close the pool, waiting up to timeout seconds for connections in use"""
+        pool, self.pool = self.pool, None
+        if pool is None:
+            return
+        try:
+            await asyncio.wait_for(pool.close(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Database pool close timed out, terminating connections")
+            pool.terminate()
+
+    async def acquire(self, timeout: Optional[float] = None) -> asyncpg.Connection:
+        """Borrow a healthy connection, waiting up to timeout seconds for one
+
+        Raises PoolTimeoutError when the pool stays exhausted (or is closed)
+        and OSError / asyncpg errors when a new connection cannot be opened.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        while True:
+            pool = self.pool
+            if pool is None:
+                raise PoolTimeoutError("Database pool is closed")
+            busy = self.in_use + self.pending >= self.max_size
+            waited = waited or busy
+            remaining = max(deadline - time.monotonic(), 0.0)
+            self.pending += 1
+            if busy:
+                self.waiting += 1
+            try:
+                conn = await pool.acquire(timeout=remaining)
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                raise PoolTimeoutError(
+                    f"No database connection free within {timeout:.1f}s "
+                    f"({self.in_use} in use, max {self.max_size})")
+            except (OSError, asyncpg.PostgresError):
+                self.stats["connect_errors"] += 1
+                raise
+            finally:
+                self.pending -= 1
+                if busy:
+                    self.waiting -= 1
+            if await self._check(conn):
+                break
+
+        self.in_use += 1
+        self.stats["acquired"] += 1
+        if waited:
+            self.stats["waited"] += 1
+        self.wait_ms.append((time.monotonic() - started) * 1000)
+        return conn
+
+    async def release(self, conn: asyncpg.Connection):
+        """Return a connection to the pool (asyncpg discards it if it broke)"""
+        pool = self.pool
+        self.in_use -= 1
+        if not conn.is_closed():
+            self.released_at[conn.get_server_pid()] = time.monotonic()
+        if pool is not None:
+            await pool.release(conn)
+        else:
+            # The pool was closed while this connection was out
+            await conn.close()
+
+    @asynccontextmanager
+    async def connection(self, timeout: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+        """Borrow a connection for an async with block"""
+        conn = await self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    def get_status(self) -> Dict:
+        """Pool occupancy, counters and acquisition wait percentiles"""
+        pool = self.pool
+        waits = sorted(self.wait_ms)
+        return {
+            "size": pool.get_size() if pool is not None else 0,
+            "idle": pool.get_idle_size() if pool is not None else 0,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "timeout_s": self.timeout,
+            "statement_cache_size": self.statement_cache_size,
+            "stats": dict(self.stats),
+            "wait_ms": {
+                "p50": round(waits[len(waits) // 2], 2) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                "max": round(waits[-1], 2) if waits else 0.0
+            }
+        }
+
+    async def _init(self, conn: asyncpg.Connection):
+        """Set up a newly opened connection: decode json/jsonb columns to
+        Python objects like psycopg2 did, and track it until it closes"""
+        for json_type in ("json", "jsonb"):
+            await conn.set_type_codec(json_type, encoder=json.dumps, decoder=json.loads,
+                                      schema="pg_catalog")
+        pid = conn.get_server_pid()
+        self.created_at[pid] = time.monotonic()
+        self.stats["created"] += 1
+        conn.add_termination_listener(lambda _: self._forget(pid))
+
+    async def _check(self, conn: asyncpg.Connection) -> bool:
+        """Validate a borrowed connection; False (and the connection dropped) if it had to go"""
+        now = time.monotonic()
+        pid = conn.get_server_pid()
+        healthy = now - self.created_at.get(pid, now) < self.max_lifetime
+        if healthy and now - self.released_at.get(pid, now) > self.check_after:
+            try:
+                await conn.execute("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning(f"Dropping broken database connection: {e}")
+                self.stats["failed_checks"] += 1
+                healthy = False
+        if healthy:
+            return True
+        # Terminating hands the slot back to the pool, which reconnects lazily
+        conn.terminate()
+        return False
+
+    def _forget(self, pid: int):
+        """Termination listener: drop the bookkeeping of a closed connection"""
+        if self.created_at.pop(pid, None) is not None:
+            self.stats["discarded"] += 1
+        self.released_at.pop(pid, None)
+
+# Global pool shared by every API handler of this process (opened on startup)
+db_pool = ConnectionPool.from_env()
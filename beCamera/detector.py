@@ -0,0 +1,208 @@
+"""
+Pluggable Person Detectors
+Loads each detection model once per process, warms it up at startup and
+shares it between every worker (thread) of that process
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_BACKENDS = ("opencv", "onnxruntime")
+# fp32: the model as trained; int8: a quantized ONNX model run by ONNX Runtime
+PRECISIONS = ("fp32", "int8")
+
+class Detector:
+    """SSD-style person detector over a batch of BGR frames
+
+    Subclasses implement forward(blob) and return the raw detection rows
+    [image_id, class_id, confidence, x1, y1, x2, y2] (relative coordinates),
+    the layout of the SSD DetectionOutput layer.
+    """
+
+    backend = ""
+
+    def __init__(self, model_path: str, input_size: Tuple[int, int] = (300, 300),
+                 scale: float = 0.007843, mean: float = 127.5, confidence: float = 0.4,
+                 person_class_id: int = 15, precision: str = "fp32"):
+        self.model_path = model_path
+        self.input_size = input_size
+        self.scale = scale
+        self.mean = mean
+        self.confidence = confidence
+        self.person_class_id = person_class_id
+        self.precision = precision
+        self.warmed_up = False
+        self.load_ms = 0.0
+        self.warm_up_ms = 0.0
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[Dict]:
+        """Run one forward pass over a list of frames and split detections per frame"""
+        blob = cv2.dnn.blobFromImages(frames, self.scale, self.input_size, self.mean)
+        rows = self.forward(blob).reshape(-1, 7)
+        keep = (rows[:, 2] > self.confidence) & (rows[:, 1].astype(np.int32) == self.person_class_id)
+        rows = rows[keep]
+        image_ids = rows[:, 0].astype(np.int32)
+
+        results = []
+        for index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            mine = rows[image_ids == index]
+            boxes = (mine[:, 3:7] * np.array([width, height, width, height], dtype=np.float32)).astype(np.int32)
+            results.append({
+                "people_count": int(len(boxes)),
+                "boxes": boxes,
+                "confidences": mine[:, 2].copy()
+            })
+        return results
+
+    def detect(self, frame: np.ndarray) -> Dict:
+        """Detect people in a single frame"""
+        return self.detect_batch([frame])[0]
+
+    def warm_up(self, runs: int = 2):
+        """Run dummy inference so the first real frame does not pay for
+        lazy allocation and kernel selection"""
+        if self.warmed_up:
+            return
+        start = time.perf_counter()
+        dummy = np.zeros((self.input_size[1], self.input_size[0], 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.detect(dummy)
+        self.warm_up_ms = (time.perf_counter() - start) * 1000
+        self.warmed_up = True
+        logger.info(f"Warmed up {self.backend} detector in {self.warm_up_ms:.0f}ms")
+
+    def get_info(self) -> Dict:
+        """Get backend, model and load/warm-up timings"""
+        return {
+            "backend": self.backend,
+            "precision": self.precision,
+            "model_path": self.model_path,
+            "input_size": list(self.input_size),
+            "warmed_up": self.warmed_up,
+            "load_ms": round(self.load_ms, 1),
+            "warm_up_ms": round(self.warm_up_ms, 1)
+        }
+
+class OpenCVDetector(Detector):
+    """cv2.dnn backend (Caffe, TensorFlow, ONNX, ... models readNet can load)"""
+
+    backend = "opencv"
+
+    def __init__(self, model_path: str, config_path: str = "", **kwargs):
+        super().__init__(model_path, **kwargs)
+        start = time.perf_counter()
+        self.net = cv2.dnn.readNet(model_path, config_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.load_ms = (time.perf_counter() - start) * 1000
+        # A cv2.dnn.Net keeps per-call state (setInput/forward), so calls
+        # from several threads must not interleave
+        self.lock = threading.Lock()
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        with self.lock:
+            self.net.setInput(blob)
+            return self.net.forward()
+
+class OnnxRuntimeDetector(Detector):
+    """ONNX Runtime CPU backend; the model's first output must hold
+    DetectionOutput-style rows"""
+
+    backend = "onnxruntime"
+
+    def __init__(self, model_path: str, threads: int = 0, **kwargs):
+        if onnxruntime is None:
+            raise RuntimeError("onnxruntime is not installed")
+        super().__init__(model_path, **kwargs)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        start = time.perf_counter()
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.load_ms = (time.perf_counter() - start) * 1000
+        self.input_name = self.session.get_inputs()[0].name
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        # InferenceSession.run is thread-safe, no lock needed
+        return self.session.run(None, {self.input_name: blob})[0]
+
+def create_detector(backend: str, model_path: str, config_path: str = "", **kwargs) -> Detector:
+    """Load a new detector instance (not cached)"""
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Invalid detector backend: {backend}")
+    if backend == "onnxruntime":
+        detector = OnnxRuntimeDetector(model_path, **kwargs)
+    else:
+        detector = OpenCVDetector(model_path, config_path, **kwargs)
+    logger.info(f"Loaded {backend} detector {model_path} in {detector.load_ms:.0f}ms")
+    return detector
+
+# One instance per (backend, model) per process, shared by every worker
+_detectors: Dict[tuple, Detector] = {}
+_detectors_lock = threading.Lock()
+_defaults: Dict[str, Optional[Detector]] = {}
+
+def get_detector(backend: str, model_path: str, config_path: str = "", **kwargs) -> Detector:
+    """Get the process-wide detector for a model, loading it on first use"""
+    key = (backend, os.path.abspath(model_path), config_path)
+    with _detectors_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = create_detector(backend, model_path, config_path, **kwargs)
+            _detectors[key] = detector
+        return detector
+
+def detector_from_env(precision: str = "fp32") -> Optional[Detector]:
+    """Get the detector configured by AI_* environment settings, or None if no model is configured
+
+    The int8 detector is the quantized model at AI_MODEL_INT8_PATH and always
+    runs on ONNX Runtime.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Invalid precision: {precision}")
+    model_path = os.getenv("AI_MODEL_INT8_PATH" if precision == "int8" else "AI_MODEL_PATH")
+    if not model_path or not os.path.exists(model_path):
+        return None
+    width, height = (int(v) for v in os.getenv("AI_INPUT_SIZE", "300x300").lower().split("x"))
+    kwargs = {
+        "input_size": (width, height),
+        "confidence": float(os.getenv("AI_CONFIDENCE_THRESHOLD", "0.4")),
+        "person_class_id": int(os.getenv("AI_PERSON_CLASS_ID", "15")),
+        "precision": precision
+    }
+    backend = "onnxruntime" if precision == "int8" else os.getenv("AI_DETECTOR_BACKEND", "opencv")
+    if backend == "onnxruntime":
+        kwargs["threads"] = int(os.getenv("AI_ONNX_THREADS", "0"))
+    config_path = "" if precision == "int8" else os.getenv("AI_MODEL_CONFIG", "")
+    return get_detector(backend, model_path, config_path, **kwargs)
+
+def default_detector(precision: str = "fp32") -> Optional[Detector]:
+    """Get this process's environment-configured detector (resolved once per precision)"""
+    if precision not in _defaults:
+        _defaults[precision] = detector_from_env(precision)
+    return _defaults[precision]
+
+def warm_up_default_detectors():
+    """Load and warm up every configured default detector (blocking)"""
+    for precision in PRECISIONS:
+        detector = default_detector(precision)
+        if detector is not None:
+            detector.warm_up()
@@ -0,0 +1,233 @@
+"""
+Latest-Frame Grabber
+Keeps a camera stream drained with grab() and decodes only the frames that get analyzed
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from reconnect import ReconnectPolicy
+
+logger = logging.getLogger(__name__)
+
+# Used when the backend does not report a usable stream rate (common for RTSP)
+DEFAULT_SOURCE_FPS = 25.0
+MAX_SOURCE_FPS = 120.0
+
+def is_live_source(source: str) -> bool:
+    """Network streams and device indexes reconnect; files simply end"""
+    return "://" in source or source.isdigit()
+
+class FrameGrabber:
+    """Background grab loop for one cv2.VideoCapture
+
+    The grab thread calls cap.grab() at stream rate so the backend buffer never
+    fills up and frames never lag behind real time. grab() only demuxes; the
+    expensive retrieve() (decode) runs only when the scheduler has requested a
+    frame, and the decoded frame is parked until read() picks it up.
+
+    When a reconnect policy is given, a failed grab reopens the capture on the
+    grab thread with jittered backoff behind a circuit breaker. The worker
+    keeps its stream state (rate controller, motion gate, counters) and just
+    sees no frames while `connected` is False.
+
+    Counters:
+    - grabbed: frames pulled off the stream
+    - decoded: frames actually retrieved
+    - dropped: frames grabbed but never decoded
+    - stale: read() calls that found no fresh frame (stream stalled or late)
+    """
+
+    def __init__(self, source: str, name: Optional[str] = None,
+                 reconnect: Optional[ReconnectPolicy] = None):
+        self.source = source
+        self.name = name or source
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.source_fps = DEFAULT_SOURCE_FPS
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.running = False
+        self.connected = False
+        self.ended = False
+
+        self.backoff = reconnect.backoff() if reconnect else None
+        self.breaker = reconnect.breaker() if reconnect else None
+        self.reconnects = 0
+        self.disconnected_at: Optional[float] = None
+
+        self.request_at: Optional[float] = None
+        self.frame: Optional[np.ndarray] = None
+        self.last_grab_time: Optional[float] = None
+
+        self.grabbed = 0
+        self.decoded = 0
+        self.stale = 0
+
+    @property
+    def frame_interval(self) -> float:
+        return 1.0 / self.source_fps
+
+    def open(self) -> bool:
+        """Open the stream and start the grab thread
+
+        False if the stream cannot be opened and there is no reconnect policy;
+        with one, the first failure is retried in the background.
+        """
+        if not self._connect():
+            if self.breaker is None:
+                return False
+            self.disconnected_at = time.monotonic()
+            self._record_failure()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"grabber-{self.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def release(self, timeout: float = 2.0):
+        """Stop the grab thread; the capture is released by the thread itself"""
+        self.running = False
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                logger.warning(f"Grabber {self.name} still blocked in grab(), leaving it to exit")
+
+    def request(self, at: Optional[float] = None):
+        """Decode the first frame grabbed at or after monotonic time `at` (default: now)"""
+        self.request_at = time.monotonic() if at is None else at
+
+    def read(self) -> Optional[np.ndarray]:
+        """Take the most recently decoded frame, or None if none arrived since the last read"""
+        with self.lock:
+            frame = self.frame
+            self.frame = None
+        if frame is None:
+            self.stale += 1
+        return frame
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        return {
+            "connected": self.connected,
+            "source_fps": round(self.source_fps, 2),
+            "grabbed": self.grabbed,
+            "decoded": self.decoded,
+            "dropped": self.grabbed - self.decoded,
+            "stale": self.stale,
+            "decode_ratio": round(self.decoded / self.grabbed, 4) if self.grabbed else 0.0,
+            "last_grab_age": round(now - self.last_grab_time, 3) if self.last_grab_time else None,
+            "reconnects": self.reconnects,
+            "disconnected_seconds": round(now - self.disconnected_at, 1)
+            if self.disconnected_at is not None else None,
+            "circuit": self.breaker.snapshot() if self.breaker else None,
+            "ended": self.ended
+        }
+
+    def _connect(self) -> bool:
+        """Open a fresh capture; True on success"""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if 0 < fps <= MAX_SOURCE_FPS:
+            self.source_fps = fps
+        self.cap = cap
+        self.connected = True
+        return True
+
+    def _disconnect(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.connected:
+            self.disconnected_at = time.monotonic()
+        self.connected = False
+
+    def _reconnect(self) -> bool:
+        """Reopen the stream with backoff behind the circuit breaker; False once stopped"""
+        while self.running:
+            self.stopped.wait(self.backoff.next_delay())
+            if not self.running:
+                break
+            if not self.breaker.allow():
+                self.stopped.wait(self.breaker.remaining())
+                continue
+            if self._connect():
+                logger.info(f"Grabber {self.name} reconnected")
+                self.reconnects += 1
+                return True
+            self._record_failure()
+        return False
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            logger.warning(f"Grabber {self.name}: circuit open after {self.breaker.failures} "
+                           f"failed attempts, next try in {self.breaker.cooldown:.0f}s")
+
+    def _grab_loop(self):
+        """Drain the connected stream at its own rate, decode on request; returns when grab fails"""
+        next_grab = time.monotonic()
+        healthy = False
+        while self.running:
+            # Files and other non-blocking sources would be drained instantly;
+            # pace them at the stream rate. Live streams block in grab() and
+            # are always behind schedule, so they never sleep here.
+            now = time.monotonic()
+            if next_grab > now:
+                time.sleep(next_grab - now)
+            next_grab = max(next_grab, now) + self.frame_interval
+
+            if not self.cap.grab():
+                if not healthy and self.breaker is not None:
+                    # Opened but never delivered a frame: still a failed attempt
+                    self._record_failure()
+                return
+            self.grabbed += 1
+            self.last_grab_time = time.monotonic()
+            if not healthy:
+                # Only a stream that delivers frames counts as recovered
+                healthy = True
+                self.disconnected_at = None
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                    self.backoff.reset()
+
+            request_at = self.request_at
+            if request_at is None or self.last_grab_time < request_at:
+                continue
+            if self.request_at == request_at:
+                self.request_at = None
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                continue
+            self.decoded += 1
+            with self.lock:
+                self.frame = frame
+
+    def _run(self):
+        """Grab thread: grab until the stream fails, then reconnect or end"""
+        try:
+            while self.running:
+                # The initial open may have failed, or the last connection dropped
+                if self.cap is None and not self._reconnect():
+                    break
+                self._grab_loop()
+                self._disconnect()
+                if self.breaker is None:
+                    break
+                if self.running:
+                    logger.warning(f"Grabber {self.name} lost its stream, reconnecting")
+        except Exception as e:
+            logger.error(f"Grabber {self.name} failed: {e}")
+        finally:
+            self.running = False
+            self.ended = True
+            self._disconnect()
@@ -0,0 +1,171 @@
+"""
+Batched DNN Inference for Camera Streams
+Collects frames from many cameras into one blobFromImages batch per forward pass
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from detector import Detector, default_detector
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class InferenceRequest:
+    """A single frame waiting to be batched"""
+    camera_id: int
+    frame: np.ndarray
+    # The camera's own model; None uses the engine's detector
+    detector: Optional[Detector] = None
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+class BatchInferenceEngine:
+    """Cross-camera batching for SSD-style detectors (e.g. MobileNet-SSD)
+
+    Worker threads submit frames and get a Future back. A single inference
+    thread waits for the first request, then keeps collecting until either
+    max_batch_size frames are queued or max_wait seconds have passed, runs one
+    forward pass over the whole batch (one per model when cameras use different
+    models) and scatters detections back per frame.
+    """
+
+    def __init__(self, detector: Detector, max_batch_size: int = 8, max_wait: float = 0.01):
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests: "queue.Queue[Optional[InferenceRequest]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.running = False
+        self.stats = {"batches": 0, "frames": 0, "total_forward_ms": 0.0, "total_wait_ms": 0.0}
+
+    @classmethod
+    def from_env(cls) -> Optional["BatchInferenceEngine"]:
+        """Build an engine from AI_* environment settings, or None if no model is configured"""
+        detector = default_detector()
+        if detector is None:
+            return None
+        return cls(
+            detector,
+            max_batch_size=int(os.getenv("AI_BATCH_SIZE", "8")),
+            max_wait=int(os.getenv("AI_BATCH_MAX_WAIT_MS", "10")) / 1000.0
+        )
+
+    def start(self):
+        """Warm up the detector, then start the inference thread"""
+        if self.running:
+            return
+        self.detector.warm_up()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="batch_inference", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the inference thread; pending requests are cancelled"""
+        if not self.running:
+            return
+        self.running = False
+        self.requests.put(None)
+        if self.thread is not None:
+            self.thread.join(timeout)
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.cancel()
+
+    def submit(self, camera_id: int, frame: np.ndarray, detector: Optional[Detector] = None) -> Future:
+        """Queue a frame for detection; the Future resolves to a detections dict"""
+        request = InferenceRequest(camera_id=camera_id, frame=frame, detector=detector)
+        self.requests.put(request)
+        return request.future
+
+    def get_stats(self) -> Dict:
+        """Get batching and latency metrics"""
+        batches = self.stats["batches"]
+        frames = self.stats["frames"]
+        return {
+            "batches": batches,
+            "frames": frames,
+            "avg_batch_size": round(frames / batches, 2) if batches else 0.0,
+            "avg_forward_ms": round(self.stats["total_forward_ms"] / batches, 2) if batches else 0.0,
+            "avg_queue_wait_ms": round(self.stats["total_wait_ms"] / frames, 2) if frames else 0.0,
+            "queue_depth": self.requests.qsize(),
+            "detector": self.detector.get_info()
+        }
+
+    def _collect_batch(self) -> List[InferenceRequest]:
+        """Block for the first request, then gather more until full or max_wait passes"""
+        first = self.requests.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutdown sentinel: finish this batch, then exit
+                self.running = False
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        """Inference thread main loop"""
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            # Queue wait ends when the batch is collected; the forward pass
+            # is timed separately by infer_batch
+            collected = time.monotonic()
+            try:
+                results = self.infer_batch([request.frame for request in batch],
+                                           [request.detector for request in batch])
+            except Exception as e:
+                logger.error(f"Batch inference failed ({len(batch)} frames): {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            self.stats["total_wait_ms"] += sum((collected - request.submitted_at) * 1000 for request in batch)
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def infer_batch(self, frames: List[np.ndarray],
+                    detectors: Optional[List[Optional[Detector]]] = None) -> List[Dict]:
+        """Run one forward pass per model over a list of frames and split detections per frame"""
+        # Frames of cameras on different models cannot share a forward pass
+        groups: Dict[int, tuple] = {}
+        for index, detector in enumerate(detectors or [None] * len(frames)):
+            detector = detector or self.detector
+            groups.setdefault(id(detector), (detector, []))[1].append(index)
+
+        results: List[Optional[Dict]] = [None] * len(frames)
+        for detector, indices in groups.values():
+            start = time.perf_counter()
+            for index, result in zip(indices, detector.detect_batch([frames[i] for i in indices])):
+                results[index] = result
+            self.stats["total_forward_ms"] += (time.perf_counter() - start) * 1000
+            self.stats["batches"] += 1
+        self.stats["frames"] += len(frames)
+        return results
@@ -3,15 +3,20 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import JSONResponse
 import uvicorn
+import asyncio
 import os
 # Remove load_dotenv() to use container environment variables
-import psycopg2
-import redis
+import asyncpg
+import redis.asyncio as redis
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime
 import httpx
 from typing import Optional
-from worker_pool import worker_pool
+from db_pool import db_pool, PoolTimeoutError
+from worker_pool import worker_pool, WorkerPoolFullError
+from cluster import camera_cluster
+from zones import unusable_zones
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -38,7 +43,8 @@ async def auth_exception_handler(request: Request, exc: HTTPException):
         )
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=getattr(exc, "headers", None)
     )
 
 # Initialize FastAPI app
@@ -66,14 +72,22 @@ security = HTTPBearer()
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
-    """Startup event - initialize worker pool"""
+    """Startup event - open the database pool and initialize worker pool"""
+    await db_pool.open()
     await worker_pool.start()
+    if camera_cluster is not None:
+        await camera_cluster.start()
     logger.info("Application started - worker pool initialized")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown event - cleanup worker pool"""
+    if camera_cluster is not None:
+        # Hand cameras back so the other replicas take over right away
+        await camera_cluster.stop()
     await worker_pool.stop()
+    await db_pool.close()
+    await redis_client.aclose()
     logger.info("Application shutdown - worker pool stopped")
 
 # Utility functions
@@ -157,33 +171,43 @@ async def get_current_user(token_data: dict = Depends(verify_token)):
     return token_data
 
 # Database connection
-def get_db_connection():
-    """Get PostgreSQL database connection using shared resources"""
+@asynccontextmanager
+async def db_connection():
+    """Borrow a PostgreSQL connection from the process-wide pool for an async with block
+    
+    Waiting for a connection and running queries yield to the event loop, so
+    a slow query only holds up its own request. Statements run in autocommit
+    unless wrapped in conn.transaction().
+    """
     try:
-        connection = psycopg2.connect(
-            host=os.getenv("DB_HOST", "localhost"),
-            port=os.getenv("DB_PORT", "5432"),
-            database=os.getenv("DB_NAME", "people_counting_db"),
-            user=os.getenv("DB_USER", "postgres"),
-            password=os.getenv("DB_PASSWORD", "dev_password")
-        )
-        return connection
+        conn = await db_pool.acquire()
+    except PoolTimeoutError as e:
+        logger.error(f"Database pool exhausted: {e}")
+        raise HTTPException(status_code=503, detail="Database busy, try again later",
+                            headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         raise HTTPException(status_code=500, detail="Database connection failed")
+    try:
+        yield conn
+    finally:
+        await db_pool.release(conn)
 
-# Redis connection
-def get_redis_connection():
-    """Get Redis connection using shared resources"""
+# Redis connection (redis-py pools its connections inside the client, so
+# one client is shared by every request)
+redis_client = redis.Redis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=os.getenv("REDIS_PORT", "6379"),
+    password=os.getenv("REDIS_PASSWORD", None),
+    decode_responses=True,
+    socket_connect_timeout=5,
+    health_check_interval=30
+)
+
+async def get_redis_connection():
+    """Get the shared Redis client after checking it responds"""
     try:
-        redis_client = redis.Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=os.getenv("REDIS_PORT", "6379"),
-            password=os.getenv("REDIS_PASSWORD", None),
-            decode_responses=True
-        )
-        # Test connection
-        redis_client.ping()
+        await redis_client.ping()
         return redis_client
     except Exception as e:
         logger.error(f"Redis connection error: {e}")
@@ -194,13 +218,12 @@ def get_redis_connection():
 async def health_check():
     """Health check endpoint"""
     try:
-        # Test database connection
-        db_conn = get_db_connection()
-        db_conn.close()
+        # Test database connection (a pooled connection, not a new one)
+        async with db_connection() as conn:
+            await conn.fetchval("SELECT 1")
         
         # Test Redis connection
-        redis_conn = get_redis_connection()
-        redis_conn.ping()
+        await get_redis_connection()
         
         return {
             "status": "healthy",
@@ -228,17 +251,15 @@ async def root():
 async def test_get_cameras():
     """Test endpoint - Get all cameras without authentication"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, name, description, ip_address, rtsp_url, status, created_at 
-            FROM cameras 
-            ORDER BY created_at DESC
-        """)
+        async with db_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, name, description, ip_address, rtsp_url, status, created_at 
+                FROM cameras 
+                ORDER BY created_at DESC
+            """)
         
         cameras = []
-        for row in cursor.fetchall():
+        for row in rows:
             cameras.append({
                 "id": row[0],
                 "name": row[1],
@@ -249,14 +270,13 @@ async def test_get_cameras():
                 "created_at": row[6].isoformat() if row[6] else None
             })
         
-        cursor.close()
-        conn.close()
-        
         return {
             "success": True,
             "data": cameras,
             "count": len(cameras)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting cameras: {e}")
         raise HTTPException(status_code=500, detail="Failed to get cameras")
@@ -273,7 +293,8 @@ async def test_get_worker_pool_status():
                 "workers": worker_status,
                 "total_workers": len(worker_status),
                 "idle_workers": len([w for w in worker_status if w["status"] == "idle"]),
-                "busy_workers": len([w for w in worker_status if w["status"] == "busy"])
+                "busy_workers": len([w for w in worker_status if w["status"] == "busy"]),
+                "queue": worker_pool.get_queue_status()
             }
         }
         
@@ -463,17 +484,15 @@ async def set_rate_limit(config: RateLimitConfig, current_user: dict = Depends(g
 async def get_cameras(request: Request, current_user: dict = Depends(get_current_user)):
     """Get all cameras"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, name, description, ip_address, rtsp_url, status, created_at 
-            FROM cameras 
-            ORDER BY created_at DESC
-        """)
+        async with db_connection() as conn:
+            rows = await conn.fetch("""
+                SELECT id, name, description, ip_address, rtsp_url, status, created_at 
+                FROM cameras 
+                ORDER BY created_at DESC
+            """)
         
         cameras = []
-        for row in cursor.fetchall():
+        for row in rows:
             cameras.append({
                 "id": row[0],
                 "name": row[1],
@@ -484,14 +503,13 @@ async def get_cameras(request: Request, current_user: dict = Depends(get_current
                 "created_at": row[6].isoformat() if row[6] else None
             })
         
-        cursor.close()
-        conn.close()
-        
         return {
             "success": True,
             "data": cameras,
             "count": len(cameras)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting cameras: {e}")
         raise HTTPException(status_code=500, detail="Failed to get cameras")
@@ -514,18 +532,12 @@ async def get_camera(request: Request, camera_id: int, current_user: dict = Depe
         # Validate camera_id
         camera_id = validate_camera_id(camera_id)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, name, description, ip_address, rtsp_url, status, created_at 
-            FROM cameras 
-            WHERE id = %s
-        """, (camera_id,))
-        
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT id, name, description, ip_address, rtsp_url, status, created_at 
+                FROM cameras 
+                WHERE id = $1
+            """, camera_id)
         
         if not row:
             raise HTTPException(status_code=404, detail="Camera not found")
@@ -596,25 +608,18 @@ async def create_camera(request: Request, camera_data: dict, current_user: dict
         if status not in ["active", "offline", "maintenance", "error"]:
             raise HTTPException(status_code=400, detail="Invalid status value")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO cameras (name, description, ip_address, rtsp_url, status)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id, name, description, ip_address, rtsp_url, status, created_at
-        """, (
-            name,
-            camera_data.get("description"),
-            ip_address,
-            rtsp_url,
-            status
-        ))
-        
-        row = cursor.fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn:
+            row = await conn.fetchrow("""
+                INSERT INTO cameras (name, description, ip_address, rtsp_url, status)
+                VALUES ($1, $2, $3, $4, $5)
+                RETURNING id, name, description, ip_address, rtsp_url, status, created_at
+            """,
+                name,
+                camera_data.get("description"),
+                ip_address,
+                rtsp_url,
+                status
+            )
         
         return {
             "success": True,
@@ -631,27 +636,17 @@ async def create_camera(request: Request, camera_data: dict, current_user: dict
         }
     except HTTPException:
         raise
-    except psycopg2.IntegrityError as e:
+    except asyncpg.IntegrityConstraintViolationError as e:
         logger.error(f"Database integrity error creating camera: {e}")
-        conn.rollback()
-        cursor.close()
-        conn.close()
         if "duplicate key" in str(e).lower():
             raise HTTPException(status_code=409, detail="Camera with this name already exists")
         else:
             raise HTTPException(status_code=400, detail="Invalid data provided")
-    except psycopg2.Error as e:
+    except asyncpg.PostgresError as e:
         logger.error(f"Database error creating camera: {e}")
-        conn.rollback()
-        cursor.close()
-        conn.close()
         raise HTTPException(status_code=500, detail="Database error occurred")
     except Exception as e:
         logger.error(f"Error creating camera: {e}")
-        if 'conn' in locals() and conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise HTTPException(status_code=500, detail="Failed to create camera")
 
 @app.put("/api/v1/cameras/{camera_id}")
@@ -678,64 +673,52 @@ async def update_camera(request: Request, camera_id: int, camera_data: dict, cur
         if status and status not in ["active", "offline", "maintenance", "error"]:
             raise HTTPException(status_code=400, detail="Invalid status value")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if camera exists
-        cursor.execute("SELECT id FROM cameras WHERE id = %s", (camera_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            conn.close()
-            raise HTTPException(status_code=404, detail="Camera not found")
-        
-        # Build update query dynamically based on provided fields
-        update_fields = []
-        update_values = []
-        
-        if "name" in camera_data:
-            update_fields.append("name = %s")
-            update_values.append(camera_data["name"])
-        
-        if "description" in camera_data:
-            update_fields.append("description = %s")
-            update_values.append(camera_data["description"])
-        
-        if "ip_address" in camera_data:
-            update_fields.append("ip_address = %s")
-            update_values.append(camera_data["ip_address"])
-        
-        if "rtsp_url" in camera_data:
-            update_fields.append("rtsp_url = %s")
-            update_values.append(camera_data["rtsp_url"])
-        
-        if "status" in camera_data:
-            update_fields.append("status = %s")
-            update_values.append(camera_data["status"])
-        
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No valid fields to update")
-        
-        # Add camera_id to values
-        update_values.append(camera_id)
-        
-        query = f"""
-            UPDATE cameras 
-            SET {', '.join(update_fields)}
-            WHERE id = %s
-            RETURNING id, name, description, ip_address, rtsp_url, status, created_at
-        """
-        
-        cursor.execute(query, update_values)
-        row = cursor.fetchone()
-        
-        if not row:
-            cursor.close()
-            conn.close()
-            raise HTTPException(status_code=500, detail="Failed to update camera")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn, conn.transaction():
+            # Check if camera exists
+            if not await conn.fetchval("SELECT id FROM cameras WHERE id = $1", camera_id):
+                raise HTTPException(status_code=404, detail="Camera not found")
+            
+            # Build update query dynamically based on provided fields
+            update_fields = []
+            update_values = []
+            
+            if "name" in camera_data:
+                update_values.append(camera_data["name"])
+                update_fields.append(f"name = ${len(update_values)}")
+            
+            if "description" in camera_data:
+                update_values.append(camera_data["description"])
+                update_fields.append(f"description = ${len(update_values)}")
+            
+            if "ip_address" in camera_data:
+                update_values.append(camera_data["ip_address"])
+                update_fields.append(f"ip_address = ${len(update_values)}")
+            
+            if "rtsp_url" in camera_data:
+                update_values.append(camera_data["rtsp_url"])
+                update_fields.append(f"rtsp_url = ${len(update_values)}")
+            
+            if "status" in camera_data:
+                update_values.append(camera_data["status"])
+                update_fields.append(f"status = ${len(update_values)}")
+            
+            if not update_fields:
+                raise HTTPException(status_code=400, detail="No valid fields to update")
+            
+            # Add camera_id to values
+            update_values.append(camera_id)
+            
+            query = f"""
+                UPDATE cameras 
+                SET {', '.join(update_fields)}
+                WHERE id = ${len(update_values)}
+                RETURNING id, name, description, ip_address, rtsp_url, status, created_at
+            """
+            
+            row = await conn.fetchrow(query, *update_values)
+            
+            if not row:
+                raise HTTPException(status_code=500, detail="Failed to update camera")
         
         return {
             "success": True,
@@ -752,18 +735,11 @@ async def update_camera(request: Request, camera_id: int, camera_data: dict, cur
         }
     except HTTPException:
         raise
-    except psycopg2.Error as e:
+    except asyncpg.PostgresError as e:
         logger.error(f"Database error updating camera {camera_id}: {e}")
-        conn.rollback()
-        cursor.close()
-        conn.close()
         raise HTTPException(status_code=500, detail="Database error occurred")
     except Exception as e:
         logger.error(f"Error updating camera {camera_id}: {e}")
-        if 'conn' in locals() and conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise HTTPException(status_code=500, detail="Failed to update camera")
 
 @app.delete("/api/v1/cameras/{camera_id}")
@@ -774,21 +750,13 @@ async def delete_camera(request: Request, camera_id: int, current_user: dict = D
         # Validate camera_id
         camera_id = validate_camera_id(camera_id)
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if camera exists
-        cursor.execute("SELECT id FROM cameras WHERE id = %s", (camera_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            conn.close()
-            raise HTTPException(status_code=404, detail="Camera not found")
-        
-        # Delete camera
-        cursor.execute("DELETE FROM cameras WHERE id = %s", (camera_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn, conn.transaction():
+            # Check if camera exists
+            if not await conn.fetchval("SELECT id FROM cameras WHERE id = $1", camera_id):
+                raise HTTPException(status_code=404, detail="Camera not found")
+            
+            # Delete camera
+            await conn.execute("DELETE FROM cameras WHERE id = $1", camera_id)
         
         return {
             "success": True,
@@ -798,10 +766,6 @@ async def delete_camera(request: Request, camera_id: int, current_user: dict = D
         raise
     except Exception as e:
         logger.error(f"Error deleting camera {camera_id}: {e}")
-        if 'conn' in locals() and conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise HTTPException(status_code=500, detail="Failed to delete camera")
 
 @app.patch("/api/v1/cameras/{camera_id}/status")
@@ -817,28 +781,18 @@ async def update_camera_status(request: Request, camera_id: int, status_data: di
         if not status or status not in ["active", "offline", "maintenance", "error"]:
             raise HTTPException(status_code=400, detail="Invalid status value")
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if camera exists
-        cursor.execute("SELECT id FROM cameras WHERE id = %s", (camera_id,))
-        if not cursor.fetchone():
-            cursor.close()
-            conn.close()
-            raise HTTPException(status_code=404, detail="Camera not found")
-        
-        # Update status
-        cursor.execute("""
-            UPDATE cameras 
-            SET status = %s 
-            WHERE id = %s
-            RETURNING id, name, status
-        """, (status, camera_id))
-        
-        row = cursor.fetchone()
-        conn.commit()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn, conn.transaction():
+            # Check if camera exists
+            if not await conn.fetchval("SELECT id FROM cameras WHERE id = $1", camera_id):
+                raise HTTPException(status_code=404, detail="Camera not found")
+            
+            # Update status
+            row = await conn.fetchrow("""
+                UPDATE cameras 
+                SET status = $1 
+                WHERE id = $2
+                RETURNING id, name, status
+            """, status, camera_id)
         
         return {
             "success": True,
@@ -853,10 +807,6 @@ async def update_camera_status(request: Request, camera_id: int, status_data: di
         raise
     except Exception as e:
         logger.error(f"Error updating camera status {camera_id}: {e}")
-        if 'conn' in locals() and conn:
-            conn.rollback()
-            cursor.close()
-            conn.close()
         raise HTTPException(status_code=500, detail="Failed to update camera status")
 
 # Count data endpoints
@@ -865,27 +815,25 @@ async def update_camera_status(request: Request, camera_id: int, status_data: di
 async def get_count_data(request: Request, camera_id: int = None, limit: int = 100):
     """Get count data"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if camera_id:
-            cursor.execute("""
-                SELECT id, camera_id, count_in, count_out, total_count, confidence, timestamp
-                FROM counting_results 
-                WHERE camera_id = %s
-                ORDER BY timestamp DESC 
-                LIMIT %s
-            """, (camera_id, limit))
-        else:
-            cursor.execute("""
-                SELECT id, camera_id, count_in, count_out, total_count, confidence, timestamp
-                FROM counting_results 
-                ORDER BY timestamp DESC 
-                LIMIT %s
-            """, (limit,))
+        async with db_connection() as conn:
+            if camera_id:
+                rows = await conn.fetch("""
+                    SELECT id, camera_id, count_in, count_out, total_count, confidence, timestamp
+                    FROM counting_results 
+                    WHERE camera_id = $1
+                    ORDER BY timestamp DESC 
+                    LIMIT $2
+                """, camera_id, limit)
+            else:
+                rows = await conn.fetch("""
+                    SELECT id, camera_id, count_in, count_out, total_count, confidence, timestamp
+                    FROM counting_results 
+                    ORDER BY timestamp DESC 
+                    LIMIT $1
+                """, limit)
         
         counts = []
-        for row in cursor.fetchall():
+        for row in rows:
             counts.append({
                 "id": row[0],
                 "camera_id": row[1],
@@ -896,14 +844,13 @@ async def get_count_data(request: Request, camera_id: int = None, limit: int = 1
                 "timestamp": row[6].isoformat() if row[6] else None
             })
         
-        cursor.close()
-        conn.close()
-        
         return {
             "success": True,
             "data": counts,
             "count": len(counts)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting count data: {e}")
         raise HTTPException(status_code=500, detail="Failed to get count data")
@@ -914,28 +861,20 @@ async def get_count_data(request: Request, camera_id: int = None, limit: int = 1
 async def get_analytics_summary(request: Request):
     """Get analytics summary"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get total cameras
-        cursor.execute("SELECT COUNT(*) FROM cameras")
-        total_cameras = cursor.fetchone()[0]
-        
-        # Get active cameras
-        cursor.execute("SELECT COUNT(*) FROM cameras WHERE status = 'active'")
-        active_cameras = cursor.fetchone()[0]
-        
-        # Get total counts today
-        cursor.execute("""
-            SELECT COALESCE(SUM(count_in), 0) as total_in, 
-                   COALESCE(SUM(count_out), 0) as total_out
-            FROM counting_results 
-            WHERE DATE(timestamp) = CURRENT_DATE
-        """)
-        today_counts = cursor.fetchone()
-        
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn:
+            # Get total cameras
+            total_cameras = await conn.fetchval("SELECT COUNT(*) FROM cameras")
+            
+            # Get active cameras
+            active_cameras = await conn.fetchval("SELECT COUNT(*) FROM cameras WHERE status = 'active'")
+            
+            # Get total counts today from the day rollups
+            today_counts = await conn.fetchrow("""
+                SELECT COALESCE(SUM(people_in), 0) as total_in, 
+                       COALESCE(SUM(people_out), 0) as total_out
+                FROM analytics 
+                WHERE period_type = 'day' AND period_start = date_trunc('day', LOCALTIMESTAMP)
+            """)
         
         return {
             "success": True,
@@ -947,6 +886,8 @@ async def get_analytics_summary(request: Request):
                 "current_count": today_counts[0] - today_counts[1]
             }
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting analytics summary: {e}")
         raise HTTPException(status_code=500, detail="Failed to get analytics summary")
@@ -961,38 +902,78 @@ async def start_camera_processing(request: Request, camera_id: int, current_user
         camera_id = validate_camera_id(camera_id)
         
         # Get camera details
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, name, rtsp_url, status 
-            FROM cameras 
-            WHERE id = %s
-        """, (camera_id,))
-        
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        async with db_connection() as conn:
+            row = await conn.fetchrow("""
+                SELECT id, name, rtsp_url, status, fps, config 
+                FROM cameras 
+                WHERE id = $1
+            """, camera_id)
         
         if not row:
             raise HTTPException(status_code=404, detail="Camera not found")
         
-        camera_id, name, rtsp_url, status = row
+        camera_id, name, rtsp_url, status, fps, config = row
         
         if status != "active":
             raise HTTPException(status_code=400, detail="Camera must be active to start processing")
         
-        # Add to worker pool
-        success = worker_pool.add_camera_task(camera_id, rtsp_url)
+        # Hand the worker every active zone of the camera: each one gets its
+        # own counts, and "roi_crop" crops detection to their union
+        config = dict(config or {})
+        if "zones" not in config:
+            async with db_connection() as conn:
+                zones = await conn.fetch("""
+                    SELECT id, name, zone_type, coordinates, direction
+                    FROM zones
+                    WHERE camera_id = $1 AND is_active = TRUE
+                    ORDER BY id
+                """, camera_id)
+            config["zones"] = [dict(zone) for zone in zones]
+        # Refuse zones the counter cannot handle rather than writing no counts for them
+        unusable = unusable_zones(config["zones"] or [])
+        if unusable:
+            raise HTTPException(
+                status_code=400,
+                detail="Unusable zones: " + "; ".join(f"zone {zone_id}: {reason}" for zone_id, reason in unusable)
+            )
+        
+        if camera_cluster is not None:
+            # Clustered: register the camera; the replica it hashes to claims it
+            # (the cluster uses a blocking Redis client, so call it off the loop)
+            if not await asyncio.to_thread(camera_cluster.start_camera, camera_id, rtsp_url,
+                                           target_fps=fps, config=config):
+                raise HTTPException(status_code=400, detail="Camera is already being processed")
+            return {
+                "success": True,
+                "message": f"Camera {name} processing scheduled",
+                "data": {
+                    "camera_id": camera_id,
+                    "status": "processing_scheduled"
+                }
+            }
+        
+        # Add to worker pool (queued if every worker is busy)
+        try:
+            success = worker_pool.add_camera_task(camera_id, rtsp_url, target_fps=fps, config=config)
+        except WorkerPoolFullError as e:
+            logger.warning(f"Rejecting camera {camera_id}: {e}")
+            raise HTTPException(
+                status_code=503,
+                detail="Worker pool at capacity, try again later",
+                headers={"Retry-After": str(e.retry_after)}
+            )
         if not success:
             raise HTTPException(status_code=400, detail="Camera is already being processed")
         
+        task_status = worker_pool.get_task_status(camera_id)
+        queued = task_status is not None and task_status["status"] == "queued"
+        
         return {
             "success": True,
-            "message": f"Camera {name} processing started",
+            "message": f"Camera {name} processing {'queued' if queued else 'started'}",
             "data": {
                 "camera_id": camera_id,
-                "status": "processing_started"
+                "status": "processing_queued" if queued else "processing_started"
             }
         }
         
@@ -1011,7 +992,10 @@ async def stop_camera_processing(request: Request, camera_id: int, current_user:
         camera_id = validate_camera_id(camera_id)
         
         # Stop processing
-        success = worker_pool.remove_camera_task(camera_id)
+        if camera_cluster is not None:
+            success = await asyncio.to_thread(camera_cluster.stop_camera, camera_id)
+        else:
+            success = worker_pool.remove_camera_task(camera_id)
         if not success:
             raise HTTPException(status_code=400, detail="Camera is not being processed")
         
@@ -1040,13 +1024,17 @@ async def get_camera_processing_status(request: Request, camera_id: int, current
         
         # Get status from worker pool
         status = worker_pool.get_camera_status(camera_id)
+        data = {
+            "camera_id": camera_id,
+            "status": status
+        }
+        if camera_cluster is not None:
+            # The camera may be running on another replica
+            data["node_id"] = await asyncio.to_thread(camera_cluster.get_camera_owner, camera_id)
         
         return {
             "success": True,
-            "data": {
-                "camera_id": camera_id,
-                "status": status
-            }
+            "data": data
         }
         
     except HTTPException:
@@ -1061,6 +1049,9 @@ async def get_worker_pool_status(request: Request, current_user: dict = Depends(
     """Get worker pool status"""
     try:
         status = worker_pool.get_status()
+        if camera_cluster is not None:
+            status["cluster"] = camera_cluster.get_status()
+        status["database"] = db_pool.get_status()
         
         return {
             "success": True,
@@ -1071,6 +1062,50 @@ async def get_worker_pool_status(request: Request, current_user: dict = Depends(
         logger.error(f"Error getting worker pool status: {e}")
         raise HTTPException(status_code=500, detail="Failed to get worker pool status")
 
+# AI Model Registry Endpoints
+@app.post("/api/v1/models/reload")
+@limiter.limit(get_current_rate_limit())
+async def reload_models(request: Request, current_user: dict = Depends(get_current_user)):
+    """Re-read every running camera's model and hot-swap the ones that changed"""
+    if worker_pool.model_registry is None:
+        raise HTTPException(status_code=400, detail="Model registry is not enabled")
+    try:
+        swaps = await asyncio.to_thread(worker_pool.model_registry.refresh)
+        return {
+            "success": True,
+            "message": f"{swaps} camera model(s) swapped",
+            "data": worker_pool.model_registry.get_status()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error reloading models: {e}")
+        raise HTTPException(status_code=500, detail="Failed to reload models")
+
+@app.post("/api/v1/models/{model_id}/benchmark")
+@limiter.limit(get_current_rate_limit())
+async def benchmark_model(request: Request, model_id: int, runs: int = 20,
+                          current_user: dict = Depends(get_current_user)):
+    """Measure a model's inference latency and store it in ai_models.inference_time_ms"""
+    if worker_pool.model_registry is None:
+        raise HTTPException(status_code=400, detail="Model registry is not enabled")
+    if not 1 <= runs <= 500:
+        raise HTTPException(status_code=400, detail="runs must be between 1 and 500")
+    try:
+        result = await asyncio.to_thread(worker_pool.model_registry.benchmark, model_id, runs)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Model not found")
+        return {
+            "success": True,
+            "message": f"Model {model_id} benchmarked",
+            "data": result
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error benchmarking model {model_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to benchmark model")
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 3002))
     uvicorn.run(app, host="0.0.0.0", port=port, reload=True) 
\ No newline at end of file
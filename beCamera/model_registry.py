@@ -0,0 +1,388 @@
+"""
+AI Model Registry
+Resolves each camera's detection model from the ai_models table, caches
+loaded detectors by checksum and hot-swaps model versions under running cameras
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import psycopg2
+
+from detector import Detector, create_detector
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ModelSpec:
+    """An ai_models row, as much of it as is needed to load the model"""
+    model_id: int
+    name: str
+    version: str
+    file_path: str
+    checksum: Optional[str] = None
+    config: Dict = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        """Cache key: the checksum, or the file's identity when none is recorded"""
+        if self.checksum:
+            return self.checksum
+        stat = os.stat(self.file_path)
+        return f"{os.path.abspath(self.file_path)}@{stat.st_mtime_ns}:{stat.st_size}"
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def variant(self, precision: str) -> "ModelSpec":
+        """The spec to load for a camera's precision
+
+        An int8 variant is the quantized file in config["int8_file_path"]
+        (checksum config["int8_checksum"]), run by ONNX Runtime. Models
+        without one, and fp32 cameras, use the spec as is.
+        """
+        config = self.config or {}
+        if precision != "int8" or not config.get("int8_file_path"):
+            return self
+        return replace(self, file_path=config["int8_file_path"], checksum=config.get("int8_checksum") or None,
+                       config={**config, "backend": "onnxruntime", "model_config": "", "precision": "int8"})
+
+@dataclass
+class ModelBinding:
+    """The model a camera is currently using; swapped in place on reload"""
+    camera_id: int
+    precision: str = "fp32"
+    spec: Optional[ModelSpec] = None
+    detector: Optional[Detector] = None
+    error: Optional[str] = None
+
+def file_checksum(path: str) -> str:
+    """SHA-256 of a model file (the ai_models.checksum format)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ModelCache:
+    """LRU cache of loaded detectors keyed by model checksum
+
+    Holds at most max_models detectors and roughly max_bytes of model files
+    (the file size stands in for the loaded network's memory). A detector a
+    camera is still bound to stays alive after eviction until the camera
+    moves to another model.
+    """
+
+    def __init__(self, max_models: int = 4, max_bytes: int = 1024 * 1024 * 1024,
+                 default_backend: str = "opencv"):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.default_backend = default_backend
+        self.entries: "OrderedDict[str, Tuple[Detector, int]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "ModelCache":
+        return cls(
+            max_models=int(os.getenv("MODEL_CACHE_MAX_MODELS", "4")),
+            max_bytes=int(os.getenv("MODEL_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+            default_backend=os.getenv("AI_DETECTOR_BACKEND", "opencv")
+        )
+
+    def get(self, spec: ModelSpec) -> Detector:
+        """Get the detector for a model, loading and warming it up on a miss"""
+        key = spec.key
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+
+        # Load outside the lock so cached models keep serving meanwhile
+        detector, size = self._load(spec)
+        with self.lock:
+            if key in self.entries:
+                # Loaded concurrently; keep the first one
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            self.stats["misses"] += 1
+            self.entries[key] = (detector, size)
+            self._evict()
+        return detector
+
+    def _load(self, spec: ModelSpec) -> Tuple[Detector, int]:
+        """Verify the file against its checksum, load it and run warm-up inference"""
+        if spec.checksum and file_checksum(spec.file_path) != spec.checksum.lower():
+            raise ValueError(f"Checksum mismatch for model {spec.name} {spec.version} ({spec.file_path})")
+        config = spec.config or {}
+        kwargs = {}
+        if "input_size" in config:
+            kwargs["input_size"] = tuple(config["input_size"])
+        for name in ("scale", "mean", "confidence", "person_class_id", "precision"):
+            if name in config:
+                kwargs[name] = config[name]
+        detector = create_detector(config.get("backend", self.default_backend), spec.file_path,
+                                   config.get("model_config", ""), **kwargs)
+        detector.warm_up()
+        return detector, os.path.getsize(spec.file_path)
+
+    def _evict(self):
+        """Drop least recently used detectors until within both limits"""
+        while len(self.entries) > 1 and (len(self.entries) > self.max_models or
+                                         sum(size for _, size in self.entries.values()) > self.max_bytes):
+            key, _ = self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+            logger.info(f"Evicted model {key[:16]} from cache")
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {
+                "models": [{"key": key[:16], **detector.get_info(), "size_mb": round(size / 1048576, 1)}
+                           for key, (detector, size) in self.entries.items()],
+                "max_models": self.max_models,
+                "max_mb": self.max_bytes // 1048576,
+                "stats": dict(self.stats)
+            }
+
+# Detectors of the inference processes (process mode), one cache per process
+_process_cache: Optional[ModelCache] = None
+
+def process_model_cache() -> ModelCache:
+    global _process_cache
+    if _process_cache is None:
+        _process_cache = ModelCache.from_env()
+    return _process_cache
+
+class ModelRegistry:
+    """Binds cameras to their ai_models entry and keeps the bindings current
+
+    A camera's model is cameras.ai_model_id, used while that model is
+    active. Binding a camera resolves and loads its model on a background
+    loader thread; until then (or without a model) the camera uses the
+    process default detector. Every refresh_interval the registry re-reads
+    the models of all bound cameras and, when a camera's model or its
+    checksum changed, loads the new version and swaps it into the binding.
+    Workers read binding.detector per frame, so the swap takes effect on
+    the next frame without restarting anything.
+    """
+
+    def __init__(self, connect: Callable, cache: Optional[ModelCache] = None, refresh_interval: float = 30.0):
+        self.connect = connect
+        self.cache = cache or ModelCache()
+        self.refresh_interval = refresh_interval
+        self.bindings: Dict[int, ModelBinding] = {}
+        self.lock = threading.Lock()
+        self.loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model_loader")
+        self.running = False
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "swaps": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["ModelRegistry"]:
+        """Build a registry from MODEL_* settings, or None to use the AI_* model for every camera"""
+        if os.getenv("MODEL_REGISTRY_ENABLED", "false").lower() != "true":
+            return None
+
+        def connect():
+            return psycopg2.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                port=os.getenv("DB_PORT", "5432"),
+                database=os.getenv("DB_NAME", "people_counting_db"),
+                user=os.getenv("DB_USER", "postgres"),
+                password=os.getenv("DB_PASSWORD", "dev_password")
+            )
+        return cls(connect, ModelCache.from_env(),
+                   refresh_interval=float(os.getenv("MODEL_REFRESH_INTERVAL", "30")))
+
+    async def start(self):
+        """Start the refresh loop"""
+        self.running = True
+        self.task = asyncio.create_task(self._run())
+        logger.info(f"Model registry started (refresh every {self.refresh_interval}s)")
+
+    async def stop(self):
+        self.running = False
+        if self.task is not None:
+            self.task.cancel()
+        await asyncio.to_thread(self.loader.shutdown, wait=True)
+
+    def bind(self, camera_id: int, precision: str = "fp32") -> ModelBinding:
+        """Create a camera's binding and load its model (at the given
+        precision) in the background"""
+        binding = ModelBinding(camera_id=camera_id, precision=precision)
+        with self.lock:
+            self.bindings[camera_id] = binding
+        self.loader.submit(self._update, [camera_id])
+        return binding
+
+    def unbind(self, camera_id: int):
+        with self.lock:
+            self.bindings.pop(camera_id, None)
+
+    def refresh(self) -> int:
+        """Re-resolve every bound camera now (blocking); returns the number of swaps"""
+        with self.lock:
+            camera_ids = list(self.bindings)
+        return self.loader.submit(self._update, camera_ids).result() if camera_ids else 0
+
+    def resolve(self, camera_ids: List[int]) -> Dict[int, ModelSpec]:
+        """Read the active detection model of each camera from the database"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.id, m.id, m.name, m.version, m.file_path, m.checksum, m.config
+                FROM cameras c
+                JOIN ai_models m ON m.id = c.ai_model_id
+                WHERE c.id = ANY(%s)
+                  AND m.status = 'active'
+                  AND m.model_type = 'detection'
+                  AND m.file_path IS NOT NULL
+            """, (list(camera_ids),))
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        return {row[0]: self._spec(row[1:]) for row in rows}
+
+    def get_model(self, model_id: int) -> Optional[ModelSpec]:
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, name, version, file_path, checksum, config
+                FROM ai_models
+                WHERE id = %s AND file_path IS NOT NULL
+            """, (model_id,))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            conn.close()
+        return self._spec(row) if row else None
+
+    def benchmark(self, model_id: int, runs: int = 20, frame_size: Tuple[int, int] = (640, 480)) -> Optional[Dict]:
+        """Measure a model's single-frame latency and write it to ai_models.inference_time_ms"""
+        spec = self.get_model(model_id)
+        if spec is None:
+            return None
+        detector = self.cache.get(spec)
+        frame = np.random.default_rng(0).integers(0, 255, (frame_size[1], frame_size[0], 3), dtype=np.uint8)
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            detector.detect(frame)
+            latencies.append((time.perf_counter() - start) * 1000)
+        median_ms = statistics.median(latencies)
+
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE ai_models SET inference_time_ms = %s WHERE id = %s",
+                           (int(round(median_ms)), model_id))
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        logger.info(f"Model {spec.name} {spec.version}: median inference {median_ms:.1f}ms over {runs} runs")
+        return {
+            "model_id": model_id,
+            "backend": detector.backend,
+            "runs": runs,
+            "median_ms": round(median_ms, 2),
+            "p95_ms": round(sorted(latencies)[int(0.95 * (runs - 1))], 2),
+            "inference_time_ms": int(round(median_ms))
+        }
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            bindings = {
+                camera_id: {
+                    "model_id": binding.spec.model_id if binding.spec else None,
+                    "version": binding.spec.version if binding.spec else None,
+                    "precision": binding.detector.precision if binding.detector else binding.precision,
+                    "loaded": binding.detector is not None,
+                    "error": binding.error
+                }
+                for camera_id, binding in self.bindings.items()
+            }
+        return {
+            "bindings": bindings,
+            "cache": self.cache.get_status(),
+            "refresh_interval": self.refresh_interval,
+            "stats": dict(self.stats)
+        }
+
+    @staticmethod
+    def _spec(row) -> ModelSpec:
+        model_id, name, version, file_path, checksum, config = row
+        if isinstance(config, str):
+            config = json.loads(config)
+        return ModelSpec(model_id=model_id, name=name, version=version, file_path=file_path,
+                         checksum=checksum or None, config=config or {})
+
+    def _update(self, camera_ids: List[int]) -> int:
+        """Resolve the cameras' models and swap in any that changed (loader thread)"""
+        try:
+            specs = self.resolve(camera_ids)
+        except Exception as e:
+            logger.error(f"Failed to resolve models for cameras {camera_ids}: {e}")
+            self.stats["errors"] += 1
+            return 0
+
+        swaps = 0
+        for camera_id in camera_ids:
+            with self.lock:
+                binding = self.bindings.get(camera_id)
+            if binding is None:
+                continue
+            spec = specs.get(camera_id)
+            try:
+                if spec is None:
+                    if binding.spec is not None:
+                        logger.info(f"Camera {camera_id} has no active model, using the default detector")
+                    binding.spec, binding.detector, binding.error = None, None, None
+                    continue
+                spec = spec.variant(binding.precision)
+                if binding.spec is not None and binding.detector is not None and binding.spec.key == spec.key:
+                    continue
+                detector = self.cache.get(spec)
+            except Exception as e:
+                logger.error(f"Failed to load model for camera {camera_id}: {e}")
+                binding.error = str(e)
+                self.stats["errors"] += 1
+                continue
+            # Publish the detector before the spec: a worker that sees the
+            # new spec must also see its detector
+            binding.detector = detector
+            binding.spec = spec
+            binding.error = None
+            swaps += 1
+            logger.info(f"Camera {camera_id} now uses model {spec.name} {spec.version}")
+        self.stats["swaps"] += swaps
+        return swaps
+
+    async def _run(self):
+        while self.running:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+                self.stats["refreshes"] += 1
+            except Exception as e:
+                logger.error(f"Model refresh failed: {e}")
+                self.stats["errors"] += 1
+
+# Global model registry (None unless MODEL_REGISTRY_ENABLED=true)
+model_registry = ModelRegistry.from_env()
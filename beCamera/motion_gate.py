@@ -0,0 +1,115 @@
+"""
+Motion Gate
+Cheap pre-stage that skips the detector on static scenes
+"""
+
+import logging
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GATE_METHODS = ("diff", "mog2")
+
+class MotionGate:
+    """Decides per frame whether anything moved enough to be worth detecting
+
+    Works on a small grayscale copy of the frame:
+    - "diff": absolute difference against the last frame that passed the gate
+    - "mog2": cv2.createBackgroundSubtractorMOG2 foreground mask
+
+    A frame passes when the fraction of changed pixels exceeds
+    min_changed_ratio. After motion the gate stays open for hold_frames so
+    people who stop moving are still detected, and every force_every frames
+    it opens anyway as a safety net.
+    """
+
+    def __init__(self, method: str = "diff", width: int = 160, pixel_threshold: int = 25,
+                 min_changed_ratio: float = 0.005, hold_frames: int = 10, force_every: int = 50):
+        if method not in GATE_METHODS:
+            raise ValueError(f"Invalid motion gate method: {method}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.hold_frames = hold_frames
+        self.force_every = force_every
+
+        self.reference: Optional[np.ndarray] = None
+        self.subtractor = None
+        if method == "mog2":
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(
+                history=500, varThreshold=pixel_threshold, detectShadows=False
+            )
+        self.hold = 0
+        self.since_open = 0
+        self.frames = 0
+        self.skipped = 0
+        self.last_changed_ratio = 0.0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> Optional["MotionGate"]:
+        """Build a gate from the "motion_gate" section of cameras.config, or None if disabled"""
+        if not config or not config.get("enabled", False):
+            return None
+        return cls(
+            method=config.get("method", "diff"),
+            width=int(config.get("width", 160)),
+            pixel_threshold=int(config.get("pixel_threshold", 25)),
+            min_changed_ratio=float(config.get("min_changed_ratio", 0.005)),
+            hold_frames=int(config.get("hold_frames", 10)),
+            force_every=int(config.get("force_every", 50))
+        )
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(height * self.width / width))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _changed_ratio(self, small: np.ndarray) -> float:
+        if self.method == "mog2":
+            mask = self.subtractor.apply(small)
+            return np.count_nonzero(mask) / mask.size
+        if self.reference is None or self.reference.shape != small.shape:
+            self.reference = small
+            return 1.0
+        changed = cv2.absdiff(small, self.reference) > self.pixel_threshold
+        return np.count_nonzero(changed) / changed.size
+
+    def check(self, frame: np.ndarray) -> bool:
+        """True if the detector should run on this frame"""
+        self.frames += 1
+        small = self._prepare(frame)
+        self.last_changed_ratio = self._changed_ratio(small)
+
+        if self.last_changed_ratio >= self.min_changed_ratio:
+            self.hold = self.hold_frames
+            passed = True
+        elif self.hold > 0:
+            self.hold -= 1
+            passed = True
+        else:
+            passed = self.force_every > 0 and self.since_open + 1 >= self.force_every
+
+        if passed:
+            self.since_open = 0
+            if self.method == "diff":
+                self.reference = small
+        else:
+            self.since_open += 1
+            self.skipped += 1
+        return passed
+
+    def snapshot(self) -> Dict:
+        return {
+            "method": self.method,
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 4) if self.frames else 0.0,
+            "last_changed_ratio": round(self.last_changed_ratio, 4)
+        }
@@ -0,0 +1,132 @@
+"""
+INT8 Model Quantization
+Converts an fp32 ONNX detection model into the INT8 model used by cameras
+whose config sets "precision": "int8" (AI_MODEL_INT8_PATH, or
+ai_models.config.int8_file_path / int8_checksum for registry models)
+
+Static quantization calibrates activation ranges on frames sampled from
+recorded clips; dynamic quantization needs no clips but only quantizes
+weights ahead of time.
+
+Usage:
+    python3 quantize.py models/ssd.onnx models/ssd.int8.onnx --clips clips/*.mp4
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from model_registry import file_checksum
+
+logger = logging.getLogger(__name__)
+
+# Conv and MatMul hold nearly all of an SSD backbone's compute; the
+# detection head (box decoding, NMS) stays in fp32
+QUANTIZE_OP_TYPES = ["Conv", "MatMul"]
+
+def sample_frames(clips: List[str], max_frames: int = 200, stride: int = 15) -> List[np.ndarray]:
+    """Every stride-th frame of the clips, at most max_frames in total"""
+    frames = []
+    for clip in clips:
+        capture = cv2.VideoCapture(clip)
+        index = 0
+        try:
+            while len(frames) < max_frames:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                if index % stride == 0:
+                    frames.append(frame)
+                index += 1
+        finally:
+            capture.release()
+    return frames
+
+class ClipCalibrationReader:
+    """Feeds clip frames to the calibrator, preprocessed like Detector.detect_batch"""
+
+    def __init__(self, input_name: str, frames: List[np.ndarray], input_size: Tuple[int, int],
+                 scale: float, mean: float, batch_size: int = 1):
+        self.batches = iter([
+            {input_name: cv2.dnn.blobFromImages(frames[i:i + batch_size], scale, input_size, mean)}
+            for i in range(0, len(frames), batch_size)
+        ])
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        return next(self.batches, None)
+
+def quantize_model(model_path: str, output_path: str, clips: Optional[List[str]] = None,
+                   input_size: Tuple[int, int] = (300, 300), scale: float = 0.007843, mean: float = 127.5,
+                   max_frames: int = 200, per_channel: bool = True) -> Dict:
+    """Quantize model_path to INT8 at output_path
+
+    Uses static QDQ quantization calibrated on the clips' frames, or dynamic
+    quantization when no clips are given. Returns the output file's size and
+    checksum (the ai_models.checksum format).
+    """
+    from onnxruntime.quantization import (CalibrationMethod, QuantFormat, QuantType,
+                                          quant_pre_process, quantize_dynamic, quantize_static)
+    import onnxruntime
+
+    # Shape inference and graph optimization first, so the quantizer sees
+    # fused Conv+BN/Relu nodes and knows every tensor's shape
+    source = model_path
+    with tempfile.TemporaryDirectory() as workdir:
+        model_path = os.path.join(workdir, "preprocessed.onnx")
+        quant_pre_process(source, model_path)
+
+        if clips:
+            frames = sample_frames(clips, max_frames)
+            if not frames:
+                raise ValueError(f"No frames could be read from {clips}")
+            session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+            reader = ClipCalibrationReader(session.get_inputs()[0].name, frames, input_size, scale, mean)
+            del session
+            quantize_static(model_path, output_path, reader,
+                            quant_format=QuantFormat.QDQ,
+                            op_types_to_quantize=QUANTIZE_OP_TYPES,
+                            per_channel=per_channel,
+                            activation_type=QuantType.QUInt8,
+                            weight_type=QuantType.QInt8,
+                            calibrate_method=CalibrationMethod.MinMax)
+            mode = "static"
+            logger.info(f"Calibrated on {len(frames)} frames from {len(clips)} clips")
+        else:
+            quantize_dynamic(model_path, output_path,
+                             op_types_to_quantize=QUANTIZE_OP_TYPES,
+                             per_channel=per_channel,
+                             weight_type=QuantType.QInt8)
+            mode = "dynamic"
+
+    return {
+        "mode": mode,
+        "output_path": output_path,
+        "fp32_mb": round(os.path.getsize(source) / 1048576, 2),
+        "int8_mb": round(os.path.getsize(output_path) / 1048576, 2),
+        "checksum": file_checksum(output_path)
+    }
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Quantize an ONNX detection model to INT8")
+    parser.add_argument("model", help="fp32 ONNX model")
+    parser.add_argument("output", help="path of the INT8 model to write")
+    parser.add_argument("--clips", nargs="*", default=[], help="recorded clips for static calibration")
+    parser.add_argument("--input-size", default=os.getenv("AI_INPUT_SIZE", "300x300"), help="WIDTHxHEIGHT")
+    parser.add_argument("--scale", type=float, default=0.007843)
+    parser.add_argument("--mean", type=float, default=127.5)
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--per-tensor", action="store_true", help="per-tensor instead of per-channel weights")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.input_size.lower().split("x"))
+    result = quantize_model(args.model, args.output, args.clips, (width, height), args.scale, args.mean,
+                            args.max_frames, per_channel=not args.per_tensor)
+    print(f"Wrote {result['mode']} INT8 model {result['output_path']} "
+          f"({result['fp32_mb']} MB -> {result['int8_mb']} MB)")
+    print(f"checksum: {result['checksum']}")
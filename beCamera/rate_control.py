@@ -0,0 +1,144 @@
+"""
+Adaptive Frame Rate Control
+Chooses per-camera processing rate and detector skip interval at runtime
+"""
+
+import math
+import time
+from typing import Dict, Optional
+
+class FrameRateController:
+    """Per-camera rate controller
+
+    Inputs:
+    - measured analysis latency (EWMA)
+    - scene activity (people seen recently or not)
+    - a global CPU budget scale in (0, 1] shared by all cameras
+
+    Outputs:
+    - fps: how often the stream is serviced, between min_fps and max_fps
+    - detect_every: run the detector on every Nth serviced frame
+    """
+
+    def __init__(self, max_fps: float, min_fps: float = 0.5, idle_after: float = 10.0,
+                 decay: float = 0.8, detect_duty: float = 0.5, max_detect_every: int = 10,
+                 smoothing: float = 0.2):
+        self.max_fps = max_fps
+        self.min_fps = min(min_fps, max_fps)
+        self.idle_after = idle_after
+        self.decay = decay
+        self.detect_duty = detect_duty
+        self.max_detect_every = max_detect_every
+        self.smoothing = smoothing
+
+        self.fps = max_fps
+        self.detect_every = 1
+        self.latency: Optional[float] = None
+        self.last_activity: Optional[float] = None
+        self.last_people_count = 0
+        self.budget_scale = 1.0
+        self.frame_index = 0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+    @property
+    def active(self) -> bool:
+        if self.last_activity is None:
+            return False
+        return time.monotonic() - self.last_activity < self.idle_after
+
+    @property
+    def load(self) -> float:
+        """Estimated CPU-seconds per second this camera costs at its current rate"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * self.fps / self.detect_every
+
+    @property
+    def next_detects(self) -> bool:
+        """Whether the next serviced frame will run the detector"""
+        return self.frame_index % self.detect_every == 0
+
+    def should_detect(self) -> bool:
+        """Advance the frame counter; True when this frame should run the detector"""
+        detect = self.frame_index % self.detect_every == 0
+        self.frame_index += 1
+        return detect
+
+    def record(self, latency: float, people_count: int):
+        """Feed back one analysis result"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self.last_people_count = people_count
+        if people_count > 0:
+            self.last_activity = time.monotonic()
+
+    def update(self, budget_scale: float = 1.0):
+        """Recompute fps and detect_every from the latest measurements"""
+        self.budget_scale = budget_scale
+
+        if self.active:
+            # Fast attack: jump straight to full rate when people are present
+            fps = self.max_fps
+        else:
+            # Slow release: decay towards a trickle on empty scenes
+            fps = max(self.min_fps, self.fps * self.decay)
+
+        # Never schedule faster than the analysis stage can keep up with
+        if self.latency:
+            fps = min(fps, 1.0 / self.latency)
+
+        self.fps = max(self.min_fps, min(self.max_fps, fps * budget_scale))
+
+        # Detection may use detect_duty of each frame interval (less when the
+        # CPU budget is tight); skip frames in between
+        if self.latency:
+            needed = self.latency * self.fps / (self.detect_duty * budget_scale)
+            self.detect_every = max(1, min(self.max_detect_every, math.ceil(needed)))
+        else:
+            self.detect_every = 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "fps": round(self.fps, 2),
+            "max_fps": self.max_fps,
+            "detect_every": self.detect_every,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "active": self.active,
+            "budget_scale": round(self.budget_scale, 3)
+        }
+
+class CpuBudget:
+    """Shares a CPU budget (in cores) across all camera controllers"""
+
+    def __init__(self, cores: float, refresh_interval: float = 1.0):
+        self.cores = cores
+        self.refresh_interval = refresh_interval
+        self.scale = 1.0
+        self.load = 0.0
+        self.refreshed_at = 0.0
+
+    def due(self) -> bool:
+        return time.monotonic() - self.refreshed_at >= self.refresh_interval
+
+    def refresh(self, controllers) -> float:
+        """Recompute the scale factor from the total estimated load"""
+        load = sum(controller.load for controller in controllers)
+        # Loads were measured at the current scale; estimate the unscaled
+        # demand so the scale can recover once load drops
+        demand = load / self.scale if self.scale > 0 else load
+        self.load = load
+        self.scale = 1.0 if demand <= self.cores else max(0.05, self.cores / demand)
+        self.refreshed_at = time.monotonic()
+        return self.scale
+
+    def snapshot(self) -> Dict:
+        return {
+            "cores": self.cores,
+            "load": round(self.load, 3),
+            "scale": round(self.scale, 3)
+        }
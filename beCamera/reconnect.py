@@ -0,0 +1,114 @@
+"""
+Stream Reconnection
+Jittered exponential backoff and a per-camera circuit breaker for flaky streams
+"""
+
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+@dataclass
+class ReconnectPolicy:
+    """Reconnect settings shared by all cameras of a pool"""
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+    # Consecutive failed attempts before the circuit opens
+    failure_threshold: int = 5
+    # Seconds an open circuit waits before allowing a trial reconnect
+    cooldown: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> "ReconnectPolicy":
+        return cls(
+            base_delay=float(os.getenv("CAMERA_RECONNECT_BASE_DELAY", "1")),
+            max_delay=float(os.getenv("CAMERA_RECONNECT_MAX_DELAY", "60")),
+            failure_threshold=int(os.getenv("CAMERA_CIRCUIT_FAILURES", "5")),
+            cooldown=float(os.getenv("CAMERA_CIRCUIT_COOLDOWN", "300"))
+        )
+
+    def backoff(self) -> "Backoff":
+        return Backoff(self.base_delay, self.max_delay, self.multiplier)
+
+    def breaker(self) -> "CircuitBreaker":
+        return CircuitBreaker(self.failure_threshold, self.cooldown)
+
+class Backoff:
+    """Exponential backoff with equal jitter
+
+    Delay n is drawn from [cap/2, cap] with cap = min(max_delay, base * multiplier^n),
+    so cameras that dropped together (e.g. an access point reboot) do not all
+    hit the NVR at the same instant when they retry.
+    """
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0, multiplier: float = 2.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.attempt = 0
+
+    def next_delay(self) -> float:
+        cap = min(self.max_delay, self.base_delay * self.multiplier ** self.attempt)
+        self.attempt += 1
+        return random.uniform(cap / 2, cap)
+
+    def reset(self):
+        self.attempt = 0
+
+class CircuitBreaker:
+    """Stops reconnect attempts to a camera that keeps failing
+
+    closed    -> attempts allowed; failure_threshold consecutive failures open it
+    open      -> no attempts until cooldown has passed
+    half_open -> one trial attempt; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Whether a connection attempt may be made now"""
+        if self.state == self.OPEN and self.remaining() <= 0:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def remaining(self) -> float:
+        """Seconds until an open circuit allows a trial attempt"""
+        if self.state != self.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Count a failed attempt; True if this opened the circuit"""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            opened = self.state != self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trips += opened
+            return opened
+        return False
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": round(self.remaining(), 1) if self.state == self.OPEN else None
+        }
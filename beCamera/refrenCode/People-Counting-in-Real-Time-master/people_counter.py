@@ -1,8 +1,13 @@
 from tracker.centroidtracker import CentroidTracker
 from tracker.trackableobject import TrackableObject
+from tracker.kalmantracker import KalmanTracker
+from tracker.flowtracker import FlowTracker
 from imutils.video import VideoStream
 from itertools import zip_longest
 from utils.mailer import Mailer
+from utils.motion import MotionGate
+from utils.zones import ZoneCounter
+from utils.postprocess import personBoxes
 from imutils.video import FPS
 from utils import thread
 import numpy as np
@@ -93,12 +98,45 @@ def people_counter():
 	W = None
 	H = None
 
-	# instantiate our centroid tracker, then initialize a list to store
-	# each of our dlib correlation trackers, followed by a dictionary to
-	# map each unique object ID to a TrackableObject
-	ct = CentroidTracker(maxDisappeared=40, maxDistance=50)
-	trackers = []
+	# initialize a dictionary to map each unique object ID to a
+	# TrackableObject, then our centroid tracker (which evicts an
+	# object's entry as soon as it deregisters the ID, so the dict
+	# does not grow over a long run), followed by a list to store each
+	# of our dlib correlation trackers
 	trackableObjects = {}
+	ct = CentroidTracker(maxDisappeared=40, maxDistance=50,
+		onDeregister=lambda objectID: trackableObjects.pop(objectID, None))
+	trackers = []
+
+	# on skip frames the boxes come from the per-object dlib correlation
+	# trackers ("dlib"), from one batched optical flow call for all boxes
+	# ("flow"), or from a vectorized Kalman tracker ("kalman", constant
+	# velocity, all tracks at once) -- the Kalman tracks keep their own
+	# IDs, so they bypass the centroid tracker
+	trackerMode = config.get("Tracker", "dlib")
+	useKalman = trackerMode == "kalman"
+	useFlow = trackerMode == "flow"
+	kt = KalmanTracker(maxAge=2 * args["skip_frames"],
+		onDrop=lambda objectID: trackableObjects.pop(objectID, None))
+	# the Kalman prediction never looks at the image, so it needs the
+	# detector more often than the image trackers do
+	if useKalman and args["skip_frames"] > 10:
+		logger.warning("Kalman tracking with --skip-frames {} loses people in crowds, "
+			"use 10 or less".format(args["skip_frames"]))
+	ft = FlowTracker()
+
+	# initialize the optional motion gate used to skip detection and
+	# tracking entirely while the scene is static
+	motionGate = None
+	if config.get("Motion_Gate", False):
+		motionGate = MotionGate(pixelThreshold=config.get("Motion_Pixel_Threshold", 25),
+			minChangedRatio=config.get("Motion_Min_Area", 0.005),
+			method=config.get("Motion_Method", "diff"))
+
+	# load the counting zones (lines and areas) for this camera from the
+	# zones table or the config -- without zones we fall back to the
+	# single horizontal line in the center of the frame
+	zoneCounter = ZoneCounter.fromConfig(config, config.get("Camera_ID"))
 
 	# initialize the total number of frames processed thus far, along
 	# with the total number of objects that have moved either up or down
@@ -135,11 +173,21 @@ def people_counter():
 		# the frame from BGR to RGB for dlib
 		frame = imutils.resize(frame, width = 500)
 		rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+		gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if useFlow else None
 
 		# if the frame dimensions are empty, set them
 		if W is None or H is None:
 			(H, W) = frame.shape[:2]
 
+			# the detector only looks at the region of interest: the
+			# whole frame, or with "ROI_Crop" the union of the counting
+			# zones plus a margin (fewer input pixels per detection)
+			roi = (0, 0, W, H)
+			if zoneCounter is not None and config.get("ROI_Crop"):
+				roi = zoneCounter.roi(W, H, config.get("ROI_Margin", 50))
+				logger.info("Detecting in ROI {} ({:.0%} of the frame)".format(roi,
+					(roi[2] - roi[0]) * (roi[3] - roi[1]) / float(W * H)))
+
 		# if we are supposed to be writing a video to disk, initialize
 		# the writer
 		if args["output"] is not None and writer is None:
@@ -153,41 +201,37 @@ def people_counter():
 		status = "Waiting"
 		rects = []
 
+		# check to see if the scene is static, in which case there is
+		# nothing new to detect or track on this frame
+		moving = motionGate is None or motionGate.check(frame)
+		if not moving:
+			status = "Static"
+
 		# check to see if we should run a more computationally expensive
 		# object detection method to aid our tracker
-		if totalFrames % args["skip_frames"] == 0:
+		elif totalFrames % args["skip_frames"] == 0:
 			# set the status and initialize our new set of object trackers
 			status = "Detecting"
 			trackers = []
 
-			# convert the frame to a blob and pass the blob through the
-			# network and obtain the detections
-			blob = cv2.dnn.blobFromImage(frame, 0.007843, (W, H), 127.5)
+			# convert the region of interest to a blob and pass the blob
+			# through the network and obtain the detections
+			(roiX, roiY, roiEndX, roiEndY) = roi
+			(roiW, roiH) = (roiEndX - roiX, roiEndY - roiY)
+			blob = cv2.dnn.blobFromImage(frame[roiY:roiEndY, roiX:roiEndX], 0.007843, (roiW, roiH), 127.5)
 			net.setInput(blob)
 			detections = net.forward()
 
-			# loop over the detections
-			for i in np.arange(0, detections.shape[2]):
-				# extract the confidence (i.e., probability) associated
-				# with the prediction
-				confidence = detections[0, 0, i, 2]
-
-				# filter out weak detections by requiring a minimum
-				# confidence
-				if confidence > args["confidence"]:
-					# extract the index of the class label from the
-					# detections list
-					idx = int(detections[0, 0, i, 1])
-
-					# if the class label is not a person, ignore it
-					if CLASSES[idx] != "person":
-						continue
-
-					# compute the (x, y)-coordinates of the bounding box
-					# for the object
-					box = detections[0, 0, i, 3:7] * np.array([W, H, W, H])
-					(startX, startY, endX, endY) = box.astype("int")
+			# filter out weak and non-person detections and scale the
+			# remaining boxes to the frame, all in one vectorized pass
+			# over the detections tensor
+			detectionBoxes = personBoxes(detections, roiW, roiH, args["confidence"],
+				CLASSES.index("person"), config.get("NMS_Threshold"), (roiX, roiY))
 
+			# the Kalman and flow trackers take all detection boxes at
+			# once, otherwise start one dlib correlation tracker per box
+			if not (useKalman or useFlow):
+				for (startX, startY, endX, endY) in detectionBoxes.tolist():
 					# construct a dlib rectangle object from the bounding
 					# box coordinates and then start the dlib correlation
 					# tracker
@@ -199,8 +243,27 @@ def people_counter():
 					# utilize it during skip frames
 					trackers.append(tracker)
 
+			# correct the Kalman tracks with this frame's detections
+			if useKalman:
+				rects = kt.update(detectionBoxes)
+
+			# seed the optical flow keypoints from this frame's detections
+			elif useFlow:
+				ft.start(gray, detectionBoxes)
+
 		# otherwise, we should utilize our object *trackers* rather than
 		# object *detectors* to obtain a higher frame processing throughput
+		elif useKalman:
+			# predict every track forward one frame -- no image work at all
+			status = "Tracking"
+			rects = kt.predict()
+
+		elif useFlow:
+			# move every box by the median flow of its keypoints, all
+			# boxes in one calcOpticalFlowPyrLK call
+			status = "Tracking"
+			rects = ft.update(gray)
+
 		else:
 			# loop over the trackers
 			for tracker in trackers:
@@ -221,16 +284,37 @@ def people_counter():
 				# add the bounding box coordinates to the rectangles list
 				rects.append((startX, startY, endX, endY))
 
-		# draw a horizontal line in the center of the frame -- once an
-		# object crosses this line we will determine whether they were
-		# moving 'up' or 'down'
-		cv2.line(frame, (0, H // 2), (W, H // 2), (0, 0, 0), 3)
-		cv2.putText(frame, "-Prediction border - Entrance-", (10, H - ((i * 20) + 200)),
-			cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+		# draw the counting zones, or a horizontal line in the center of
+		# the frame -- once an object crosses this line we will determine
+		# whether they were moving 'up' or 'down'
+		if zoneCounter is not None:
+			if roi != (0, 0, W, H):
+				cv2.rectangle(frame, roi[:2], roi[2:], (128, 128, 128), 1)
+			for (points, counts) in zip(zoneCounter.points, zoneCounter.counts().values()):
+				points = np.array(points, dtype="int32")
+				cv2.polylines(frame, [points], len(points) > 2, (0, 0, 0), 2)
+				cv2.putText(frame, "{}: in {} out {}".format(counts["name"], counts["in"], counts["out"]),
+					(int(points[0][0]), int(points[0][1]) - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+		else:
+			cv2.line(frame, (0, H // 2), (W, H // 2), (0, 0, 0), 3)
+			cv2.putText(frame, "-Prediction border - Entrance-", (10, H - 200),
+				cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
 
 		# use the centroid tracker to associate the (1) old object
-		# centroids with (2) the newly computed object centroids
-		objects = ct.update(rects)
+		# centroids with (2) the newly computed object centroids (on
+		# static frames nothing moved, so keep the current objects)
+		if useKalman:
+			objects = kt.objects
+		else:
+			objects = ct.update(rects) if moving else ct.objects
+
+		# collect this frame's crossings (-1 for out/'up', +1 for
+		# in/'down'); with zones configured, the last movement of every
+		# track is tested against every zone in one vectorized pass
+		crossings = []
+		if zoneCounter is not None:
+			events = zoneCounter.update(list(objects.keys()), list(objects.values()))
+			crossings = [sign for (objectID, zone, sign) in events]
 
 		# loop over the tracked objects
 		for (objectID, centroid) in objects.items():
@@ -248,45 +332,26 @@ def people_counter():
 				# the difference between the y-coordinate of the *current*
 				# centroid and the mean of *previous* centroids will tell
 				# us in which direction the object is moving (negative for
-				# 'up' and positive for 'down')
-				y = [c[1] for c in to.centroids]
-				direction = centroid[1] - np.mean(y)
-				to.centroids.append(centroid)
+				# 'up' and positive for 'down') -- the trackable object
+				# keeps a running mean, so this is O(1) per object
+				direction = to.update(centroid)
 
 				# check to see if the object has been counted or not
-				if not to.counted:
+				# (only for the center line -- zones count every crossing)
+				if zoneCounter is None and not to.counted:
 					# if the direction is negative (indicating the object
 					# is moving up) AND the centroid is above the center
 					# line, count the object
 					if direction < 0 and centroid[1] < H // 2:
-						totalUp += 1
-						date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-						move_out.append(totalUp)
-						out_time.append(date_time)
+						crossings.append(-1)
 						to.counted = True
 
 					# if the direction is positive (indicating the object
 					# is moving down) AND the centroid is below the
 					# center line, count the object
 					elif direction > 0 and centroid[1] > H // 2:
-						totalDown += 1
-						date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-						move_in.append(totalDown)
-						in_time.append(date_time)
-						# if the people limit exceeds over threshold, send an email alert
-						if sum(total) >= config["Threshold"]:
-							cv2.putText(frame, "-ALERT: People limit exceeded-", (10, frame.shape[0] - 80),
-								cv2.FONT_HERSHEY_COMPLEX, 0.5, (0, 0, 255), 2)
-							if config["ALERT"]:
-								logger.info("Sending email alert..")
-								email_thread = threading.Thread(target = send_mail)
-								email_thread.daemon = True
-								email_thread.start()
-								logger.info("Alert sent!")
+						crossings.append(1)
 						to.counted = True
-						# compute the sum of total people inside
-						total = []
-						total.append(len(move_in) - len(move_out))
 
 			# store the trackable object in our dictionary
 			trackableObjects[objectID] = to
@@ -298,6 +363,32 @@ def people_counter():
 				cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
 			cv2.circle(frame, (centroid[0], centroid[1]), 4, (255, 255, 255), -1)
 
+		# update the totals with this frame's crossings
+		for sign in crossings:
+			date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+			if sign < 0:
+				totalUp += 1
+				move_out.append(totalUp)
+				out_time.append(date_time)
+				continue
+
+			totalDown += 1
+			move_in.append(totalDown)
+			in_time.append(date_time)
+			# if the people limit exceeds over threshold, send an email alert
+			if sum(total) >= config["Threshold"]:
+				cv2.putText(frame, "-ALERT: People limit exceeded-", (10, frame.shape[0] - 80),
+					cv2.FONT_HERSHEY_COMPLEX, 0.5, (0, 0, 255), 2)
+				if config["ALERT"]:
+					logger.info("Sending email alert..")
+					email_thread = threading.Thread(target = send_mail)
+					email_thread.daemon = True
+					email_thread.start()
+					logger.info("Alert sent!")
+			# compute the sum of total people inside
+			total = []
+			total.append(len(move_in) - len(move_out))
+
 		# construct a tuple of information we will be displaying on the frame
 		info_status = [
 		("Exit", totalUp),
@@ -349,6 +440,11 @@ def people_counter():
 	fps.stop()
 	logger.info("Elapsed time: {:.2f}".format(fps.elapsed()))
 	logger.info("Approx. FPS: {:.2f}".format(fps.fps()))
+	if motionGate is not None:
+		logger.info("Motion gate skipped: {:.1%} of frames".format(motionGate.skipRatio()))
+	if zoneCounter is not None:
+		for (zoneID, counts) in zoneCounter.counts().items():
+			logger.info("Zone {} ({}): in {}, out {}".format(zoneID, counts["name"], counts["in"], counts["out"]))
 
 	# release the camera device/resource (issue 15)
 	if config["Thread"]:
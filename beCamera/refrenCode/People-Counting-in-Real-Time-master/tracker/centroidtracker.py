@@ -1,17 +1,20 @@
 # import the necessary packages
+from scipy.optimize import linear_sum_assignment
 from scipy.spatial import distance as dist
-from collections import OrderedDict
 import numpy as np
 
 class CentroidTracker:
-	def __init__(self, maxDisappeared=50, maxDistance=50):
-		# initialize the next unique object ID along with two ordered
-		# dictionaries used to keep track of mapping a given object
-		# ID to its centroid and number of consecutive frames it has
-		# been marked as "disappeared", respectively
+	def __init__(self, maxDisappeared=50, maxDistance=50, capacity=64, onDeregister=None):
+		# initialize the next unique object ID along with three
+		# preallocated arrays holding, for every tracked object, its
+		# ID, its centroid and the number of consecutive frames it has
+		# been marked as "disappeared" -- the first self.count rows are
+		# the live objects, so no per-frame dict/list rebuilding
 		self.nextObjectID = 0
-		self.objects = OrderedDict()
-		self.disappeared = OrderedDict()
+		self.count = 0
+		self.ids = np.zeros(capacity, dtype="int64")
+		self.centroids = np.zeros((capacity, 2), dtype="int64")
+		self.missing = np.zeros(capacity, dtype="int32")
 
 		# store the number of maximum consecutive frames a given
 		# object is allowed to be marked as "disappeared" until we
@@ -23,141 +26,151 @@ class CentroidTracker:
 		# distance we'll start to mark the object as "disappeared"
 		self.maxDistance = maxDistance
 
+		# optional callback invoked with every deregistered object ID,
+		# so callers can drop whatever they keep per object
+		self.onDeregister = onDeregister
+
+		# ID-keyed views of the arrays, built on first access and
+		# dropped whenever the arrays change (see _changed)
+		self._objects = None
+		self._disappeared = None
+
+	@property
+	def objects(self):
+		# map each live object ID to (a copy of) its centroid, so
+		# callers can keep the centroid around after the next update
+		# -- the dict is rebuilt only after the tracker has changed,
+		# so frames that reuse it (skipped or still) cost nothing
+		if self._objects is None:
+			self._objects = dict(zip(self.ids[:self.count].tolist(), self.centroids[:self.count].copy()))
+		return self._objects
+
+	@property
+	def disappeared(self):
+		# map each live object ID to its disappeared counter
+		if self._disappeared is None:
+			self._disappeared = dict(zip(self.ids[:self.count].tolist(), self.missing[:self.count].tolist()))
+		return self._disappeared
+
+	def _changed(self):
+		# drop the cached views after any write to the arrays
+		self._objects = None
+		self._disappeared = None
+
+	def _reserve(self, extra):
+		# grow the arrays (doubling) when more rows are needed than
+		# were preallocated
+		needed = self.count + extra
+		if needed <= len(self.ids):
+			return
+		capacity = max(needed, 2 * len(self.ids))
+		for name in ("ids", "centroids", "missing"):
+			old = getattr(self, name)
+			new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+			new[:self.count] = old[:self.count]
+			setattr(self, name, new)
+
+	def _registerMany(self, centroids):
+		# register a batch of new centroids with consecutive IDs
+		self._changed()
+		n = len(centroids)
+		self._reserve(n)
+		start, end = self.count, self.count + n
+		self.ids[start:end] = np.arange(self.nextObjectID, self.nextObjectID + n)
+		self.centroids[start:end] = centroids
+		self.missing[start:end] = 0
+		self.nextObjectID += n
+		self.count = end
+
+	def _keep(self, mask):
+		# compact the live rows, keeping only those where mask is True
+		n = int(mask.sum())
+		if n == self.count:
+			return
+		self._changed()
+		if self.onDeregister is not None:
+			for objectID in self.ids[:self.count][~mask].tolist():
+				self.onDeregister(objectID)
+		self.ids[:n] = self.ids[:self.count][mask]
+		self.centroids[:n] = self.centroids[:self.count][mask]
+		self.missing[:n] = self.missing[:self.count][mask]
+		self.count = n
+
+	def _pruneMissing(self):
+		# deregister every object that has been missing for more
+		# than the maximum number of consecutive frames
+		self._keep(self.missing[:self.count] <= self.maxDisappeared)
+
 	def register(self, centroid):
 		# when registering an object we use the next available object
 		# ID to store the centroid
-		self.objects[self.nextObjectID] = centroid
-		self.disappeared[self.nextObjectID] = 0
-		self.nextObjectID += 1
+		self._registerMany(np.asarray(centroid).reshape(1, 2))
 
 	def deregister(self, objectID):
-		# to deregister an object ID we delete the object ID from
-		# both of our respective dictionaries
-		del self.objects[objectID]
-		del self.disappeared[objectID]
+		# to deregister an object ID we drop its row from the arrays
+		self._keep(self.ids[:self.count] != objectID)
 
 	def update(self, rects):
+		# every update moves or ages the tracked objects
+		self._changed()
+
 		# check to see if the list of input bounding box rectangles
 		# is empty
 		if len(rects) == 0:
-			# loop over any existing tracked objects and mark them
-			# as disappeared
-			for objectID in list(self.disappeared.keys()):
-				self.disappeared[objectID] += 1
-
-				# if we have reached a maximum number of consecutive
-				# frames where a given object has been marked as
-				# missing, deregister it
-				if self.disappeared[objectID] > self.maxDisappeared:
-					self.deregister(objectID)
+			# mark every existing tracked object as disappeared and
+			# deregister the ones missing for too long
+			self.missing[:self.count] += 1
+			self._pruneMissing()
 
 			# return early as there are no centroids or tracking info
 			# to update
 			return self.objects
 
-		# initialize an array of input centroids for the current frame
-		inputCentroids = np.zeros((len(rects), 2), dtype="int")
-
-		# loop over the bounding box rectangles
-		for (i, (startX, startY, endX, endY)) in enumerate(rects):
-			# use the bounding box coordinates to derive the centroid
-			cX = int((startX + endX) / 2.0)
-			cY = int((startY + endY) / 2.0)
-			inputCentroids[i] = (cX, cY)
+		# derive the input centroids for the current frame from the
+		# bounding box rectangles in one vectorized step
+		rects = np.asarray(rects, dtype="float64").reshape(-1, 4)
+		inputCentroids = ((rects[:, :2] + rects[:, 2:]) / 2.0).astype("int64")
 
 		# if we are currently not tracking any objects take the input
 		# centroids and register each of them
-		if len(self.objects) == 0:
-			for i in range(0, len(inputCentroids)):
-				self.register(inputCentroids[i])
-
-		# otherwise, are are currently tracking objects so we need to
-		# try to match the input centroids to existing object
-		# centroids
-		else:
-			# grab the set of object IDs and corresponding centroids
-			objectIDs = list(self.objects.keys())
-			objectCentroids = list(self.objects.values())
-
-			# compute the distance between each pair of object
-			# centroids and input centroids, respectively -- our
-			# goal will be to match an input centroid to an existing
-			# object centroid
-			D = dist.cdist(np.array(objectCentroids), inputCentroids)
-
-			# in order to perform this matching we must (1) find the
-			# smallest value in each row and then (2) sort the row
-			# indexes based on their minimum values so that the row
-			# with the smallest value as at the *front* of the index
-			# list
-			rows = D.min(axis=1).argsort()
-
-			# next, we perform a similar process on the columns by
-			# finding the smallest value in each column and then
-			# sorting using the previously computed row index list
-			cols = D.argmin(axis=1)[rows]
-
-			# in order to determine if we need to update, register,
-			# or deregister an object we need to keep track of which
-			# of the rows and column indexes we have already examined
-			usedRows = set()
-			usedCols = set()
-
-			# loop over the combination of the (row, column) index
-			# tuples
-			for (row, col) in zip(rows, cols):
-				# if we have already examined either the row or
-				# column value before, ignore it
-				if row in usedRows or col in usedCols:
-					continue
-
-				# if the distance between centroids is greater than
-				# the maximum distance, do not associate the two
-				# centroids to the same object
-				if D[row, col] > self.maxDistance:
-					continue
-
-				# otherwise, grab the object ID for the current row,
-				# set its new centroid, and reset the disappeared
-				# counter
-				objectID = objectIDs[row]
-				self.objects[objectID] = inputCentroids[col]
-				self.disappeared[objectID] = 0
-
-				# indicate that we have examined each of the row and
-				# column indexes, respectively
-				usedRows.add(row)
-				usedCols.add(col)
-
-			# compute both the row and column index we have NOT yet
-			# examined
-			unusedRows = set(range(0, D.shape[0])).difference(usedRows)
-			unusedCols = set(range(0, D.shape[1])).difference(usedCols)
-
-			# in the event that the number of object centroids is
-			# equal or greater than the number of input centroids
-			# we need to check and see if some of these objects have
-			# potentially disappeared
-			if D.shape[0] >= D.shape[1]:
-				# loop over the unused row indexes
-				for row in unusedRows:
-					# grab the object ID for the corresponding row
-					# index and increment the disappeared counter
-					objectID = objectIDs[row]
-					self.disappeared[objectID] += 1
-
-					# check to see if the number of consecutive
-					# frames the object has been marked "disappeared"
-					# for warrants deregistering the object
-					if self.disappeared[objectID] > self.maxDisappeared:
-						self.deregister(objectID)
-
-			# otherwise, if the number of input centroids is greater
-			# than the number of existing object centroids we need to
-			# register each new input centroid as a trackable object
-			else:
-				for col in unusedCols:
-					self.register(inputCentroids[col])
+		if self.count == 0:
+			self._registerMany(inputCentroids)
+			return self.objects
+
+		# compute the distance between each pair of object centroids
+		# and input centroids, respectively
+		D = dist.cdist(self.centroids[:self.count], inputCentroids)
+
+		# gate pairs further apart than the maximum distance by
+		# capping their cost just above it (in place, no mask), then
+		# solve the optimal (Hungarian) assignment -- unlike greedy
+		# matching this minimizes the total distance, so two people
+		# passing each other in a crowd do not swap IDs. The cap
+		# makes a gated pair cost the same as leaving both sides
+		# unmatched: a much larger cap would make the solver chain
+		# wrong in-gate matches across a crowd just to avoid one
+		np.minimum(D, self.maxDistance + 1.0, out=D)
+		rows, cols = linear_sum_assignment(D)
+
+		# drop assignments that only exist because of the gate
+		keep = D[rows, cols] <= self.maxDistance
+		rows, cols = rows[keep], cols[keep]
+
+		# matched objects take the new centroid and reset their
+		# disappeared counter, every unmatched object is marked as
+		# disappeared (and deregistered if it has been missing for
+		# too long) -- counting all of them up first and resetting
+		# the matched ones avoids building an unmatched-row mask
+		self.centroids[rows] = inputCentroids[cols]
+		self.missing[:self.count] += 1
+		self.missing[rows] = 0
+		self._pruneMissing()
+
+		# every unmatched input centroid becomes a new trackable object
+		if len(cols) < len(inputCentroids):
+			unmatchedCols = np.ones(len(inputCentroids), dtype=bool)
+			unmatchedCols[cols] = False
+			self._registerMany(inputCentroids[unmatchedCols])
 
 		# return the set of trackable objects
-		return self.objects
\ No newline at end of file
+		return self.objects
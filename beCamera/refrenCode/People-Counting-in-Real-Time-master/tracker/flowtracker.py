@@ -0,0 +1,60 @@
+# import the necessary packages
+import numpy as np
+import cv2
+
+class FlowTracker:
+	def __init__(self, gridSize=4, margin=0.2, minPoints=4, winSize=(15, 15), maxLevel=2):
+		# every box is tracked with a small grid of keypoints; on each
+		# frame the keypoints of *all* boxes go through a single
+		# pyramidal Lucas-Kanade call and each box moves by the median
+		# flow of its own points (robust to a few points sliding onto
+		# the background)
+		self.gridSize = gridSize
+		self.margin = margin
+		self.minPoints = minPoints
+		self.lkParams = dict(winSize=winSize, maxLevel=maxLevel,
+			criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+		self.prevGray = None
+		self.boxes = np.zeros((0, 4), dtype="float32")
+
+		# keypoint offsets inside a unit box, shrunk by the margin so
+		# points stay on the person rather than on the background
+		steps = np.linspace(margin, 1.0 - margin, gridSize, dtype="float32")
+		gx, gy = np.meshgrid(steps, steps)
+		self.grid = np.stack([gx.ravel(), gy.ravel()], axis=1)
+
+	def _seed(self):
+		# lay the keypoint grid over every box: (boxes * points, 1, 2)
+		origin = self.boxes[:, None, :2]
+		size = (self.boxes[:, 2:] - self.boxes[:, :2])[:, None, :]
+		return (origin + self.grid[None] * size).reshape(-1, 1, 2).astype("float32")
+
+	def start(self, gray, boxes):
+		# (re)start tracking from a set of detection boxes
+		self.prevGray = gray
+		self.boxes = np.asarray(boxes, dtype="float32").reshape(-1, 4)
+
+	def update(self, gray):
+		# track every box into the new frame with one optical flow call
+		# and return the updated boxes
+		if len(self.boxes) == 0 or self.prevGray is None:
+			self.prevGray = gray
+			return []
+
+		points = self._seed()
+		moved, status, _ = cv2.calcOpticalFlowPyrLK(self.prevGray, gray, points, None, **self.lkParams)
+		self.prevGray = gray
+
+		# a box that lost most of its points has left the frame or been
+		# occluded -- stop tracking it until the next detection
+		flow = (moved - points).reshape(len(self.boxes), -1, 2)
+		found = status.reshape(len(self.boxes), -1).astype(bool)
+		alive = found.sum(axis=1) >= self.minPoints
+		flow, found = flow[alive], found[alive]
+
+		# per-box median displacement over the points that were found
+		# (lost points are NaN so they drop out of the median)
+		flow[~found] = np.nan
+		shift = np.nanmedian(flow, axis=1)
+		self.boxes = self.boxes[alive] + np.tile(shift, 2)
+		return [tuple(box) for box in self.boxes.astype("int")]
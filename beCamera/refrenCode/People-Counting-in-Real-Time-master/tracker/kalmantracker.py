@@ -0,0 +1,167 @@
+# import the necessary packages
+from scipy.optimize import linear_sum_assignment
+import numpy as np
+
+def iou_matrix(boxesA, boxesB):
+	# compute the intersection over union between every box in A and
+	# every box in B, boxes given as (startX, startY, endX, endY)
+	x1 = np.maximum(boxesA[:, None, 0], boxesB[None, :, 0])
+	y1 = np.maximum(boxesA[:, None, 1], boxesB[None, :, 1])
+	x2 = np.minimum(boxesA[:, None, 2], boxesB[None, :, 2])
+	y2 = np.minimum(boxesA[:, None, 3], boxesB[None, :, 3])
+	inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+	areaA = (boxesA[:, 2] - boxesA[:, 0]) * (boxesA[:, 3] - boxesA[:, 1])
+	areaB = (boxesB[:, 2] - boxesB[:, 0]) * (boxesB[:, 3] - boxesB[:, 1])
+	union = areaA[:, None] + areaB[None, :] - inter
+	return inter / np.maximum(union, 1e-6)
+
+def mahalanobis_association(gate=9.21):
+	# build an association step that matches by the Mahalanobis distance
+	# of each detection center from each track's predicted center under
+	# the track's own uncertainty -- a track that has not been seen for
+	# many frames (or whose velocity is still unknown) gets a wider gate
+	# than a freshly updated one; pairs beyond the chi-square gate (2
+	# dof, 99% by default) are never matched
+	def associate(tracker, detBoxes):
+		centers = (detBoxes[:, :2] + detBoxes[:, 2:]) / 2.0
+		S = tracker.P[:, :2, :2] + tracker.R[:2, :2]
+		diff = centers[None, :, :] - tracker.x[:, None, :2]
+		D = np.einsum("nmi,nij,nmj->nm", diff, np.linalg.inv(S), diff)
+		gated = D > gate
+		D[gated] = gate * (D.shape[0] + D.shape[1]) + 1.0
+		rows, cols = linear_sum_assignment(D)
+		keep = ~gated[rows, cols]
+		return rows[keep], cols[keep]
+	return associate
+
+def iou_association(minIoU=0.3):
+	# build an association step that optimally matches predicted track
+	# boxes to detection boxes by IoU, ignoring pairs below minIoU
+	def associate(tracker, detBoxes):
+		iou = iou_matrix(tracker.boxes().astype("float64"), detBoxes)
+		rows, cols = linear_sum_assignment(-iou)
+		keep = iou[rows, cols] >= minIoU
+		return rows[keep], cols[keep]
+	return associate
+
+def centroid_association(maxDistance=50):
+	# build an association step that optimally matches predicted track
+	# boxes to detection boxes by centroid distance, ignoring pairs
+	# further apart than maxDistance
+	def associate(tracker, detBoxes):
+		a = tracker.x[:, :2]
+		b = (detBoxes[:, :2] + detBoxes[:, 2:]) / 2.0
+		D = np.linalg.norm(a[:, None, :] - b[None, :, :], axis=2)
+		gated = D > maxDistance
+		D[gated] = maxDistance * (D.shape[0] + D.shape[1]) + 1.0
+		rows, cols = linear_sum_assignment(D)
+		keep = ~gated[rows, cols]
+		return rows[keep], cols[keep]
+	return associate
+
+class KalmanTracker:
+	def __init__(self, maxAge=60, associate=None, onDrop=None):
+		# every track is a constant-velocity Kalman filter over the box
+		# center and size, state (cx, cy, w, h, vx, vy, vw, vh) -- all
+		# tracks live in stacked arrays so predict/update run for the
+		# whole crowd at once instead of one tracker per person
+		self.maxAge = maxAge
+		self.associate = associate or mahalanobis_association()
+		# optional callback invoked with every dropped track ID (like
+		# CentroidTracker's onDeregister)
+		self.onDrop = onDrop
+		self.nextTrackID = 0
+		self.ids = np.zeros(0, dtype="int64")
+		self.x = np.zeros((0, 8))
+		self.P = np.zeros((0, 8, 8))
+		self.sinceUpdate = np.zeros(0, dtype="int32")
+		# the tracks matched (or started) on the last detection frame --
+		# only these are reported, on detection and skip frames alike,
+		# so the centroid tracker downstream always sees the same set of
+		# objects; coasting tracks are kept for re-association only
+		self.visible = np.zeros(0, dtype=bool)
+
+		# transition (position += velocity per frame), measurement
+		# (we observe the box center and size) and noise matrices
+		self.F = np.eye(8)
+		self.F[:4, 4:] = np.eye(4)
+		self.H = np.eye(4, 8)
+		self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001, 0.0001])
+		self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+		# a new track's velocity is unknown: allow a walking pace of a
+		# few pixels per frame in any direction
+		self.P0 = np.diag([10.0, 10.0, 10.0, 10.0, 25.0, 25.0, 1.0, 1.0])
+
+	@staticmethod
+	def _toMeasurement(boxes):
+		# (startX, startY, endX, endY) -> (cx, cy, w, h)
+		return np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2.0, (boxes[:, 1] + boxes[:, 3]) / 2.0,
+			boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]])
+
+	def boxes(self):
+		# current track boxes as (startX, startY, endX, endY) integers
+		cx, cy = self.x[:, 0], self.x[:, 1]
+		w, h = np.maximum(self.x[:, 2], 1.0), np.maximum(self.x[:, 3], 1.0)
+		return np.column_stack([cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0]).astype("int")
+
+	@property
+	def objects(self):
+		# map each visible track ID to its (integer) centroid, the
+		# same shape as CentroidTracker.objects -- the tracks already
+		# keep their identity across detections, so the counter can
+		# use these IDs directly instead of re-associating the boxes
+		boxes = self.boxes()[self.visible]
+		centroids = (boxes[:, :2] + boxes[:, 2:]) // 2
+		return dict(zip(self.ids[self.visible].tolist(), centroids))
+
+	def predict(self):
+		# advance every track by one frame and return the predicted
+		# boxes of the visible tracks -- this is all a skip frame costs
+		self.x = self.x @ self.F.T
+		self.P = self.F @ self.P @ self.F.T + self.Q
+		self.sinceUpdate += 1
+		return [tuple(box) for box in self.boxes()[self.visible]]
+
+	def update(self, detections):
+		# predict all tracks to the current frame, then associate the
+		# detection boxes with the predicted boxes
+		self.predict()
+		detections = np.asarray(detections, dtype="float64").reshape(-1, 4)
+		rows = cols = np.zeros(0, dtype="int64")
+		if len(self.x) and len(detections):
+			rows, cols = self.associate(self, detections)
+
+		# Kalman correction for the matched tracks, vectorized over
+		# the matches: K = P H' (H P H' + R)^-1
+		if len(rows):
+			z = self._toMeasurement(detections[cols])
+			P = self.P[rows]
+			S = P[:, :4, :4] + self.R
+			K = P[:, :, :4] @ np.linalg.inv(S)
+			self.x[rows] += (K @ (z - self.x[rows, :4])[:, :, None])[:, :, 0]
+			self.P[rows] = P - K @ P[:, :4, :]
+			self.sinceUpdate[rows] = 0
+
+		# drop tracks that have gone unmatched for too long
+		alive = self.sinceUpdate <= self.maxAge
+		if self.onDrop is not None:
+			for trackID in self.ids[~alive].tolist():
+				self.onDrop(trackID)
+		self.ids, self.x, self.P = self.ids[alive], self.x[alive], self.P[alive]
+		self.sinceUpdate = self.sinceUpdate[alive]
+
+		# start a new track for every unmatched detection
+		unmatched = np.ones(len(detections), dtype=bool)
+		unmatched[cols] = False
+		new = self._toMeasurement(detections[unmatched])
+		if len(new):
+			n = len(new)
+			self.ids = np.concatenate([self.ids, np.arange(self.nextTrackID, self.nextTrackID + n)])
+			self.x = np.concatenate([self.x, np.column_stack([new, np.zeros((n, 4))])])
+			self.P = np.concatenate([self.P, np.repeat(self.P0[None], n, axis=0)])
+			self.sinceUpdate = np.concatenate([self.sinceUpdate, np.zeros(n, dtype="int32")])
+			self.nextTrackID += n
+
+		# return the boxes of the tracks seen on this frame
+		self.visible = self.sinceUpdate == 0
+		return [tuple(box) for box in self.boxes()[self.visible]]
@@ -1,10 +1,64 @@
+# import the necessary packages
+import numpy as np
+
 class TrackableObject:
-	def __init__(self, objectID, centroid):
-		# store the object ID, then initialize a list of centroids
-		# using the current centroid
+	# one of these lives for every person in view, so keep the
+	# instances small and fixed-size
+	__slots__ = ("objectID", "counted", "history", "count", "ySum", "_ring", "_next")
+
+	def __init__(self, objectID, centroid, history=32):
+		# store the object ID, then initialize a fixed-size ring buffer
+		# of the most recent centroids using the current centroid
 		self.objectID = objectID
-		self.centroids = [centroid]
+		self.history = history
+		self._ring = np.zeros((history, 2), dtype="float64")
+		self._next = 0
+
+		# running count and sum of every y-coordinate seen so far, so
+		# the mean of the previous centroids is O(1) no matter how long
+		# the object has been in view
+		self.count = 0
+		self.ySum = 0.0
+		self._push(centroid)
 
 		# initialize a boolean used to indicate if the object has
 		# already been counted or not
-		self.counted = False
\ No newline at end of file
+		self.counted = False
+
+	def _push(self, centroid):
+		# overwrite the oldest slot of the ring buffer
+		self._ring[self._next % self.history] = centroid[0], centroid[1]
+		self._next += 1
+		self.count += 1
+		self.ySum += centroid[1]
+
+	@property
+	def meanY(self):
+		# mean y-coordinate of every centroid seen so far
+		return self.ySum / self.count
+
+	@property
+	def centroids(self):
+		# the buffered centroids, oldest first
+		if self._next < self.history:
+			return self._ring[:self._next].copy()
+		return np.roll(self._ring, -self._next, axis=0)
+
+	@property
+	def velocity(self):
+		# average (dx, dy) per update over the buffered centroids
+		n = min(self._next, self.history)
+		if n < 2:
+			return np.zeros(2)
+		newest = self._ring[(self._next - 1) % self.history]
+		oldest = self._ring[(self._next - n) % self.history]
+		return (newest - oldest) / (n - 1)
+
+	def update(self, centroid):
+		# the difference between the y-coordinate of the *current*
+		# centroid and the mean of *previous* centroids tells us in
+		# which direction the object is moving (negative for 'up' and
+		# positive for 'down'); record the centroid and return it
+		direction = centroid[1] - self.meanY
+		self._push(centroid)
+		return direction
@@ -0,0 +1,64 @@
+import numpy as np
+import cv2
+
+class MotionGate:
+	def __init__(self, pixelThreshold=25, minChangedRatio=0.005, holdFrames=10,
+		width=160, method="diff"):
+		# store the per-pixel intensity change that counts as motion and
+		# the fraction of changed pixels needed to open the gate
+		self.pixelThreshold = pixelThreshold
+		self.minChangedRatio = minChangedRatio
+
+		# keep the gate open for a few frames after motion so people who
+		# stop moving are still detected/tracked
+		self.holdFrames = holdFrames
+		self.hold = 0
+
+		# motion is measured on a small grayscale copy of the frame
+		self.width = width
+		self.reference = None
+		self.subtractor = None
+		if method == "mog2":
+			self.subtractor = cv2.createBackgroundSubtractorMOG2(
+				varThreshold=pixelThreshold, detectShadows=False)
+
+		# count the frames seen and the frames skipped by the gate
+		self.totalFrames = 0
+		self.skippedFrames = 0
+
+	def check(self, frame):
+		# downscale, convert to grayscale and blur to suppress sensor noise
+		self.totalFrames += 1
+		(h, w) = frame.shape[:2]
+		small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))),
+			interpolation=cv2.INTER_AREA)
+		small = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+		# compute the fraction of pixels that changed, either against the
+		# last frame that passed the gate or against the MOG2 background
+		if self.subtractor is not None:
+			mask = self.subtractor.apply(small)
+			ratio = np.count_nonzero(mask) / mask.size
+		elif self.reference is None:
+			ratio = 1.0
+		else:
+			diff = cv2.absdiff(small, self.reference)
+			ratio = np.count_nonzero(diff > self.pixelThreshold) / diff.size
+
+		# open the gate on motion, or while the hold counter lasts
+		if ratio >= self.minChangedRatio:
+			self.hold = self.holdFrames
+		elif self.hold > 0:
+			self.hold -= 1
+		else:
+			self.skippedFrames += 1
+			return False
+
+		self.reference = small
+		return True
+
+	def skipRatio(self):
+		# fraction of frames on which detection/tracking was skipped
+		if self.totalFrames == 0:
+			return 0.0
+		return self.skippedFrames / self.totalFrames
@@ -0,0 +1,29 @@
+import numpy as np
+import cv2
+
+def personBoxes(detections, W, H, confidence=0.4, classID=15, nmsThreshold=None, offset=(0, 0)):
+	# turn the raw MobileNet SSD output, shaped (1, 1, N, 7) with rows
+	# [imageID, classID, confidence, startX, startY, endX, endY] in
+	# relative coordinates, into an (N, 4) int32 array of person boxes
+	# in pixels -- every step runs over the whole tensor at once; when
+	# the detector ran on a (W x H) crop, offset is the crop's top-left
+	# corner and maps the boxes back to frame coordinates
+	rows = detections.reshape(-1, 7)
+
+	# filter out weak detections and everything that is not a person
+	keep = (rows[:, 2] > confidence) & (rows[:, 1].astype("int32") == classID)
+	rows = rows[keep]
+
+	# scale all boxes to the frame size in one multiply
+	boxes = (rows[:, 3:7] * np.array([W, H, W, H])).astype("int32")
+	boxes += np.array([offset[0], offset[1], offset[0], offset[1]], dtype="int32")
+
+	# optionally suppress overlapping boxes (the SSD output layer already
+	# runs a per-class NMS, so this is only needed for a stricter overlap
+	# threshold)
+	if nmsThreshold and len(boxes) > 1:
+		xywh = np.column_stack([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]])
+		picked = cv2.dnn.NMSBoxes(xywh.tolist(), rows[:, 2].tolist(), float(confidence), float(nmsThreshold))
+		boxes = boxes[np.sort(np.asarray(picked, dtype="int64").reshape(-1))]
+
+	return boxes
@@ -0,0 +1,61 @@
+import logging
+import os
+import sys
+import numpy as np
+
+# the zone parser and counting engine are shared with the camera service
+# (beCamera/zones.py, three directories up) so this script and the worker
+# pool count a zones row the same way -- appended, not prepended, so none
+# of the service's modules shadow this project's own
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+from zones import ZoneCounter as _ZoneCounter  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+def loadZones(dsn, cameraID):
+	# read every active zone of a camera from the zones table (psycopg2
+	# is only needed when the zones come from the database)
+	import psycopg2
+	import psycopg2.extras
+	conn = psycopg2.connect(dsn)
+	try:
+		with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+			cursor.execute("""
+				SELECT id, name, zone_type, coordinates, direction
+				FROM zones
+				WHERE camera_id = %s AND is_active = TRUE
+				ORDER BY id
+			""", (cameraID,))
+			return [dict(row) for row in cursor.fetchall()]
+	finally:
+		conn.close()
+
+class ZoneCounter(_ZoneCounter):
+	# the shared engine plus this script's camelCase entry points: an
+	# update(objectIDs, centroids) call returns the frame's events as
+	# (objectID, zone index, +1 for in or -1 for out), .points holds
+	# every zone's outline and counts() the per-zone totals
+
+	@classmethod
+	def fromConfig(cls, config, cameraID=None):
+		# build the counter from the zones table when a database is
+		# configured, otherwise from the "Zones" list in config.json;
+		# None means "no zones" (use the default center line)
+		zones = config.get("Zones") or []
+		if config.get("Zones_DB") and cameraID is not None:
+			zones = loadZones(config["Zones_DB"], cameraID)
+			logger.info("Loaded {} active zone(s) for camera {}".format(len(zones), cameraID))
+		return cls(zones) if zones else None
+
+	def roi(self, W, H, margin=0):
+		# union bounding box (startX, startY, endX, endY) of every zone,
+		# grown by margin pixels on each side and clipped to the W x H
+		# frame -- people are only detected inside it, so the margin has
+		# to leave room for a whole person approaching a line
+		(x1, y1, x2, y2) = self.bounds()
+		startX, startY = max(int(np.floor(x1 - margin)), 0), max(int(np.floor(y1 - margin)), 0)
+		endX, endY = min(int(np.ceil(x2 + margin)), W), min(int(np.ceil(y2 + margin)), H)
+		if endX <= startX or endY <= startY:
+			# the zones lie outside the frame: fall back to all of it
+			return (0, 0, W, H)
+		return (startX, startY, endX, endY)
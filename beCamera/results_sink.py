@@ -0,0 +1,397 @@
+"""
+Buffered Counting Results Writer
+Collects counting events from every camera in a bounded in-memory buffer and
+writes them to counting_results in bulk with COPY FROM STDIN, spooling them
+to disk while the database is down or lagging
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+import psycopg2
+
+from spool import EventSpool
+
+logger = logging.getLogger(__name__)
+
+COPY_COLUMNS = ("camera_id", "zone_id", "timestamp", "count_in", "count_out",
+                "total_count", "confidence", "frame_data", "event_id")
+
+@dataclass
+class CountingRow:
+    """One counting_results row waiting to be written"""
+    camera_id: int
+    zone_id: int
+    timestamp: datetime
+    count_in: int = 0
+    count_out: int = 0
+    total_count: int = 0
+    confidence: Optional[float] = None
+    frame_data: Dict = field(default_factory=dict)
+    # Idempotency key: a row written twice (replay after an unacknowledged
+    # commit) is only stored once
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    queued_at: float = field(default_factory=time.monotonic)
+
+    def to_record(self) -> tuple:
+        """The row as COPY column values"""
+        return (self.camera_id, self.zone_id, self.timestamp.isoformat(), self.count_in, self.count_out,
+                self.total_count, "" if self.confidence is None else round(self.confidence, 4),
+                json.dumps(self.frame_data, separators=(",", ":")), self.event_id)
+
+    def to_dict(self) -> Dict:
+        """The row as a spool record"""
+        return {
+            "camera_id": self.camera_id,
+            "zone_id": self.zone_id,
+            "timestamp": self.timestamp.isoformat(),
+            "count_in": self.count_in,
+            "count_out": self.count_out,
+            "total_count": self.total_count,
+            "confidence": self.confidence,
+            "frame_data": self.frame_data,
+            "event_id": self.event_id
+        }
+
+    @classmethod
+    def from_dict(cls, record: Dict) -> "CountingRow":
+        return cls(**{**record, "timestamp": datetime.fromisoformat(record["timestamp"])})
+
+class CountingResultsSink:
+    """Buffers counting rows and flushes them with one COPY per batch
+
+    submit() only appends to the buffer, so it is safe to call from worker
+    threads and the event loop. A flusher thread writes the buffer once
+    flush_rows rows are waiting or the oldest row is flush_interval seconds
+    old. The buffer holds at most max_rows rows; beyond that new rows are
+    dropped (and counted) instead of growing memory.
+
+    With a spool, a batch that fails to write, or the whole backlog once
+    spill_rows rows are waiting (the database is lagging), is appended to
+    the on-disk spool instead, and every newer row follows it there so the
+    order is kept. The flusher replays the spool oldest first whenever the
+    database accepts writes, backing off exponentially after failures.
+    Without a spool a failed batch goes back to the front of the buffer.
+    Every row carries an event_id and is inserted with ON CONFLICT DO
+    NOTHING, so a batch replayed after an unacknowledged commit is not
+    counted twice.
+    """
+
+    def __init__(self, connect: Callable[[], "psycopg2.extensions.connection"],
+                 flush_rows: int = 500, flush_interval: float = 1.0, max_rows: int = 50000,
+                 max_backoff: float = 30.0, spool: Optional[EventSpool] = None, spill_rows: int = 5000):
+        self.connect = connect
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.max_backoff = max_backoff
+        self.spool = spool
+        self.spill_rows = spill_rows
+        self.buffer: Deque[CountingRow] = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+        # Durations of the last flushes: COPY+commit time and the age of the
+        # oldest row when it was committed (event-to-database latency)
+        self.flush_ms: Deque[float] = deque(maxlen=200)
+        self.lag_ms: Deque[float] = deque(maxlen=200)
+        # Event time of the oldest row not yet replayed from the spool
+        self.replay_from: Optional[datetime] = None
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "duplicates": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "size_flushes": 0,
+            "time_flushes": 0,
+            "spooled": 0,
+            "replayed": 0,
+            "errors": 0,
+            "max_buffered": 0
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["CountingResultsSink"]:
+        """Build a sink from RESULTS_* settings, or None when results are not persisted"""
+        if os.getenv("RESULTS_SINK_ENABLED", "false").lower() != "true":
+            return None
+
+        def connect():
+            return psycopg2.connect(
+                host=os.getenv("DB_HOST", "localhost"),
+                port=os.getenv("DB_PORT", "5432"),
+                database=os.getenv("DB_NAME", "people_counting_db"),
+                user=os.getenv("DB_USER", "postgres"),
+                password=os.getenv("DB_PASSWORD", "dev_password")
+            )
+        spool = None
+        if os.getenv("RESULTS_SPOOL_DIR"):
+            spool = EventSpool(os.getenv("RESULTS_SPOOL_DIR"),
+                               segment_bytes=int(os.getenv("RESULTS_SPOOL_SEGMENT_MB", "16")) * 1024 * 1024,
+                               fsync_records=int(os.getenv("RESULTS_SPOOL_FSYNC_ROWS", "500")),
+                               fsync_interval=float(os.getenv("RESULTS_SPOOL_FSYNC_MS", "200")) / 1000)
+        return cls(connect,
+                   flush_rows=int(os.getenv("RESULTS_FLUSH_ROWS", "500")),
+                   flush_interval=float(os.getenv("RESULTS_FLUSH_INTERVAL_MS", "1000")) / 1000,
+                   max_rows=int(os.getenv("RESULTS_BUFFER_MAX_ROWS", "50000")),
+                   spool=spool,
+                   spill_rows=int(os.getenv("RESULTS_SPILL_ROWS", "5000")))
+
+    def start(self):
+        """Start the flusher thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="results_sink", daemon=True)
+        self.thread.start()
+        logger.info(f"Counting results sink started (flush at {self.flush_rows} rows "
+                    f"or {self.flush_interval * 1000:.0f}ms, buffer {self.max_rows} rows"
+                    f"{', spool ' + self.spool.directory if self.spool else ''})")
+
+    def stop(self):
+        """Stop the flusher thread after a final flush (blocking)
+
+        Rows that cannot be written go to the spool, if any, and are
+        replayed after the next start.
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.spool is not None:
+            self.spool.close()
+        if self.buffer:
+            logger.warning(f"Counting results sink stopped with {len(self.buffer)} unwritten rows")
+
+    def submit(self, row: CountingRow) -> bool:
+        """Queue a row for writing; False if the buffer is full and the row was dropped"""
+        with self.condition:
+            self.stats["submitted"] += 1
+            if len(self.buffer) >= self.max_rows:
+                self.stats["dropped"] += 1
+                return False
+            self.buffer.append(row)
+            if len(self.buffer) > self.stats["max_buffered"]:
+                self.stats["max_buffered"] = len(self.buffer)
+            # Wake the flusher to time the first row or write a full batch
+            if len(self.buffer) == 1 or len(self.buffer) >= self.flush_rows:
+                self.condition.notify()
+        return True
+
+    def get_status(self) -> Dict:
+        """Get buffer occupancy, throughput counters, flush latency percentiles
+        and the spool's size and replay lag"""
+        with self.condition:
+            buffered = len(self.buffer)
+            oldest = self.buffer[0].queued_at if self.buffer else None
+        status = {
+            "buffered": buffered,
+            "max_rows": self.max_rows,
+            "oldest_age_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest else 0.0,
+            "flush_rows": self.flush_rows,
+            "flush_interval_ms": round(self.flush_interval * 1000),
+            "flush_ms": _percentiles(self.flush_ms),
+            "lag_ms": _percentiles(self.lag_ms),
+            "stats": dict(self.stats),
+            "spool": None
+        }
+        if self.spool is not None:
+            replay_from = self.replay_from
+            status["spool"] = {
+                **self.spool.get_status(),
+                "replay_lag_ms": round((datetime.now() - replay_from).total_seconds() * 1000, 1)
+                if replay_from else 0.0
+            }
+        return status
+
+    def _write(self, batch: List[CountingRow]) -> int:
+        """Write a batch to counting_results in one transaction; returns the
+        number of new rows (rows whose event_id is already stored are skipped)
+
+        COPY cannot skip conflicts, so the batch is copied into a temporary
+        staging table and moved over with INSERT ... ON CONFLICT DO NOTHING.
+        """
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for row in batch:
+            writer.writerow(row.to_record())
+        data.seek(0)
+
+        started = time.monotonic()
+        columns = ", ".join(COPY_COLUMNS)
+        try:
+            if self.conn is None or self.conn.closed:
+                self.conn = self.connect()
+                with self.conn.cursor() as cursor:
+                    cursor.execute(f"""
+                        CREATE TEMP TABLE counting_results_staging ON COMMIT DELETE ROWS AS
+                        SELECT {columns} FROM counting_results WITH NO DATA
+                    """)
+                self.conn.commit()
+            with self.conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY counting_results_staging ({columns}) FROM STDIN WITH (FORMAT csv)", data)
+                cursor.execute(f"""
+                    INSERT INTO counting_results ({columns})
+                    SELECT {columns} FROM counting_results_staging
+                    ON CONFLICT DO NOTHING
+                """)
+                inserted = cursor.rowcount
+            self.conn.commit()
+        except Exception:
+            # Drop the connection; it may be broken or mid-transaction
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                finally:
+                    self.conn = None
+            raise
+        self.flush_ms.append((time.monotonic() - started) * 1000)
+        self.stats["written"] += inserted
+        self.stats["duplicates"] += len(batch) - inserted
+        self.stats["flushes"] += 1
+        return inserted
+
+    def _requeue(self, batch: List[CountingRow]):
+        """Put a failed batch back in front of newer rows, dropping the newest over max_rows"""
+        with self.condition:
+            self.buffer.extendleft(reversed(batch))
+            while len(self.buffer) > self.max_rows:
+                self.buffer.pop()
+                self.stats["dropped"] += 1
+
+    def _spill(self, batch: List[CountingRow]):
+        """Append rows to the spool behind everything already spooled"""
+        if self.spool.pending == 0:
+            self.replay_from = batch[0].timestamp
+        self.spool.append([row.to_dict() for row in batch])
+        self.stats["spooled"] += len(batch)
+
+    def _replay(self) -> bool:
+        """Write the oldest spooled batch; False if the database refused it"""
+        records, position = self.spool.read(self.flush_rows)
+        if not records:
+            # Only unreadable records were left; move past them
+            self.spool.ack(position, self.spool.pending)
+            self.replay_from = None
+            return True
+        try:
+            self._write([CountingRow.from_dict(record) for record in records])
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Failed to replay {len(records)} spooled counting results: {e}")
+            return False
+        self.spool.ack(position, len(records))
+        self.stats["replayed"] += len(records)
+        oldest = self.spool.peek() if self.spool.pending else None
+        self.replay_from = datetime.fromisoformat(oldest["timestamp"]) if oldest else None
+        if oldest is None:
+            logger.info("Spooled counting results replayed")
+        return True
+
+    def _run(self):
+        backoff = 0.0
+        retry_at = 0.0
+        while True:
+            with self.condition:
+                # Wait until a batch is due (full, or its oldest row is
+                # flush_interval old), the spool can be replayed or needs an
+                # fsync, or stop() was called. Database writes wait out the
+                # retry backoff; spilling to the spool does not.
+                while self.running:
+                    now = time.monotonic()
+                    spooling = self.spool is not None
+                    if spooling and len(self.buffer) >= self.spill_rows:
+                        break
+                    if now >= retry_at and (len(self.buffer) >= self.flush_rows or
+                                            (spooling and self.spool.pending > 0)):
+                        break
+                    due = float("inf")
+                    if self.buffer:
+                        due = self.buffer[0].queued_at + self.flush_interval
+                        if not spooling:
+                            due = max(due, retry_at)
+                    if spooling and self.spool.pending > 0:
+                        due = min(due, retry_at)
+                    if spooling and self.spool.next_sync() is not None:
+                        due = min(due, self.spool.next_sync())
+                    if due <= now:
+                        break
+                    self.condition.wait(due - now if due != float("inf") else None)
+                now = time.monotonic()
+                stopping = not self.running
+                size_flush = len(self.buffer) >= self.flush_rows
+                # Spool (in order, behind anything already spooled) while
+                # the spool is draining, the database is backing off, or the
+                # backlog shows the database is not keeping up
+                spill = self.spool is not None and (self.spool.pending > 0 or now < retry_at or
+                                                    len(self.buffer) >= self.spill_rows)
+                take = len(self.buffer) if spill else min(len(self.buffer), self.flush_rows)
+                batch = [self.buffer.popleft() for _ in range(take)]
+                if stopping and not batch:
+                    return
+
+            failed = False
+            if batch and spill:
+                self._spill(batch)
+            elif batch:
+                try:
+                    self._write(batch)
+                    self.lag_ms.append((time.monotonic() - min(row.queued_at for row in batch)) * 1000)
+                    self.stats["size_flushes" if size_flush else "time_flushes"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Failed to write {len(batch)} counting results: {e}")
+                    failed = True
+                    if self.spool is not None:
+                        self._spill(batch)
+                    else:
+                        self._requeue(batch)
+                        if stopping:
+                            # No retries on shutdown; the rows stay in the buffer
+                            return
+
+            if self.spool is not None:
+                next_sync = self.spool.next_sync()
+                if next_sync is not None and (stopping or time.monotonic() >= next_sync):
+                    self.spool.sync()
+                # Replay spooled rows oldest first (not on shutdown: they keep
+                # for the next start)
+                if not failed and not stopping and self.spool.pending > 0 and time.monotonic() >= retry_at:
+                    failed = not self._replay()
+                    if not failed:
+                        backoff = 0.0
+
+            if failed:
+                backoff = min(max(backoff * 2, self.flush_interval), self.max_backoff)
+                retry_at = time.monotonic() + backoff
+            elif batch and not spill:
+                backoff = 0.0
+
+def _percentiles(samples: Deque[float]) -> Dict:
+    """p50/p95/max of recent latency samples in milliseconds"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        "max": round(ordered[-1], 2)
+    }
+
+# Global sink instance (None unless RESULTS_SINK_ENABLED)
+results_sink = CountingResultsSink.from_env()
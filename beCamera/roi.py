@@ -0,0 +1,83 @@
+"""
+Region of Interest
+Crops each camera's frames to its counting zones before detection
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from zones import ZoneCounter, zone_points
+
+logger = logging.getLogger(__name__)
+
+class RegionOfInterest:
+    """Bounding box of a camera's zones plus a margin, in frame pixels
+
+    The detector only sees this part of the frame. Its network input size is
+    fixed, so the crop saves the resize, blob and shared-memory copies of the
+    discarded pixels and gives the zones more of the network's resolution.
+    Boxes come back relative to the crop; to_frame() shifts them back.
+
+    The crop rectangle is clipped to the frame once per frame size; zones
+    entirely outside the frame fall back to the full frame.
+    """
+
+    def __init__(self, points: List[Tuple[float, float]], margin: float = 50.0):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.low = points.min(axis=0) - margin
+        self.high = points.max(axis=0) + margin
+        self.shape: Optional[Tuple[int, int]] = None
+        self.rect: Optional[Tuple[int, int, int, int]] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict],
+                    zones: Optional[ZoneCounter] = None) -> Optional["RegionOfInterest"]:
+        """Build a crop from the "roi_crop" section of cameras.config around
+        the camera's zones (or its own "coordinates"), or None if disabled"""
+        if not config or not config.get("enabled", False):
+            return None
+        if config.get("coordinates") is not None:
+            try:
+                points = zone_points(config["coordinates"])
+            except ValueError as e:
+                logger.warning(f"ROI crop coordinates unusable ({e}), detecting on the full frame")
+                return None
+        elif zones is not None:
+            points = [point for outline in zones.points for point in outline]
+        else:
+            logger.warning("ROI crop enabled without zones, detecting on the full frame")
+            return None
+        return cls(points, margin=float(config.get("margin", 50)))
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """View of the frame inside the region (no copy)"""
+        if frame.shape[:2] != self.shape:
+            height, width = frame.shape[:2]
+            x1, y1 = np.clip(np.floor(self.low), 0, [width, height]).astype(int)
+            x2, y2 = np.clip(np.ceil(self.high), 0, [width, height]).astype(int)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                logger.warning(f"ROI outside the {width}x{height} frame, detecting on the full frame")
+                x1, y1, x2, y2 = 0, 0, width, height
+            self.shape = frame.shape[:2]
+            self.rect = (int(x1), int(y1), int(x2), int(y2))
+        x1, y1, x2, y2 = self.rect
+        return frame[y1:y2, x1:x2]
+
+    def to_frame(self, boxes: List) -> List:
+        """Shift boxes detected in the crop back to frame coordinates"""
+        if self.rect is None or not len(boxes):
+            return boxes
+        x1, y1 = self.rect[:2]
+        return (np.asarray(boxes) + np.array([x1, y1, x1, y1])).tolist()
+
+    def snapshot(self) -> Dict:
+        if self.rect is None:
+            return {"rect": None, "frame_ratio": None}
+        x1, y1, x2, y2 = self.rect
+        height, width = self.shape
+        return {
+            "rect": list(self.rect),
+            "frame_ratio": round((x2 - x1) * (y2 - y1) / float(width * height), 3)
+        }
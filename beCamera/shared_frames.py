@@ -0,0 +1,104 @@
+"""
+Shared-memory frame ring buffers
+Lets decoder threads hand frames to inference processes without pickling pixels
+"""
+
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Attached segments kept open per inference process
+MAX_ATTACHED_SEGMENTS = 64
+
+_attached: "OrderedDict[str, shared_memory.SharedMemory]" = OrderedDict()
+# Inference threads of one process share the cache; without the lock two of
+# them could open the same segment twice or evict it under each other
+_attached_lock = threading.Lock()
+
+
+class SharedFrameRing:
+    """Fixed-size ring of frame slots backed by one shared-memory segment.
+
+    Owned by the decoder thread of a single camera. A slot is acquired before
+    a frame is written and released once the inference process is done with
+    it, so a slot is never overwritten while it is being read.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], slots: int = 4, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.slot_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * slots)
+        self.buffer = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def matches(self, frame: np.ndarray) -> bool:
+        """Check whether a frame fits this ring's slot layout"""
+        return frame.shape == self.shape and frame.dtype == self.dtype
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """Get a free slot index, or None if every slot is still in flight"""
+        try:
+            if timeout is None:
+                return self.free_slots.get_nowait()
+            return self.free_slots.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def write(self, slot: int, frame: np.ndarray):
+        """Copy a frame into a slot (the only copy on the handoff path)"""
+        np.copyto(self.buffer[slot], frame)
+
+    def release(self, slot: int):
+        """Return a slot to the free list"""
+        self.free_slots.put(slot)
+
+    def in_flight(self) -> int:
+        return self.slots - self.free_slots.qsize()
+
+    def close(self):
+        """Release and unlink the shared segment"""
+        self.buffer = None
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def attach_frame(shm_name: str, slot: int, shape: Tuple[int, ...], dtype: str = "uint8") -> np.ndarray:
+    """Zero-copy view of a ring slot from inside an inference process"""
+    with _attached_lock:
+        shm = _attached.get(shm_name)
+        if shm is None:
+            # Inference processes share the parent's resource tracker, so attaching
+            # does not transfer ownership; the decoder side unlinks the segment
+            shm = shared_memory.SharedMemory(name=shm_name)
+            _attached[shm_name] = shm
+            while len(_attached) > MAX_ATTACHED_SEGMENTS:
+                _, stale = _attached.popitem(last=False)
+                try:
+                    stale.close()
+                except BufferError:
+                    # A view into it is still alive; let GC reclaim the mapping
+                    pass
+        else:
+            _attached.move_to_end(shm_name)
+
+    dtype = np.dtype(dtype)
+    slot_bytes = int(np.prod(shape)) * dtype.itemsize
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
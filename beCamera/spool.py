@@ -0,0 +1,262 @@
+"""
+On-disk Event Spool
+Append-only, segmented write-ahead log that holds count events while the
+database is unreachable or lagging, and hands them back in order for replay
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length and CRC32 of the payload
+HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE = "cursor"
+
+class EventSpool:
+    """Segmented append-only log of JSON records
+
+    Records are written to numbered segment files of about segment_bytes
+    each as [length][crc32][json payload]. Appends are flushed to the OS
+    immediately and fsync'ed in batches: after fsync_records records or
+    fsync_interval seconds, whichever comes first (sync() also runs when the
+    owner is idle). Readers map segments with mmap and walk them from the
+    persisted cursor; ack() advances the cursor and deletes segments that
+    were read completely. On open, a record torn by a crash at the end of
+    the last segment is truncated away.
+
+    Not safe for concurrent writers from several processes; one owner
+    thread appends and reads (the lock only guards status calls).
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 16 * 1024 * 1024,
+                 fsync_records: int = 500, fsync_interval: float = 0.2):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_records = fsync_records
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.stats = {"appended": 0, "acked": 0, "fsyncs": 0, "corrupt": 0}
+        os.makedirs(directory, exist_ok=True)
+
+        segments = self._segments()
+        self.read_segment, self.read_offset = self._load_cursor(segments)
+        self.write_segment = max(segments[-1], self.read_segment) if segments else self.read_segment
+        self.writer = None
+        self._open_writer()
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.pending = sum(self._count_records(segment, self.read_offset if segment == self.read_segment else 0)
+                           for segment in range(self.read_segment, self.write_segment + 1))
+        if self.pending:
+            logger.info(f"Spool {directory} holds {self.pending} unreplayed records")
+
+    def append(self, records: List[Dict]):
+        """Append records to the current segment (fsync'ed in batches)"""
+        if not records:
+            return
+        data = bytearray()
+        for record in records:
+            payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            data += HEADER.pack(len(payload), zlib.crc32(payload))
+            data += payload
+        self.writer.write(data)
+        self.writer.flush()
+        with self.lock:
+            self.pending += len(records)
+            self.stats["appended"] += len(records)
+        self.unsynced += len(records)
+        if self.unsynced >= self.fsync_records or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+        if self.writer.tell() >= self.segment_bytes:
+            self._roll()
+
+    def sync(self):
+        """fsync records appended since the last sync"""
+        if self.unsynced:
+            os.fsync(self.writer.fileno())
+            self.unsynced = 0
+            self.stats["fsyncs"] += 1
+        self.last_sync = time.monotonic()
+
+    def next_sync(self) -> Optional[float]:
+        """Monotonic time the pending fsync is due, None if nothing is unsynced"""
+        return self.last_sync + self.fsync_interval if self.unsynced else None
+
+    def read(self, max_records: int) -> Tuple[List[Dict], Tuple[int, int]]:
+        """Read up to max_records from the cursor, oldest first
+
+        Returns the records and the position after the last one, to pass to
+        ack() once they have been written elsewhere. Nothing moves until then.
+        """
+        records: List[Dict] = []
+        segment, offset = self.read_segment, self.read_offset
+        while len(records) < max_records:
+            end = self._read_segment(segment, offset, max_records, records)
+            if end is not None:
+                offset = end
+            if len(records) >= max_records or segment >= self.write_segment:
+                break
+            # Segment exhausted (or unreadable past this point): next one
+            segment, offset = segment + 1, 0
+        return records, (segment, offset)
+
+    def ack(self, position: Tuple[int, int], count: int):
+        """Mark everything before position as replayed and delete finished segments"""
+        segment, offset = position
+        for old in range(self.read_segment, segment):
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass
+        self.read_segment, self.read_offset = segment, offset
+        self._save_cursor()
+        with self.lock:
+            self.pending = max(self.pending - count, 0)
+            self.stats["acked"] += count
+
+    def peek(self) -> Optional[Dict]:
+        """The oldest unreplayed record, if any"""
+        records, _ = self.read(1)
+        return records[0] if records else None
+
+    def size_bytes(self) -> int:
+        """Bytes of unreplayed records on disk"""
+        total = 0
+        for segment in range(self.read_segment, self.write_segment + 1):
+            try:
+                total += os.path.getsize(self._path(segment))
+            except FileNotFoundError:
+                continue
+        return max(total - self.read_offset, 0)
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            pending = self.pending
+            stats = dict(self.stats)
+        return {
+            "directory": self.directory,
+            "pending": pending,
+            "bytes": self.size_bytes(),
+            "segments": self.write_segment - self.read_segment + 1,
+            "unsynced": self.unsynced,
+            "stats": stats
+        }
+
+    def close(self):
+        if self.writer is not None:
+            self.sync()
+            self.writer.close()
+            self.writer = None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}{SEGMENT_SUFFIX}")
+
+    def _segments(self) -> List[int]:
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+    def _load_cursor(self, segments: List[int]) -> Tuple[int, int]:
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                segment, offset = (int(v) for v in f.read().split())
+        except (FileNotFoundError, ValueError):
+            return (segments[0] if segments else 0), 0
+        if segments and segment < segments[0]:
+            # The cursor's segment was already deleted
+            return segments[0], 0
+        return segment, offset
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{self.read_segment} {self.read_offset}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _open_writer(self):
+        path = self._path(self.write_segment)
+        if os.path.exists(path):
+            # Cut a record torn by a crash mid-append
+            valid = self._valid_length(path)
+            if valid < os.path.getsize(path):
+                logger.warning(f"Truncating torn record at {path}:{valid}")
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+        self.writer = open(path, "ab")
+
+    def _roll(self):
+        self.sync()
+        self.writer.close()
+        self.write_segment += 1
+        self.writer = open(self._path(self.write_segment), "ab")
+
+    def _valid_length(self, path: str) -> int:
+        """Length of the prefix of a segment made of complete, intact records"""
+        offset = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        while offset + HEADER.size <= len(data):
+            length, crc = HEADER.unpack_from(data, offset)
+            end = offset + HEADER.size + length
+            if end > len(data) or zlib.crc32(data[offset + HEADER.size:end]) != crc:
+                break
+            offset = end
+        return offset
+
+    def _read_segment(self, segment: int, offset: int, limit: int, records: List[Dict]) -> Optional[int]:
+        """Decode records of a segment from offset into records until it holds limit
+
+        Returns the offset after the last decoded record, or None when the
+        rest of the segment is unreadable.
+        """
+        try:
+            f = open(self._path(segment), "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= offset:
+                return offset
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as view:
+                while len(records) < limit and offset + HEADER.size <= size:
+                    length, crc = HEADER.unpack_from(view, offset)
+                    end = offset + HEADER.size + length
+                    if end > size:
+                        # Partially written record at the tail
+                        break
+                    payload = view[offset + HEADER.size:end]
+                    if zlib.crc32(payload) != crc:
+                        logger.error(f"Corrupt spool record at {self._path(segment)}:{offset}, "
+                                     f"skipping the rest of the segment")
+                        self.stats["corrupt"] += 1
+                        return None
+                    records.append(json.loads(payload))
+                    offset = end
+        return offset
+
+    def _count_records(self, segment: int, offset: int) -> int:
+        """Number of complete records in a segment after offset (headers only)"""
+        try:
+            with open(self._path(segment), "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        count, position = 0, 0
+        while position + HEADER.size <= len(data):
+            length, _ = HEADER.unpack_from(data, position)
+            position += HEADER.size + length
+            if position > len(data):
+                break
+            count += 1
+        return count
@@ -4,18 +4,86 @@ Handles concurrent processing of multiple camera streams
 """
 
 import asyncio
+import heapq
 import logging
+import multiprocessing
+import os
 from typing import Dict, List, Optional, Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import partial
 import cv2
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 import threading
 import time
+from shared_frames import SharedFrameRing, attach_frame
+from inference import BatchInferenceEngine
+from detector import PRECISIONS, Detector, default_detector, warm_up_default_detectors
+from model_registry import ModelBinding, ModelRegistry, ModelSpec, model_registry, process_model_cache
+from results_sink import CountingResultsSink, CountingRow, results_sink
+from rate_control import CpuBudget, FrameRateController
+from motion_gate import MotionGate
+from roi import RegionOfInterest
+from zones import TrackLinker, ZoneCounter
+from frame_grabber import FrameGrabber, is_live_source
+from reconnect import ReconnectPolicy
 
 logger = logging.getLogger(__name__)
 
+WORKER_MODES = ("thread", "process")
+
+class WorkerPoolFullError(Exception):
+    """Raised when no worker is free and the pending queue is at capacity"""
+    
+    def __init__(self, message: str, retry_after: int = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def analyze_frame(frame: np.ndarray, detector: Optional[Detector] = None) -> Dict:
+    """Analyze a single frame with the camera's or the process's detector
+    (or simulate AI processing)"""
+    detector = detector or default_detector()
+    if detector is not None:
+        detections = detector.detect(frame)
+        return {
+            "people_count": detections["people_count"],
+            "boxes": detections["boxes"].tolist(),
+            "confidences": [round(float(c), 4) for c in detections["confidences"]]
+        }
+    
+    # No model configured: simulate AI processing
+    # In real implementation, this would run YOLO or other AI models
+    
+    # Convert to grayscale for simple processing
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    # Simulate people detection (just count non-zero pixels as example)
+    # In real implementation, this would be actual AI inference
+    people_count = np.count_nonzero(gray > 128) // 1000  # Simplified
+    
+    return {"people_count": int(people_count)}
+
+def _warm_up_process() -> int:
+    """Run once per inference process so spawning, model loading and the
+    first (slow) inference happen at startup"""
+    warm_up_default_detectors()
+    return os.getpid()
+
+def _analyze_shared_frame(shm_name: str, slot: int, shape: tuple, dtype: str,
+                          model: Optional[Dict] = None, precision: str = "fp32") -> Dict:
+    """Inference process entry point: analyze a frame in place in shared memory
+    
+    model is the camera's ModelSpec as a dict; each inference process keeps
+    its own cache of loaded models. Without one, the process's default
+    detector for the camera's precision is used.
+    """
+    if model:
+        detector = process_model_cache().get(ModelSpec(**model))
+    else:
+        detector = default_detector(precision)
+    return analyze_frame(attach_frame(shm_name, slot, shape, dtype), detector)
+
 @dataclass
 class CameraTask:
     """Camera processing task"""
@@ -26,27 +94,153 @@ class CameraTask:
     start_time: Optional[datetime] = None
     error_count: int = 0
     last_error: Optional[str] = None
+    dropped_frames: int = 0
+    priority: int = 0
+    queued_at: Optional[float] = None
+    target_fps: float = 10.0
+    # Seconds a due frame may run late before the slot is skipped
+    # (defaults to one frame interval)
+    deadline: Optional[float] = None
+    processed_frames: int = 0
+    deadline_misses: int = 0
+    skipped_frames: int = 0
+    # Per-camera settings from the cameras.config JSONB column
+    config: Dict = field(default_factory=dict, repr=False)
+    controller: Optional[FrameRateController] = field(default=None, repr=False)
+    motion_gate: Optional[MotionGate] = field(default=None, repr=False)
+    # In/out counting for every active zone of the camera, on tracks linked
+    # from the result boxes (None: the camera has no zones)
+    zones: Optional[ZoneCounter] = field(default=None, repr=False)
+    tracks: Optional[TrackLinker] = field(default=None, repr=False)
+    # Whether the "no boxes, no crossings" warning was logged for this task
+    zones_without_boxes: bool = False
+    # Detection crop around the camera's zones (None: full frame)
+    roi: Optional[RegionOfInterest] = field(default=None, repr=False)
+    grabber: Optional[FrameGrabber] = field(default=None, repr=False)
+    # Model registry binding (None: the process default detector)
+    model: Optional[ModelBinding] = field(default=None, repr=False)
+    
+    @property
+    def precision(self) -> str:
+        """Inference precision ("fp32" or "int8") from the camera config
+        
+        An int8 camera falls back to fp32 when no quantized model is configured.
+        """
+        precision = self.config.get("precision", "fp32")
+        return precision if precision in PRECISIONS else "fp32"
+    
+    @property
+    def detector(self) -> Optional[Detector]:
+        """Detector for this camera (None: the engine's default fp32 detector)"""
+        if self.model is not None and self.model.detector is not None:
+            return self.model.detector
+        if self.precision != "fp32":
+            return default_detector(self.precision)
+        return None
+    
+    @property
+    def frame_interval(self) -> float:
+        if self.controller is not None:
+            return self.controller.interval
+        return 1.0 / self.target_fps if self.target_fps > 0 else 1.0
+    
+    @property
+    def frame_deadline(self) -> float:
+        return self.deadline if self.deadline is not None else self.frame_interval
 
 @dataclass
 class Worker:
-    """Worker instance"""
+    """Worker instance serving up to streams_per_worker camera streams"""
     worker_id: str
     status: str = "idle"
-    current_task: Optional[CameraTask] = None
+    tasks: List[CameraTask] = field(default_factory=list)
     start_time: Optional[datetime] = None
+    last_frame_time: Optional[datetime] = None
     processed_frames: int = 0
     error_count: int = 0
+    # Set whenever the worker's stream list changes so its scheduler re-plans
+    wakeup: threading.Event = field(default_factory=threading.Event, repr=False)
+    
+    @property
+    def load_fps(self) -> float:
+        return sum(task.target_fps for task in self.tasks)
+
+@dataclass
+class StreamState:
+    """Per-stream scheduling state owned by a worker thread"""
+    task: CameraTask
+    grabber: FrameGrabber
+    next_due: float
+    last_served: int = 0
+    ring: Optional[SharedFrameRing] = None
+    # A frame of this stream is waiting in the batch inference engine
+    inflight: bool = False
+    submitted_at: float = 0.0
 
 class CameraWorkerPool:
     """Worker pool for camera stream processing"""
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, mode: str = "thread",
+                 inference_processes: Optional[int] = None, ring_slots: int = 4,
+                 max_pending: int = 16, streams_per_worker: int = 8,
+                 inference_engine: Optional[BatchInferenceEngine] = None,
+                 cpu_budget: Optional[float] = None, min_fps: float = 0.5,
+                 reconnect_policy: Optional[ReconnectPolicy] = None,
+                 model_registry: Optional[ModelRegistry] = None,
+                 results_sink: Optional[CountingResultsSink] = None):
+        if mode not in WORKER_MODES:
+            raise ValueError(f"Invalid worker pool mode: {mode}")
         self.max_workers = max_workers
+        self.streams_per_worker = streams_per_worker
+        # "thread": decode and analyze on the worker thread
+        # "process": worker threads only decode; analysis runs in a process
+        # pool reading frames from shared-memory rings (bypasses the GIL)
+        self.mode = mode
+        self.inference_processes = inference_processes or os.cpu_count() or 1
+        self.ring_slots = ring_slots
+        self.process_pool: Optional[ProcessPoolExecutor] = None
+        # Thread mode with a detection model: frames from all workers are
+        # batched into shared forward passes
+        self.inference_engine = inference_engine if mode == "thread" else None
         self.workers: Dict[str, Worker] = {}
         self.tasks: Dict[int, CameraTask] = {}
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # One long-lived thread per worker multiplexes its camera streams;
+        # capture and analysis block, so they must never run on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="camera_worker")
         self.running = False
         self.lock = threading.Lock()
+        # Frame and error counters are bumped by worker threads and by the
+        # inference done-callbacks (process pool and batch threads) alike
+        self.counter_lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.latest_results: Dict[int, Dict] = {}
+        self.result_handlers: List[Callable[[int, Dict], None]] = []
+        self.serve_seq = 0
+        
+        # Adaptive rate control: per-camera controllers share a CPU budget
+        self.min_fps = min_fps
+        self.cpu_budget = CpuBudget(cores=cpu_budget or (os.cpu_count() or 1) * 0.8)
+        
+        # Live streams that drop are reopened by their grabber instead of
+        # ending the task
+        self.reconnect_policy = reconnect_policy or ReconnectPolicy()
+        
+        # Per-camera models from the ai_models table, hot-swapped on change
+        self.model_registry = model_registry
+        
+        # Cameras with zones get every frame's per-zone counts (crossings
+        # and people inside) written to counting_results in buffered COPY
+        # batches
+        self.results_sink = results_sink
+        
+        # Bounded priority queue of tasks waiting for a free worker:
+        # entries are (-priority, sequence, task) so higher priority and
+        # then older tasks are drained first
+        self.max_pending = max_pending
+        self.pending: List[tuple] = []
+        self.pending_seq = 0
+        self.queue_stats = {"enqueued": 0, "dequeued": 0, "rejected": 0,
+                            "total_wait": 0.0, "max_wait": 0.0}
         
         # Initialize workers
         for i in range(max_workers):
@@ -56,7 +250,30 @@ class CameraWorkerPool:
     async def start(self):
         """Start the worker pool"""
         self.running = True
-        logger.info(f"Worker pool started with {self.max_workers} workers")
+        self.loop = asyncio.get_running_loop()
+        if self.mode == "process":
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=self.inference_processes,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            # Spawn every process and load/warm up its detector now instead
+            # of on the first frames, which would stall the decoder threads
+            warm_ups = [self.process_pool.submit(_warm_up_process) for _ in range(self.inference_processes)]
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in warm_ups))
+            logger.info(f"Inference process pool started with {self.inference_processes} processes")
+        if self.inference_engine is not None:
+            # Warming up the detector blocks; keep it off the event loop
+            await asyncio.to_thread(self.inference_engine.start)
+            logger.info(f"Batch inference engine started (max batch {self.inference_engine.max_batch_size})")
+        if self.model_registry is not None:
+            await self.model_registry.start()
+        if self.results_sink is not None:
+            self.results_sink.start()
+        logger.info(f"Worker pool started with {self.max_workers} workers "
+                    f"x {self.streams_per_worker} streams")
+        
+        for worker in self.workers.values():
+            self.executor.submit(self._run_worker, worker)
         
         # Start monitoring loop
         asyncio.create_task(self._monitor_workers())
@@ -64,21 +281,59 @@ class CameraWorkerPool:
     async def stop(self):
         """Stop the worker pool"""
         self.running = False
-        self.executor.shutdown(wait=True)
+        for worker in self.workers.values():
+            worker.wakeup.set()
+        # Worker threads exit after their current frame; wait for them off the loop
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
+        if self.process_pool is not None:
+            await asyncio.to_thread(self.process_pool.shutdown, wait=True)
+            self.process_pool = None
+        if self.inference_engine is not None:
+            await asyncio.to_thread(self.inference_engine.stop)
+        if self.model_registry is not None:
+            await self.model_registry.stop()
+        if self.results_sink is not None:
+            # Final flush of the buffered rows
+            await asyncio.to_thread(self.results_sink.stop)
         logger.info("Worker pool stopped")
     
-    def add_camera_task(self, camera_id: int, stream_url: str) -> bool:
-        """Add a camera task to the queue"""
+    def add_camera_task(self, camera_id: int, stream_url: str, priority: int = 0,
+                        target_fps: Optional[float] = None, deadline: Optional[float] = None,
+                        config: Optional[Dict] = None) -> bool:
+        """Add a camera task to the queue
+        
+        Raises WorkerPoolFullError when every worker is busy and the pending
+        queue is full.
+        """
         with self.lock:
             if camera_id in self.tasks:
                 logger.warning(f"Camera {camera_id} already has a task")
                 return False
             
-            task = CameraTask(camera_id=camera_id, stream_url=stream_url)
-            self.tasks[camera_id] = task
+            task = CameraTask(camera_id=camera_id, stream_url=stream_url, priority=priority,
+                              deadline=deadline, config=config or {})
+            if target_fps:
+                task.target_fps = float(target_fps)
+            task.controller = FrameRateController(max_fps=task.target_fps, min_fps=self.min_fps)
+            task.motion_gate = MotionGate.from_config(task.config.get("motion_gate"))
+            task.zones = ZoneCounter.from_zones(task.config.get("zones"))
+            if task.zones is not None:
+                task.tracks = TrackLinker.from_config(task.config.get("zone_tracking"))
+            task.roi = RegionOfInterest.from_config(task.config.get("roi_crop"), task.zones)
+            if self.model_registry is not None:
+                task.model = self.model_registry.bind(camera_id, task.precision)
+            
+            # Try to assign to available worker, otherwise queue it
+            if not self._assign_task_to_worker(task):
+                if len(self.pending) >= self.max_pending:
+                    self.queue_stats["rejected"] += 1
+                    raise WorkerPoolFullError(
+                        f"Worker pool at capacity ({self.max_workers} workers, "
+                        f"{len(self.pending)} pending)"
+                    )
+                self._enqueue_task(task)
             
-            # Try to assign to available worker
-            self._assign_task_to_worker(task)
+            self.tasks[camera_id] = task
             return True
     
     def remove_camera_task(self, camera_id: int) -> bool:
@@ -89,14 +344,29 @@ class CameraWorkerPool:
             
             task = self.tasks[camera_id]
             if task.worker_id:
-                # Stop worker if it's processing this task
+                # Detach from its worker; the worker thread releases the stream
                 worker = self.workers.get(task.worker_id)
-                if worker and worker.current_task and worker.current_task.camera_id == camera_id:
-                    worker.status = "idle"
-                    worker.current_task = None
+                if worker:
+                    self._detach_task(worker, task)
+            
+            if task.status == "queued":
+                self.pending = [entry for entry in self.pending if entry[2] is not task]
+                heapq.heapify(self.pending)
             
             del self.tasks[camera_id]
+            self.latest_results.pop(camera_id, None)
+            if self.model_registry is not None:
+                self.model_registry.unbind(camera_id)
+            self._drain_pending()
             return True
+
+    def add_result_handler(self, handler: Callable[[int, Dict], None]):
+        """Register a callback invoked on the event loop for every frame result"""
+        self.result_handlers.append(handler)
+
+    def get_latest_result(self, camera_id: int) -> Optional[Dict]:
+        """Get the most recent analysis result for a camera"""
+        return self.latest_results.get(camera_id)
     
     def get_task_status(self, camera_id: int) -> Optional[Dict]:
         """Get task status"""
@@ -111,9 +381,61 @@ class CameraWorkerPool:
                 "worker_id": task.worker_id,
                 "start_time": task.start_time.isoformat() if task.start_time else None,
                 "error_count": task.error_count,
-                "last_error": task.last_error
+                "last_error": task.last_error,
+                "dropped_frames": task.dropped_frames,
+                "priority": task.priority,
+                "target_fps": task.target_fps,
+                "rate": task.controller.snapshot() if task.controller else None,
+                "processed_frames": task.processed_frames,
+                "skipped_frames": task.skipped_frames,
+                "motion_gate": task.motion_gate.snapshot() if task.motion_gate else None,
+                "zones": task.zones.snapshot() if task.zones else None,
+                "roi": task.roi.snapshot() if task.roi else None,
+                "capture": task.grabber.snapshot() if task.grabber else None,
+                "deadline_misses": task.deadline_misses,
+                "queue_wait_seconds": round(time.monotonic() - task.queued_at, 3)
+                if task.status == "queued" and task.queued_at else None
             }
     
+    def get_camera_status(self, camera_id: int) -> Optional[Dict]:
+        """Get processing status for a camera (alias used by the API)"""
+        return self.get_task_status(camera_id)
+    
+    def get_queue_status(self) -> Dict:
+        """Get pending queue depth and wait time metrics"""
+        with self.lock:
+            now = time.monotonic()
+            waits = [now - entry[2].queued_at for entry in self.pending]
+            dequeued = self.queue_stats["dequeued"]
+            return {
+                "depth": len(self.pending),
+                "capacity": self.max_pending,
+                "oldest_wait_seconds": round(max(waits), 3) if waits else 0.0,
+                "avg_wait_seconds": round(self.queue_stats["total_wait"] / dequeued, 3) if dequeued else 0.0,
+                "max_wait_seconds": round(self.queue_stats["max_wait"], 3),
+                "enqueued": self.queue_stats["enqueued"],
+                "dequeued": dequeued,
+                "rejected": self.queue_stats["rejected"]
+            }
+    
+    def get_status(self) -> Dict:
+        """Get overall worker pool status"""
+        workers = self.get_worker_status()
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "streams_per_worker": self.streams_per_worker,
+            "total_workers": len(workers),
+            "idle_workers": len([w for w in workers if w["status"] == "idle"]),
+            "busy_workers": len([w for w in workers if w["status"] == "busy"]),
+            "workers": workers,
+            "queue": self.get_queue_status(),
+            "cpu_budget": self.cpu_budget.snapshot(),
+            "inference": self.inference_engine.get_stats() if self.inference_engine else None,
+            "models": self.model_registry.get_status() if self.model_registry else None,
+            "results": self.results_sink.get_status() if self.results_sink else None
+        }
+    
     def get_worker_status(self) -> List[Dict]:
         """Get all worker statuses"""
         with self.lock:
@@ -121,97 +443,418 @@ class CameraWorkerPool:
                 {
                     "worker_id": worker.worker_id,
                     "status": worker.status,
-                    "current_task": worker.current_task.camera_id if worker.current_task else None,
+                    "camera_ids": [task.camera_id for task in worker.tasks],
+                    "stream_count": len(worker.tasks),
+                    "load_fps": worker.load_fps,
                     "start_time": worker.start_time.isoformat() if worker.start_time else None,
+                    "last_frame_time": worker.last_frame_time.isoformat() if worker.last_frame_time else None,
                     "processed_frames": worker.processed_frames,
                     "error_count": worker.error_count
                 }
                 for worker in self.workers.values()
             ]
     
-    def _assign_task_to_worker(self, task: CameraTask):
-        """Assign task to available worker"""
-        for worker_id, worker in self.workers.items():
-            if worker.status == "idle":
-                worker.status = "busy"
-                worker.current_task = task
-                worker.start_time = datetime.now()
-                task.worker_id = worker_id
-                task.status = "running"
-                task.start_time = datetime.now()
-                
-                # Start processing in background
-                asyncio.create_task(self._process_camera_stream(task))
-                logger.info(f"Assigned camera {task.camera_id} to worker {worker_id}")
+    def _assign_task_to_worker(self, task: CameraTask) -> bool:
+        """Assign task to the least loaded worker with a free stream slot"""
+        candidates = [
+            worker for worker in self.workers.values()
+            if worker.status != "stalled" and len(worker.tasks) < self.streams_per_worker
+        ]
+        if not candidates:
+            return False
+        
+        worker = min(candidates, key=lambda w: (len(w.tasks), w.load_fps))
+        if not worker.tasks:
+            worker.start_time = datetime.now()
+        worker.tasks.append(task)
+        worker.status = "busy"
+        task.worker_id = worker.worker_id
+        task.status = "running"
+        task.start_time = datetime.now()
+        
+        # Wake the worker's scheduler so it opens the new stream
+        worker.wakeup.set()
+        logger.info(f"Assigned camera {task.camera_id} to worker {worker.worker_id} "
+                    f"({len(worker.tasks)}/{self.streams_per_worker} streams)")
+        return True
+    
+    def _detach_task(self, worker: Worker, task: CameraTask):
+        """Remove a task from a worker's stream list (caller holds the lock)"""
+        if task in worker.tasks:
+            worker.tasks.remove(task)
+        if not worker.tasks:
+            worker.status = "idle"
+        worker.wakeup.set()
+    
+    def _enqueue_task(self, task: CameraTask):
+        """Queue a task until a worker frees up (caller holds the lock)"""
+        task.status = "queued"
+        task.queued_at = time.monotonic()
+        self.pending_seq += 1
+        heapq.heappush(self.pending, (-task.priority, self.pending_seq, task))
+        self.queue_stats["enqueued"] += 1
+        logger.info(f"No available workers for camera {task.camera_id}, queued ({len(self.pending)} pending)")
+    
+    def _drain_pending(self):
+        """Hand queued tasks to idle workers (caller holds the lock)"""
+        while self.pending and self.running:
+            _, _, task = self.pending[0]
+            if not self._assign_task_to_worker(task):
                 return
+            heapq.heappop(self.pending)
+            wait = time.monotonic() - task.queued_at
+            self.queue_stats["dequeued"] += 1
+            self.queue_stats["total_wait"] += wait
+            self.queue_stats["max_wait"] = max(self.queue_stats["max_wait"], wait)
+            logger.info(f"Camera {task.camera_id} dequeued after waiting {wait:.1f}s")
+    
+    def _is_task_active(self, task: CameraTask) -> bool:
+        """Check whether a task is still scheduled (not stopped or replaced)"""
+        return self.running and self.tasks.get(task.camera_id) is task
+
+    def _run_worker(self, worker: Worker):
+        """Worker thread: multiplex all assigned streams
+        
+        Streams are served earliest-due first. Each stream is due every
+        1/target_fps seconds; ties go to the stream served longest ago, so
+        streams with the same rate are visited round-robin.
+        """
+        streams: Dict[int, StreamState] = {}
+        try:
+            while self.running:
+                self._sync_streams(worker, streams)
+                if not streams:
+                    worker.wakeup.wait(1.0)
+                    worker.wakeup.clear()
+                    continue
+                
+                stream = min(streams.values(), key=lambda st: (st.next_due, st.last_served))
+                delay = stream.next_due - time.monotonic()
+                if delay > 0:
+                    # Sleep until the next frame is due, unless the stream list changes
+                    if worker.wakeup.wait(delay):
+                        worker.wakeup.clear()
+                    continue
+                
+                if not self._service_stream(worker, stream):
+                    del streams[stream.task.camera_id]
+        except Exception as e:
+            logger.error(f"Worker {worker.worker_id} crashed: {e}")
+            worker.error_count += 1
+        finally:
+            for stream in streams.values():
+                self._close_stream(stream)
+    
+    def _sync_streams(self, worker: Worker, streams: Dict[int, StreamState]):
+        """Open newly assigned streams and release removed ones"""
+        with self.lock:
+            assigned = {task.camera_id: task for task in worker.tasks}
+        
+        for camera_id, stream in list(streams.items()):
+            if assigned.get(camera_id) is not stream.task or not self._is_task_active(stream.task):
+                self._close_stream(stream)
+                del streams[camera_id]
         
-        logger.warning(f"No available workers for camera {task.camera_id}")
+        for camera_id, task in assigned.items():
+            if camera_id in streams or not self._is_task_active(task):
+                continue
+            logger.info(f"Starting processing for camera {task.camera_id} on {worker.worker_id}")
+            reconnect = self.reconnect_policy if is_live_source(task.stream_url) else None
+            grabber = FrameGrabber(task.stream_url, name=str(task.camera_id), reconnect=reconnect)
+            if not grabber.open():
+                self._finish_stream(worker, task, f"Failed to open stream: {task.stream_url}")
+                continue
+            task.grabber = grabber
+            # Give the grab thread one source frame to decode the first frame
+            grabber.request()
+            streams[camera_id] = StreamState(task=task, grabber=grabber,
+                                             next_due=time.monotonic() + grabber.frame_interval)
     
-    async def _process_camera_stream(self, task: CameraTask):
-        """Process camera stream"""
-        worker = self.workers[task.worker_id]
+    def _service_stream(self, worker: Worker, stream: StreamState) -> bool:
+        """Grab and analyze one frame for a due stream; False when the stream ended"""
+        task = stream.task
+        self._update_rate(task)
+        now = time.monotonic()
+        
+        # A frame served later than its deadline is a miss; re-anchor the
+        # schedule instead of bursting to catch up on skipped slots
+        if now - stream.next_due > task.frame_deadline:
+            task.deadline_misses += 1
+            stream.next_due = now
+        stream.next_due += task.frame_interval
+        self.serve_seq += 1
+        stream.last_served = self.serve_seq
         
         try:
-            logger.info(f"Starting processing for camera {task.camera_id}")
+            if stream.grabber.ended:
+                logger.warning(f"Failed to read frame from camera {task.camera_id}")
+                self._close_stream(stream)
+                self._finish_stream(worker, task)
+                return False
             
-            # Open camera stream
-            cap = cv2.VideoCapture(task.stream_url)
-            if not cap.isOpened():
-                raise Exception(f"Failed to open stream: {task.stream_url}")
+            if not self._check_connection(task, stream.grabber):
+                # The grabber is reconnecting; keep this stream's state and wait
+                return True
             
-            frame_count = 0
-            while self.running and task.camera_id in self.tasks:
-                ret, frame = cap.read()
-                if not ret:
-                    logger.warning(f"Failed to read frame from camera {task.camera_id}")
-                    break
-                
-                # Process frame (simulate AI processing)
-                processed_frame = await self._process_frame(frame, task.camera_id)
-                frame_count += 1
-                worker.processed_frames += 1
-                
-                # Simulate processing time
-                await asyncio.sleep(0.1)
-                
-                # Update every 100 frames
-                if frame_count % 100 == 0:
-                    logger.info(f"Camera {task.camera_id}: processed {frame_count} frames")
+            if task.controller is not None and not task.controller.should_detect():
+                # Between detector runs: the grabber keeps the stream drained,
+                # nothing is decoded for this slot
+                task.skipped_frames += 1
+                self._request_next_frame(stream)
+                return True
             
-            cap.release()
-            logger.info(f"Finished processing camera {task.camera_id}")
+            frame = stream.grabber.read()
+            self._request_next_frame(stream)
+            if frame is None:
+                # Nothing decoded for this slot (stream stalled or slow to start);
+                # counted as stale by the grabber
+                return True
+            
+            if task.motion_gate is not None and not task.motion_gate.check(frame):
+                # Static scene: nothing moved, so the detector would see the same thing
+                return True
             
+            if task.roi is not None:
+                # Only the zone (plus a margin) goes to the detector
+                frame = task.roi.crop(frame)
+            
+            if self.process_pool is not None:
+                # Hand the frame to an inference process via shared memory
+                if stream.ring is None or not stream.ring.matches(frame):
+                    if stream.ring is not None:
+                        self._close_ring(stream.ring)
+                    stream.ring = SharedFrameRing(frame.shape, slots=self.ring_slots, dtype=frame.dtype)
+                self._submit_shared_frame(task, worker, stream.ring, frame)
+            elif self.inference_engine is not None:
+                self._submit_batched_frame(worker, stream, frame)
+            else:
+                # Process frame (simulate AI processing)
+                started = time.monotonic()
+                result = self._process_frame(frame, task.camera_id, task.detector)
+                self._record_frame(task, worker, time.monotonic() - started, result["people_count"])
+                self._publish_result(task.camera_id, result)
+            return True
+        
         except Exception as e:
             logger.error(f"Error processing camera {task.camera_id}: {e}")
-            task.error_count += 1
-            task.last_error = str(e)
-            worker.error_count += 1
-        
-        finally:
-            # Clean up worker
+            self._close_stream(stream)
+            self._finish_stream(worker, task, str(e))
+            return False
+    
+    def _check_connection(self, task: CameraTask, grabber: FrameGrabber) -> bool:
+        """Track reconnects in the task status; True while the stream is connected"""
+        connected = grabber.connected
+        with self.lock:
+            if not connected and task.status == "running":
+                logger.warning(f"Camera {task.camera_id} disconnected, reconnecting")
+                task.status = "reconnecting"
+            elif connected and task.status == "reconnecting":
+                logger.info(f"Camera {task.camera_id} reconnected")
+                task.status = "running"
+                # Frames requested before the drop are gone; ask again
+                grabber.request()
+        return connected
+    
+    def _request_next_frame(self, stream: StreamState):
+        """Have the grabber decode a frame just before the next slot that will analyze one"""
+        controller = stream.task.controller
+        if controller is None or controller.next_detects:
+            stream.grabber.request(stream.next_due - stream.grabber.frame_interval)
+    
+    def _update_rate(self, task: CameraTask):
+        """Refresh the shared CPU budget if due, then re-plan this camera's rate"""
+        if task.controller is None:
+            return
+        if self.cpu_budget.due():
             with self.lock:
-                worker.status = "idle"
-                worker.current_task = None
-                if task.camera_id in self.tasks:
-                    self.tasks[task.camera_id].status = "completed"
+                if self.cpu_budget.due():
+                    self.cpu_budget.refresh(t.controller for t in self.tasks.values()
+                                            if t.controller is not None and t.status == "running")
+        task.controller.update(self.cpu_budget.scale)
     
-    async def _process_frame(self, frame: np.ndarray, camera_id: int) -> np.ndarray:
-        """Process a single frame (simulate AI processing)"""
-        # Simulate AI processing
-        # In real implementation, this would run YOLO or other AI models
+    def _record_frame(self, task: CameraTask, worker: Worker, latency: float, people_count: int):
+        """Update frame counters and rate feedback after a frame was analyzed"""
+        with self.counter_lock:
+            if task.controller is not None:
+                task.controller.record(latency, people_count)
+            task.processed_frames += 1
+            processed = task.processed_frames
+            worker.processed_frames += 1
+            worker.last_frame_time = datetime.now()
+            if worker.status == "stalled":
+                worker.status = "busy"
         
-        # Convert to grayscale for simple processing
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # Update every 100 frames
+        if processed % 100 == 0:
+            logger.info(f"Camera {task.camera_id}: processed {processed} frames")
+    
+    def _record_error(self, task: CameraTask, worker: Worker, error: Exception):
+        """Count a failed inference against the task and its worker"""
+        logger.error(f"Inference error for camera {task.camera_id}: {error}")
+        with self.counter_lock:
+            task.error_count += 1
+            task.last_error = str(error)
+            worker.error_count += 1
+    
+    def _close_stream(self, stream: StreamState):
+        """Release a stream's capture and shared-memory ring"""
+        stream.grabber.release()
+        if stream.ring is not None:
+            self._close_ring(stream.ring)
+            stream.ring = None
+    
+    def _finish_stream(self, worker: Worker, task: CameraTask, error: Optional[str] = None):
+        """Mark a task done (or failed) and free its slot on the worker"""
+        if error:
+            logger.error(f"Error processing camera {task.camera_id}: {error}")
+            task.error_count += 1
+            task.last_error = error
+            worker.error_count += 1
+        else:
+            logger.info(f"Finished processing camera {task.camera_id}")
         
-        # Simulate people detection (just count non-zero pixels as example)
-        # In real implementation, this would be actual AI inference
-        people_count = np.count_nonzero(gray > 128) // 1000  # Simplified
+        with self.lock:
+            self._detach_task(worker, task)
+            if self.tasks.get(task.camera_id) is task:
+                task.status = "completed"
+            self._drain_pending()
+    
+    def _submit_shared_frame(self, task: CameraTask, worker: Worker, ring: SharedFrameRing, frame: np.ndarray):
+        """Write a frame into the camera's ring and queue it for an inference process"""
+        slot = ring.acquire()
+        if slot is None:
+            # Inference is behind; drop this frame rather than queue stale ones
+            task.dropped_frames += 1
+            return
+        ring.write(slot, frame)
+        model = task.model.spec if task.model is not None and task.model.detector is not None else None
+        future = self.process_pool.submit(_analyze_shared_frame, ring.name, slot, frame.shape, frame.dtype.str,
+                                          model.to_dict() if model else None, task.precision)
+        future.add_done_callback(partial(self._on_shared_frame_done, task, worker, ring, slot, time.monotonic()))
+    
+    def _on_shared_frame_done(self, task: CameraTask, worker: Worker, ring: SharedFrameRing,
+                              slot: int, submitted_at: float, future: Future):
+        """Collect an inference result; only this small dict crossed the process boundary"""
+        ring.release(slot)
+        try:
+            result = future.result()
+        except Exception as e:
+            self._record_error(task, worker, e)
+            return
+        result.update({"camera_id": task.camera_id, "timestamp": datetime.now().isoformat()})
+        self._record_frame(task, worker, time.monotonic() - submitted_at, result["people_count"])
+        self._publish_result(task.camera_id, result)
+    
+    def _submit_batched_frame(self, worker: Worker, stream: StreamState, frame: np.ndarray):
+        """Queue a frame for cross-camera batched detection"""
+        if stream.inflight:
+            # Previous frame of this camera is still being detected
+            stream.task.dropped_frames += 1
+            return
+        stream.inflight = True
+        stream.submitted_at = time.monotonic()
+        future = self.inference_engine.submit(stream.task.camera_id, frame, stream.task.detector)
+        future.add_done_callback(partial(self._on_batched_frame_done, worker, stream))
+    
+    def _on_batched_frame_done(self, worker: Worker, stream: StreamState, future: Future):
+        """Publish detections scattered back from a batch"""
+        stream.inflight = False
+        task = stream.task
+        if future.cancelled():
+            return
+        try:
+            detections = future.result()
+        except Exception as e:
+            self._record_error(task, worker, e)
+            return
+        result = {
+            "camera_id": task.camera_id,
+            "people_count": detections["people_count"],
+            "boxes": detections["boxes"].tolist(),
+            "confidences": [round(float(c), 4) for c in detections["confidences"]],
+            "timestamp": datetime.now().isoformat()
+        }
+        self._record_frame(task, worker, time.monotonic() - stream.submitted_at, result["people_count"])
+        self._publish_result(task.camera_id, result)
+    
+    def _close_ring(self, ring: SharedFrameRing, timeout: float = 5.0):
+        """Wait for in-flight frames to finish, then free the ring"""
+        deadline = time.monotonic() + timeout
+        while ring.in_flight() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        ring.close()
+    
+    def _publish_result(self, camera_id: int, result: Dict):
+        """Hand a frame result from a worker thread back to the event loop"""
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._dispatch_result, camera_id, result)
+        except RuntimeError:
+            # Loop shut down between the check and the call
+            pass
+    
+    def _dispatch_result(self, camera_id: int, result: Dict):
+        """Store a frame result and notify handlers (runs on the event loop)"""
+        task = self.tasks.get(camera_id)
+        if task is None:
+            return
+        if task.roi is not None and "boxes" in result:
+            result["boxes"] = task.roi.to_frame(result["boxes"])
+        if task.zones is not None:
+            result["zones"] = self._count_zones(task, result)
+        self.latest_results[camera_id] = result
+        if self.results_sink is not None and task.zones is not None:
+            confidences = result.get("confidences")
+            timestamp = datetime.fromisoformat(result["timestamp"])
+            confidence = sum(confidences) / len(confidences) if confidences else None
+            for zone in result["zones"]:
+                self.results_sink.submit(CountingRow(
+                    camera_id=camera_id,
+                    zone_id=zone["zone_id"],
+                    timestamp=timestamp,
+                    count_in=zone["count_in"],
+                    count_out=zone["count_out"],
+                    total_count=zone["total_count"],
+                    confidence=confidence
+                ))
+        for handler in self.result_handlers:
+            try:
+                outcome = handler(camera_id, result)
+                if asyncio.iscoroutine(outcome):
+                    asyncio.ensure_future(outcome)
+            except Exception as e:
+                logger.error(f"Error in result handler for camera {camera_id}: {e}")
+    
+    def _count_zones(self, task: CameraTask, result: Dict) -> List[Dict]:
+        """Per-zone counts of one result: link its boxes to the camera's
+        tracks and test every track's last move against every zone at once"""
+        if "boxes" not in result:
+            # No boxes to track (simulated detection): everyone counts
+            # towards every zone and nobody crosses one
+            if not task.zones_without_boxes:
+                task.zones_without_boxes = True
+                logger.warning(f"Camera {task.camera_id}: results carry no boxes, "
+                               "zone in/out counts stay at zero")
+            return [{"zone_id": int(zone_id), "count_in": 0, "count_out": 0,
+                     "total_count": result["people_count"]} for zone_id in task.zones.ids]
+        track_ids, centroids = task.tracks.link(result["boxes"])
+        count_in, count_out = task.zones.tally(task.zones.update(track_ids, centroids))
+        occupancy = task.zones.occupancy(centroids)
+        return [{"zone_id": int(zone_id), "count_in": int(zone_in), "count_out": int(zone_out),
+                 "total_count": int(people)}
+                for zone_id, zone_in, zone_out, people in zip(task.zones.ids, count_in, count_out, occupancy)]
+    
+    def _process_frame(self, frame: np.ndarray, camera_id: int, detector: Optional[Detector] = None) -> Dict:
+        """Process a single frame on the worker thread"""
+        result = analyze_frame(frame, detector)
         
         # Log detection results
-        if people_count > 0:
-            logger.debug(f"Camera {camera_id}: detected {people_count} people")
+        if result["people_count"] > 0:
+            logger.debug(f"Camera {camera_id}: detected {result['people_count']} people")
         
-        return frame
+        result.update({"camera_id": camera_id, "timestamp": datetime.now().isoformat()})
+        return result
     
     async def _monitor_workers(self):
         """Monitor worker health and status"""
@@ -219,13 +862,16 @@ class CameraWorkerPool:
             try:
                 with self.lock:
                     for worker_id, worker in self.workers.items():
-                        # Check for stuck workers
-                        if worker.status == "busy" and worker.start_time:
-                            elapsed = (datetime.now() - worker.start_time).total_seconds()
+                        # Check for stuck workers (no frame processed recently).
+                        # A stalled worker keeps its streams but gets no new ones
+                        # until it processes a frame again
+                        last_activity = worker.last_frame_time or worker.start_time
+                        if worker.status == "busy" and last_activity:
+                            elapsed = (datetime.now() - last_activity).total_seconds()
                             if elapsed > 300:  # 5 minutes timeout
-                                logger.warning(f"Worker {worker_id} stuck for {elapsed}s, resetting")
-                                worker.status = "idle"
-                                worker.current_task = None
+                                logger.warning(f"Worker {worker_id} stuck for {elapsed}s, marking stalled")
+                                worker.status = "stalled"
+                    self._drain_pending()
                 
                 await asyncio.sleep(30)  # Check every 30 seconds
                 
@@ -234,4 +880,16 @@ class CameraWorkerPool:
                 await asyncio.sleep(30)
 
 # Global worker pool instance
-worker_pool = CameraWorkerPool(max_workers=4) 
\ No newline at end of file
+worker_pool = CameraWorkerPool(
+    max_workers=int(os.getenv("WORKER_POOL_MAX_WORKERS", "4")),
+    mode=os.getenv("WORKER_POOL_MODE", "thread"),
+    inference_processes=int(os.getenv("INFERENCE_PROCESSES", "0")) or None,
+    max_pending=int(os.getenv("WORKER_POOL_MAX_PENDING", "16")),
+    streams_per_worker=int(os.getenv("WORKER_POOL_STREAMS_PER_WORKER", "8")),
+    inference_engine=BatchInferenceEngine.from_env(),
+    cpu_budget=float(os.getenv("WORKER_POOL_CPU_BUDGET", "0")) or None,
+    min_fps=float(os.getenv("CAMERA_MIN_FPS", "0.5")),
+    reconnect_policy=ReconnectPolicy.from_env(),
+    model_registry=model_registry,
+    results_sink=results_sink
+) 
\ No newline at end of file
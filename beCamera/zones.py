@@ -0,0 +1,294 @@
+"""
+Counting Zones
+Turns zones.coordinates values into shapes in frame pixels and counts people
+crossing every zone of a camera, for the worker pool and the reference
+people_counter script alike
+"""
+
+import json
+import logging
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+def zone_points(coordinates: Union[str, Dict, None]) -> List[Point]:
+    """Points of a zones.coordinates value: a rectangle {"x", "y", "width",
+    "height"} as its four corners (clockwise from the top left), a line
+    {"x1", "y1", "x2", "y2"} as its two ends, or {"points": [[x, y], ...]}
+    as given. Raises ValueError for anything else"""
+    if isinstance(coordinates, str):
+        coordinates = json.loads(coordinates)
+    if not isinstance(coordinates, dict):
+        raise ValueError(f"Zone coordinates must be an object, got {coordinates!r}")
+    try:
+        if "points" in coordinates:
+            points = [(float(x), float(y)) for x, y in coordinates["points"]]
+        elif "x1" in coordinates:
+            points = [(float(coordinates["x1"]), float(coordinates["y1"])),
+                      (float(coordinates["x2"]), float(coordinates["y2"]))]
+        elif "width" in coordinates:
+            x, y = float(coordinates["x"]), float(coordinates["y"])
+            width, height = float(coordinates["width"]), float(coordinates["height"])
+            points = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+        else:
+            raise ValueError(f"Unknown zone coordinates {coordinates!r}")
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed zone coordinates {coordinates!r}: {e}")
+    if len(points) < 2:
+        raise ValueError(f"Zone needs at least two points, got {len(points)}")
+    return points
+
+def zone_shape(zone_type: Optional[str], points: List[Point]) -> str:
+    """How a zone is counted: "line" (crossings of a polyline) for line
+    zones and two-point shapes, "area" (entering and leaving a polygon)
+    for everything else, so entrance/exit rectangles are areas"""
+    if zone_type == "line" or len(points) == 2:
+        return "line"
+    if len(points) < 3:
+        raise ValueError(f"Area zone needs at least three points, got {len(points)}")
+    return "area"
+
+def unusable_zones(zones: List[Dict]) -> List[Tuple[object, str]]:
+    """(zone ID, reason) of every zones row the counter cannot handle"""
+    unusable = []
+    for zone in zones:
+        try:
+            zone_shape(zone.get("zone_type"), zone_points(zone.get("coordinates")))
+        except ValueError as e:
+            unusable.append((zone.get("id"), str(e)))
+    return unusable
+
+def _cross(d: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """z component of the 2D cross product, broadcast over the leading axes"""
+    return d[..., 0] * v[..., 1] - d[..., 1] * v[..., 0]
+
+class ZoneCounter:
+    """In/out counts for every zone of a camera in one vectorized pass
+
+    Zones are rows of the zones table (id, name, zone_type, coordinates,
+    direction). A line zone counts a track crossing one of its segments:
+    moving onto the side where cross(B - A, p - A) > 0 (below a line drawn
+    left to right) is "in", the other way "out". An area zone counts a
+    track entering its polygon as "in" and leaving it as "out". A zone's
+    direction ("in", "out" or "bidirectional") drops the other kind.
+
+    All zones are compiled once into flat segment arrays plus a segment ->
+    zone membership matrix, so the last move of every track is tested
+    against every zone with a few numpy operations per frame.
+    """
+
+    def __init__(self, zones: List[Dict]):
+        self.zones = list(zones)
+        self.ids = [zone.get("id", i) for i, zone in enumerate(self.zones)]
+        self.names = [zone.get("name", str(zone.get("id", i))) for i, zone in enumerate(self.zones)]
+        self.points = [zone_points(zone["coordinates"]) for zone in self.zones]
+        self.shapes = [zone_shape(zone.get("zone_type"), points)
+                       for zone, points in zip(self.zones, self.points)]
+
+        line_a, line_b, line_zone = [], [], []
+        area_a, area_b, area_zone = [], [], []
+        for i, (shape, points) in enumerate(zip(self.shapes, self.points)):
+            if shape == "line":
+                # A (poly)line: consecutive points form its segments
+                edges, a, b, owner = zip(points[:-1], points[1:]), line_a, line_b, line_zone
+            else:
+                # A polygon: closed ring of edges
+                edges, a, b, owner = zip(points, points[1:] + points[:1]), area_a, area_b, area_zone
+            for start, end in edges:
+                a.append(start)
+                b.append(end)
+                owner.append(i)
+
+        n = len(self.zones)
+        self.line_a = np.array(line_a, dtype=np.float64).reshape(-1, 2)
+        self.line_b = np.array(line_b, dtype=np.float64).reshape(-1, 2)
+        self.line_members = np.zeros((len(line_zone), n))
+        self.line_members[np.arange(len(line_zone)), line_zone] = 1.0
+        self.area_a = np.array(area_a, dtype=np.float64).reshape(-1, 2)
+        self.area_b = np.array(area_b, dtype=np.float64).reshape(-1, 2)
+        self.area_members = np.zeros((len(area_zone), n))
+        self.area_members[np.arange(len(area_zone)), area_zone] = 1.0
+        self.is_area = np.array([shape == "area" for shape in self.shapes], dtype=bool)
+
+        directions = [zone.get("direction") or "bidirectional" for zone in self.zones]
+        self.allow_in = np.array([d in ("in", "bidirectional") for d in directions], dtype=bool)
+        self.allow_out = np.array([d in ("out", "bidirectional") for d in directions], dtype=bool)
+
+        # Running per-zone totals
+        self.count_in = np.zeros(n, dtype=np.int64)
+        self.count_out = np.zeros(n, dtype=np.int64)
+
+        # Last known centroid of every track, sorted by track ID
+        self.prev_ids = np.zeros(0, dtype=np.int64)
+        self.prev_points = np.zeros((0, 2))
+
+    @classmethod
+    def from_zones(cls, zones: Optional[List[Dict]]) -> Optional["ZoneCounter"]:
+        """Build a counter from the camera's zones rows (the "zones" list the
+        start handler adds to the task config), or None if none is usable;
+        a zone whose coordinates cannot be counted is logged and skipped"""
+        unusable = dict(unusable_zones(zones or []))
+        for zone_id, reason in unusable.items():
+            logger.warning(f"Zone {zone_id} unusable ({reason}), not counted")
+        usable = [zone for zone in zones or [] if zone.get("id") not in unusable]
+        return cls(usable) if usable else None
+
+    def _line_crossings(self, before: np.ndarray, after: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(moves, zones) in/out crossings of the moves before -> after: the
+        track changes side of a segment and the segment's ends lie on
+        opposite sides of the move"""
+        n = len(self.zones)
+        if not len(self.line_a):
+            return np.zeros((len(before), n), dtype=bool), np.zeros((len(before), n), dtype=bool)
+        a, b = self.line_a[None], self.line_b[None]
+        d = b - a
+        side_before = _cross(d, before[:, None] - a)
+        side_after = _cross(d, after[:, None] - a)
+        move = (after - before)[:, None]
+        straddle = _cross(move, a - before[:, None]) * _cross(move, b - before[:, None]) <= 0
+        cross_in = (side_before <= 0) & (side_after > 0) & straddle
+        cross_out = (side_before > 0) & (side_after <= 0) & straddle
+        return (cross_in @ self.line_members) > 0, (cross_out @ self.line_members) > 0
+
+    def inside(self, points: np.ndarray) -> np.ndarray:
+        """(points, zones) point-in-polygon for every area zone at once (False
+        for line zones): cast a ray to the right and count the edges it crosses"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(self.area_a):
+            return np.zeros((len(points), len(self.zones)), dtype=bool)
+        a, b = self.area_a[None], self.area_b[None]
+        px, py = points[:, None, 0], points[:, None, 1]
+        spans = (a[..., 1] > py) != (b[..., 1] > py)
+        dy = np.where(spans, b[..., 1] - a[..., 1], 1.0)
+        x_at = a[..., 0] + (py - a[..., 1]) * (b[..., 0] - a[..., 0]) / dy
+        hits = spans & (px < x_at)
+        return (hits @ self.area_members).astype(np.int64) % 2 == 1
+
+    def update(self, track_ids, centroids) -> List[Tuple[int, int, int]]:
+        """Test the last move of every track against every zone; returns the
+        frame's events as (track ID, zone index, +1 for in or -1 for out).
+        Tracks seen for the first time have no move yet"""
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+
+        events = []
+        if len(self.prev_ids) and len(track_ids):
+            # Previous centroid of every track still present
+            pos = np.minimum(np.searchsorted(self.prev_ids, track_ids), len(self.prev_ids) - 1)
+            known = self.prev_ids[pos] == track_ids
+            before, after = self.prev_points[pos[known]], centroids[known]
+            moved = np.any(before != after, axis=1)
+            ids, before, after = track_ids[known][moved], before[moved], after[moved]
+
+            if len(ids):
+                cross_in, cross_out = self._line_crossings(before, after)
+                if len(self.area_a):
+                    inside_before, inside_after = self.inside(before), self.inside(after)
+                    cross_in |= ~inside_before & inside_after
+                    cross_out |= inside_before & ~inside_after
+                cross_in &= self.allow_in
+                cross_out &= self.allow_out
+
+                self.count_in += cross_in.sum(axis=0)
+                self.count_out += cross_out.sum(axis=0)
+                events.extend((int(ids[t]), int(z), 1) for t, z in zip(*np.nonzero(cross_in)))
+                events.extend((int(ids[t]), int(z), -1) for t, z in zip(*np.nonzero(cross_out)))
+
+        # Remember the current centroids (tracks that vanished are dropped)
+        order = np.argsort(track_ids)
+        self.prev_ids = track_ids[order]
+        self.prev_points = centroids[order]
+        return events
+
+    def tally(self, events: List[Tuple[int, int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-zone (in, out) counts of one frame's events"""
+        n = len(self.zones)
+        if not events:
+            return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+        zones, signs = np.array([(z, s) for _, z, s in events], dtype=np.int64).T
+        return (np.bincount(zones[signs > 0], minlength=n),
+                np.bincount(zones[signs < 0], minlength=n))
+
+    def occupancy(self, centroids) -> np.ndarray:
+        """People per zone: inside each area zone, everyone seen for a line"""
+        centroids = np.asarray(centroids, dtype=np.float64).reshape(-1, 2)
+        return np.where(self.is_area, self.inside(centroids).sum(axis=0), len(centroids))
+
+    def bounds(self) -> Tuple[float, float, float, float]:
+        """Union bounding box (x1, y1, x2, y2) of every zone"""
+        points = np.concatenate([np.array(p, dtype=np.float64).reshape(-1, 2) for p in self.points])
+        (x1, y1), (x2, y2) = points.min(axis=0), points.max(axis=0)
+        return float(x1), float(y1), float(x2), float(y2)
+
+    def counts(self) -> Dict:
+        """Per-zone totals keyed by zone ID"""
+        return {zone_id: {"name": name, "in": int(count_in), "out": int(count_out)}
+                for zone_id, name, count_in, count_out in zip(self.ids, self.names, self.count_in, self.count_out)}
+
+    def snapshot(self) -> Dict:
+        return {
+            "zones": [
+                {"zone_id": zone_id, "shape": shape, "total_in": int(count_in), "total_out": int(count_out)}
+                for zone_id, shape, count_in, count_out in zip(self.ids, self.shapes, self.count_in, self.count_out)
+            ],
+            "tracks": len(self.prev_ids)
+        }
+
+class TrackLinker:
+    """Links person boxes of consecutive results into tracks
+
+    Centroids are matched by gated optimal assignment (linear_sum_assignment
+    over their distances, like the reference CentroidTracker): a gated pair
+    costs just above max_distance, the same as leaving both sides unmatched,
+    and is dropped afterwards. A track unmatched for more than max_missing
+    results is dropped; an unmatched box starts a new track.
+    """
+
+    def __init__(self, max_distance: float = 80.0, max_missing: int = 5):
+        self.max_distance = max_distance
+        self.max_missing = max_missing
+        self.next_id = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.centroids = np.zeros((0, 2))
+        self.missing = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "TrackLinker":
+        """Build a linker from the optional "zone_tracking" section of the task config"""
+        config = config or {}
+        return cls(max_distance=float(config.get("max_distance", 80.0)),
+                   max_missing=int(config.get("max_missing", 5)))
+
+    def link(self, boxes) -> Tuple[np.ndarray, np.ndarray]:
+        """Feed one result's boxes (x1, y1, x2, y2); returns the track ID and
+        centroid of every box"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        centroids = (boxes[:, :2] + boxes[:, 2:]) / 2.0
+        ids = np.full(len(centroids), -1, dtype=np.int64)
+
+        rows = cols = np.zeros(0, dtype=np.int64)
+        if len(self.centroids) and len(centroids):
+            distances = np.linalg.norm(self.centroids[:, None, :] - centroids[None, :, :], axis=2)
+            np.minimum(distances, self.max_distance + 1.0, out=distances)
+            rows, cols = linear_sum_assignment(distances)
+            keep = distances[rows, cols] <= self.max_distance
+            rows, cols = rows[keep], cols[keep]
+            ids[cols] = self.ids[rows]
+
+        # Matched tracks move, unmatched ones age out, unmatched boxes start tracks
+        self.centroids[rows] = centroids[cols]
+        self.missing += 1
+        self.missing[rows] = 0
+        alive = self.missing <= self.max_missing
+        fresh = ids < 0
+        ids[fresh] = np.arange(self.next_id, self.next_id + int(fresh.sum()))
+        self.next_id += int(fresh.sum())
+        self.ids = np.concatenate([self.ids[alive], ids[fresh]])
+        self.centroids = np.concatenate([self.centroids[alive], centroids[fresh]])
+        self.missing = np.concatenate([self.missing[alive], np.zeros(int(fresh.sum()), dtype=np.int32)])
+        return ids, centroids
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+INT8 Inference Benchmark - AI Camera Counting System
+Runs the fp32 detector and its INT8-quantized ONNX model (beCamera/quantize.py)
+over the same recorded clips and reports:
+- throughput: frames/s of each detector and the INT8 speedup
+- count accuracy: per-frame people counts of the INT8 model against the fp32
+  counts (the reference), and the accuracy delta
+
+The INT8 model passes when it is faster and loses at most one point
+(0.01) of count accuracy.
+
+Usage (from project root):
+    python3 sharedResource/automationTest/backend/performance/benchmark_int8_inference.py \\
+        --fp32 models/ssd.onnx --int8 models/ssd.int8.onnx --clips clips/*.mp4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "beCamera"))
+
+from detector import create_detector  # noqa: E402
+from quantize import sample_frames  # noqa: E402
+
+
+class Int8InferenceBenchmark:
+    def __init__(self, fp32_path: str, int8_path: str, clips: List[str], fp32_backend: str = "onnxruntime",
+                 max_frames: int = 300, batch_size: int = 1, max_accuracy_drop: float = 0.01,
+                 detector_kwargs: Dict = None):
+        self.fp32_path = fp32_path
+        self.int8_path = int8_path
+        self.clips = clips
+        self.fp32_backend = fp32_backend
+        self.max_frames = max_frames
+        self.batch_size = batch_size
+        self.max_accuracy_drop = max_accuracy_drop
+        self.detector_kwargs = detector_kwargs or {}
+        self.test_results = []
+
+    def log_test(self, test_name: str, status: str, details: str = "", metrics: Dict = None):
+        """Log benchmark result with metrics"""
+        result = {
+            "test_name": test_name,
+            "status": status,
+            "details": details,
+            "metrics": metrics or {},
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        print(f"[{status.upper()}] {test_name}: {details}")
+
+    def run_detector(self, detector, frames: List[np.ndarray]) -> Dict:
+        """Per-frame counts and frames/s of one detector over all frames"""
+        detector.warm_up()
+        counts = []
+        started = time.perf_counter()
+        for i in range(0, len(frames), self.batch_size):
+            counts.extend(r["people_count"] for r in detector.detect_batch(frames[i:i + self.batch_size]))
+        elapsed = time.perf_counter() - started
+        return {"counts": np.array(counts), "fps": len(frames) / elapsed}
+
+    def count_accuracy(self, counts: np.ndarray, reference: np.ndarray) -> float:
+        """Mean per-frame count accuracy against the reference counts
+        (1 - relative count error, floored at 0)"""
+        error = np.abs(counts - reference) / np.maximum(reference, 1)
+        return float(np.mean(np.clip(1.0 - error, 0.0, 1.0)))
+
+    def run_all(self):
+        print("⚡ INT8 INFERENCE BENCHMARK")
+        print("=" * 50)
+        missing = [path for path in (self.fp32_path, self.int8_path) if not path or not os.path.exists(path)]
+        if missing or not self.clips:
+            self.log_test("int8 vs fp32", "SKIPPED",
+                          f"missing models {missing}" if missing else "no clips given")
+            self.save_results()
+            return
+
+        frames = sample_frames(self.clips, self.max_frames, stride=1)
+        if not frames:
+            self.log_test("int8 vs fp32", "SKIPPED", f"no frames could be read from {self.clips}")
+            self.save_results()
+            return
+
+        fp32 = self.run_detector(create_detector(self.fp32_backend, self.fp32_path, **self.detector_kwargs), frames)
+        int8 = self.run_detector(create_detector("onnxruntime", self.int8_path, precision="int8",
+                                                 **self.detector_kwargs), frames)
+
+        speedup = int8["fps"] / max(fp32["fps"], 1e-9)
+        self.log_test("throughput", "PASSED" if speedup > 1 else "FAILED",
+                      f"fp32 {fp32['fps']:.1f} fps vs int8 {int8['fps']:.1f} fps ({speedup:.2f}x)",
+                      {
+                          "frames": len(frames),
+                          "batch_size": self.batch_size,
+                          "fp32_fps": round(fp32["fps"], 2),
+                          "int8_fps": round(int8["fps"], 2),
+                          "speedup": round(speedup, 2)
+                      })
+
+        accuracy = self.count_accuracy(int8["counts"], fp32["counts"])
+        drop = 1.0 - accuracy
+        self.log_test("count accuracy", "PASSED" if drop <= self.max_accuracy_drop else "FAILED",
+                      f"int8 count accuracy {accuracy:.4f} vs fp32 (delta {drop:.4f}, "
+                      f"max {self.max_accuracy_drop})",
+                      {
+                          "count_accuracy": round(accuracy, 4),
+                          "accuracy_delta": round(drop, 4),
+                          "exact_frames": round(float(np.mean(int8["counts"] == fp32["counts"])), 4),
+                          "fp32_total": int(fp32["counts"].sum()),
+                          "int8_total": int(int8["counts"].sum())
+                      })
+        self.save_results()
+
+    def save_results(self):
+        results_file = os.path.join(PROJECT_ROOT, "sharedResource/automationTest/backend/results/int8_inference_benchmark.json")
+        with open(results_file, "w") as f:
+            json.dump({
+                "test_suite": "INT8 Inference Benchmark",
+                "timestamp": datetime.now().isoformat(),
+                "results": self.test_results
+            }, f, indent=2)
+        print(f"\n📊 Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare an INT8 detector with its fp32 model on recorded clips")
+    parser.add_argument("--fp32", default=os.getenv("AI_MODEL_PATH", ""), help="fp32 model")
+    parser.add_argument("--int8", default=os.getenv("AI_MODEL_INT8_PATH", ""), help="INT8 ONNX model")
+    parser.add_argument("--fp32-backend", default=os.getenv("AI_DETECTOR_BACKEND", "onnxruntime"))
+    parser.add_argument("--clips", nargs="*", default=[], help="recorded clips")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--confidence", type=float, default=float(os.getenv("AI_CONFIDENCE_THRESHOLD", "0.4")))
+    parser.add_argument("--person-class-id", type=int, default=int(os.getenv("AI_PERSON_CLASS_ID", "15")))
+    args = parser.parse_args()
+
+    benchmark = Int8InferenceBenchmark(args.fp32, args.int8, args.clips, args.fp32_backend,
+                                       args.max_frames, args.batch_size,
+                                       detector_kwargs={"confidence": args.confidence,
+                                                        "person_class_id": args.person_class_id})
+    benchmark.run_all()
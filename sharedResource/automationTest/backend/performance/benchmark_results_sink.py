@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Counting Results Write Path Benchmark - AI Camera Counting System
+Writes the same simulated counting events to counting_results two ways:
+- row inserts: one INSERT + commit per event on a single connection
+- buffered sink: beCamera results_sink.CountingResultsSink (COPY batches)
+
+and reports rows/s, the sink's flush and event-to-commit latency, and its
+peak buffer occupancy. Rows are tagged in frame_data and deleted afterwards,
+and the analytics rollups of the benchmark's time range are rebuilt.
+Needs a database with the counting_results schema (DB_* environment).
+
+Usage (from project root):
+    python3 sharedResource/automationTest/backend/performance/benchmark_results_sink.py
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict
+
+import psycopg2
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "beCamera"))
+
+from results_sink import CountingResultsSink, CountingRow  # noqa: E402
+
+
+class ResultsSinkBenchmark:
+    def __init__(self, cameras: int = 50, fps: int = 10, seconds: int = 4, insert_rows: int = 1000):
+        self.cameras = cameras
+        self.fps = fps
+        self.seconds = seconds
+        self.insert_rows = insert_rows
+        self.run_id = uuid.uuid4().hex[:12]
+        self.test_results = []
+
+    def log_test(self, test_name: str, status: str, details: str = "", metrics: Dict = None):
+        """Log benchmark result with metrics"""
+        result = {
+            "test_name": test_name,
+            "status": status,
+            "details": details,
+            "metrics": metrics or {},
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        print(f"[{status.upper()}] {test_name}: {details}")
+
+    def connect(self):
+        return psycopg2.connect(
+            host=os.getenv("DB_HOST", "localhost"),
+            port=os.getenv("DB_PORT", "5432"),
+            database=os.getenv("DB_NAME", "people_counting_db"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASSWORD", "dev_password")
+        )
+
+    def event(self, zone, i: int) -> CountingRow:
+        camera_id, zone_id = zone
+        return CountingRow(camera_id=camera_id, zone_id=zone_id, timestamp=datetime.now(),
+                           total_count=i % 7, confidence=0.8, frame_data={"benchmark": self.run_id})
+
+    def bench_row_inserts(self, conn, zone) -> float:
+        """Rows/s of one INSERT and commit per event"""
+        cursor = conn.cursor()
+        started = time.perf_counter()
+        for i in range(self.insert_rows):
+            row = self.event(zone, i)
+            cursor.execute("""
+                INSERT INTO counting_results (camera_id, zone_id, timestamp, count_in, count_out,
+                                              total_count, confidence, frame_data)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, (row.camera_id, row.zone_id, row.timestamp, row.count_in, row.count_out,
+                  row.total_count, row.confidence, json.dumps(row.frame_data)))
+            conn.commit()
+        return self.insert_rows / (time.perf_counter() - started)
+
+    def bench_sink(self, zone) -> Dict:
+        """Feed the sink at cameras x fps for the given seconds, then drain it"""
+        sink = CountingResultsSink(self.connect, flush_rows=500, flush_interval=1.0)
+        sink.start()
+        total = self.cameras * self.fps * self.seconds
+        interval = 1.0 / (self.cameras * self.fps)
+        started = time.perf_counter()
+        for i in range(total):
+            sink.submit(self.event(zone, i))
+            # Pace submissions like live cameras would
+            delay = started + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sink.stop()
+        elapsed = time.perf_counter() - started
+        status = sink.get_status()
+        return {"rows": total, "elapsed": elapsed, "status": status}
+
+    def bench_sink_burst(self, zone, rows: int = 50000) -> float:
+        """Rows/s the sink sustains when submissions are not paced"""
+        sink = CountingResultsSink(self.connect, flush_rows=5000, flush_interval=0.2, max_rows=rows)
+        sink.start()
+        started = time.perf_counter()
+        for i in range(rows):
+            sink.submit(self.event(zone, i))
+        sink.stop()
+        return sink.stats["written"] / (time.perf_counter() - started)
+
+    def run_all(self):
+        print("⚡ COUNTING RESULTS WRITE PATH BENCHMARK")
+        print("=" * 50)
+        try:
+            conn = self.connect()
+        except Exception as e:
+            self.log_test("database", "SKIPPED", f"cannot connect: {e}")
+            self.save_results()
+            return
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT camera_id, id FROM zones ORDER BY id LIMIT 1")
+        zone = cursor.fetchone()
+        if zone is None:
+            self.log_test("database", "SKIPPED", "no zones to write counting results for")
+            conn.close()
+            self.save_results()
+            return
+
+        started = datetime.now()
+        try:
+            insert_rate = self.bench_row_inserts(conn, zone)
+            self.log_test("row inserts", "PASSED", f"{insert_rate:.0f} rows/s",
+                          {"rows": self.insert_rows, "rows_per_second": round(insert_rate)})
+
+            target = self.cameras * self.fps
+            paced = self.bench_sink(zone)
+            status = paced["status"]
+            written = status["stats"]["written"]
+            self.log_test(f"sink at {self.cameras} cameras x {self.fps} fps",
+                          "PASSED" if written == paced["rows"] and status["stats"]["dropped"] == 0 else "FAILED",
+                          f"{written}/{paced['rows']} rows written, flush p95 {status['flush_ms']['p95']}ms, "
+                          f"event-to-commit p95 {status['lag_ms']['p95']}ms",
+                          {
+                              "target_rows_per_second": target,
+                              "rows": paced["rows"],
+                              "written": written,
+                              "flushes": status["stats"]["flushes"],
+                              "max_buffered": status["stats"]["max_buffered"],
+                              "flush_ms": status["flush_ms"],
+                              "lag_ms": status["lag_ms"]
+                          })
+
+            burst_rate = self.bench_sink_burst(zone)
+            self.log_test("sink burst", "PASSED" if burst_rate > insert_rate else "FAILED",
+                          f"{burst_rate:.0f} rows/s ({burst_rate / insert_rate:.1f}x row inserts)",
+                          {"rows_per_second": round(burst_rate),
+                           "speedup": round(burst_rate / insert_rate, 1)})
+        finally:
+            cursor.execute("DELETE FROM counting_results WHERE frame_data->>'benchmark' = %s", (self.run_id,))
+            cursor.execute("SELECT rebuild_analytics_rollups(%s, %s)", (started, datetime.now()))
+            conn.commit()
+            conn.close()
+        self.save_results()
+
+    def save_results(self):
+        results_file = os.path.join(PROJECT_ROOT, "sharedResource/automationTest/backend/results/results_sink_benchmark.json")
+        with open(results_file, "w") as f:
+            json.dump({
+                "test_suite": "Counting Results Write Path Benchmark",
+                "timestamp": datetime.now().isoformat(),
+                "results": self.test_results
+            }, f, indent=2)
+        print(f"\n📊 Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    benchmark = ResultsSinkBenchmark()
+    benchmark.run_all()
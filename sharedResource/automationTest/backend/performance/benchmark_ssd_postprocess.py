@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+SSD Post-processing Micro-benchmark - AI Camera Counting System
+Compares the per-detection Python loop people_counter.py used to run over the
+MobileNet-SSD output with the vectorized utils.postprocess.personBoxes:
+- loop: np.arange over detections, CLASSES[idx] string compare, one box scaled at a time
+- vectorized: confidence/person masks and box scaling over the whole tensor
+
+Both run on the same random (1, 1, 100, 7) detection tensors and must return
+identical boxes.
+
+Usage (from project root):
+    python3 sharedResource/automationTest/backend/performance/benchmark_ssd_postprocess.py
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "beCamera", "refrenCode", "People-Counting-in-Real-Time-master"))
+
+from utils.postprocess import personBoxes  # noqa: E402
+
+CLASSES = ["background", "aeroplane", "bicycle", "bird", "boat",
+           "bottle", "bus", "car", "cat", "chair", "cow", "diningtable",
+           "dog", "horse", "motorbike", "person", "pottedplant", "sheep",
+           "sofa", "train", "tvmonitor"]
+
+
+class SSDPostprocessBenchmark:
+    def __init__(self, detection_counts: List[int] = None, iterations: int = 2000,
+                 width: int = 500, height: int = 375, confidence: float = 0.4):
+        self.detection_counts = detection_counts or [100]
+        self.iterations = iterations
+        self.width = width
+        self.height = height
+        self.confidence = confidence
+        self.test_results = []
+
+    def log_test(self, test_name: str, status: str, details: str = "", metrics: Dict = None):
+        """Log benchmark result with metrics"""
+        result = {
+            "test_name": test_name,
+            "status": status,
+            "details": details,
+            "metrics": metrics or {},
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        print(f"[{status.upper()}] {test_name}: {details}")
+
+    def create_detections(self, count: int, seed: int) -> np.ndarray:
+        """Random SSD DetectionOutput tensor with a mix of classes and confidences"""
+        rng = np.random.default_rng(seed)
+        rows = np.zeros((count, 7), dtype=np.float32)
+        rows[:, 1] = rng.integers(1, len(CLASSES), count)
+        rows[:, 2] = rng.random(count)
+        start = rng.uniform(0, 0.8, (count, 2))
+        rows[:, 3:5] = start
+        rows[:, 5:7] = start + rng.uniform(0.05, 0.2, (count, 2))
+        return rows.reshape(1, 1, count, 7)
+
+    def loop_postprocess(self, detections: np.ndarray) -> List[tuple]:
+        """The original per-detection loop from people_counter.py"""
+        W, H = self.width, self.height
+        boxes = []
+        for i in np.arange(0, detections.shape[2]):
+            confidence = detections[0, 0, i, 2]
+            if confidence > self.confidence:
+                idx = int(detections[0, 0, i, 1])
+                if CLASSES[idx] != "person":
+                    continue
+                box = detections[0, 0, i, 3:7] * np.array([W, H, W, H])
+                (startX, startY, endX, endY) = box.astype("int")
+                boxes.append((startX, startY, endX, endY))
+        return boxes
+
+    def vectorized_postprocess(self, detections: np.ndarray) -> np.ndarray:
+        return personBoxes(detections, self.width, self.height, self.confidence, CLASSES.index("person"))
+
+    def time_per_call(self, fn, tensors: List[np.ndarray]) -> float:
+        """Mean microseconds per call, cycling over the tensors"""
+        started = time.perf_counter()
+        for i in range(self.iterations):
+            fn(tensors[i % len(tensors)])
+        return (time.perf_counter() - started) / self.iterations * 1e6
+
+    def run_all(self):
+        print("⚡ SSD POST-PROCESSING MICRO-BENCHMARK")
+        print("=" * 50)
+        for count in self.detection_counts:
+            tensors = [self.create_detections(count, seed) for seed in range(32)]
+
+            # Same boxes from both paths
+            identical = all(
+                np.array_equal(np.array(self.loop_postprocess(t), dtype=np.int32).reshape(-1, 4),
+                               self.vectorized_postprocess(t))
+                for t in tensors
+            )
+            self.log_test(f"same boxes x{count}", "PASSED" if identical else "FAILED",
+                          "loop and vectorized outputs match" if identical else "outputs differ")
+
+            loop_us = self.time_per_call(self.loop_postprocess, tensors)
+            vector_us = self.time_per_call(self.vectorized_postprocess, tensors)
+            metrics = {
+                "detections": count,
+                "loop_us_per_frame": round(loop_us, 2),
+                "vectorized_us_per_frame": round(vector_us, 2),
+                "speedup": round(loop_us / max(vector_us, 1e-9), 1)
+            }
+            self.log_test(f"postprocess x{count}", "PASSED" if vector_us < loop_us else "FAILED",
+                          f"loop {loop_us:.1f}us vs vectorized {vector_us:.1f}us ({metrics['speedup']}x)",
+                          metrics)
+        self.save_results()
+
+    def save_results(self):
+        results_file = os.path.join(PROJECT_ROOT, "sharedResource/automationTest/backend/results/ssd_postprocess_benchmark.json")
+        with open(results_file, "w") as f:
+            json.dump({
+                "test_suite": "SSD Post-processing Micro-benchmark",
+                "timestamp": datetime.now().isoformat(),
+                "results": self.test_results
+            }, f, indent=2)
+        print(f"\n📊 Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    benchmark = SSDPostprocessBenchmark()
+    benchmark.run_all()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Worker Pool Event Loop Benchmark - AI Camera Counting System
+Measures API responsiveness (event loop latency p99) while the worker pool
+decodes and analyzes an increasing number of camera streams.
+
+Compares the inline mode (frame decode/analysis inside a coroutine, the old
+behaviour) against the threaded CameraWorkerPool.
+
+Usage (from project root):
+    python3 sharedResource/automationTest/backend/performance/benchmark_worker_pool_loop.py
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "beCamera"))
+
+from worker_pool import CameraWorkerPool  # noqa: E402
+
+
+class WorkerPoolLoopBenchmark:
+    def __init__(self, camera_counts: List[int] = None, duration: float = 5.0):
+        self.camera_counts = camera_counts or [1, 2, 4, 8]
+        self.duration = duration
+        self.probe_interval = 0.01
+        self.test_results = []
+        self.video_path = None
+
+    def log_test(self, test_name: str, status: str, details: str = "", metrics: Dict = None):
+        """Log benchmark result with metrics"""
+        result = {
+            "test_name": test_name,
+            "status": status,
+            "details": details,
+            "metrics": metrics or {},
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        print(f"[{status.upper()}] {test_name}: {details}")
+
+    def create_sample_video(self, frames: int = 300, width: int = 1280, height: int = 720) -> str:
+        """Write a synthetic MJPG clip used as the camera stream"""
+        fd, path = tempfile.mkstemp(suffix=".avi")
+        os.close(fd)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (width, height))
+        rng = np.random.default_rng(0)
+        for i in range(frames):
+            frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+            cv2.putText(frame, str(i), (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 5)
+            writer.write(frame)
+        writer.release()
+        return path
+
+    async def probe_latency(self) -> List[float]:
+        """Simulate API requests: each probe measures how late the loop runs it"""
+        latencies = []
+        deadline = time.perf_counter() + self.duration
+        while time.perf_counter() < deadline:
+            expected = time.perf_counter() + self.probe_interval
+            await asyncio.sleep(self.probe_interval)
+            latencies.append((time.perf_counter() - expected) * 1000)
+        return latencies
+
+    async def run_inline(self, camera_count: int) -> List[float]:
+        """Old behaviour: blocking read/analysis directly inside coroutines"""
+        pool = CameraWorkerPool(max_workers=camera_count)
+        stop = asyncio.Event()
+
+        async def inline_stream(camera_id: int):
+            cap = cv2.VideoCapture(self.video_path)
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                pool._process_frame(frame, camera_id)
+                await asyncio.sleep(0.1)
+            cap.release()
+
+        streams = [asyncio.create_task(inline_stream(i + 1)) for i in range(camera_count)]
+        latencies = await self.probe_latency()
+        stop.set()
+        await asyncio.gather(*streams)
+        return latencies
+
+    async def run_threaded(self, camera_count: int) -> List[float]:
+        """New behaviour: CameraWorkerPool runs capture/analysis on worker threads"""
+        pool = CameraWorkerPool(max_workers=camera_count)
+        await pool.start()
+        for i in range(camera_count):
+            pool.add_camera_task(i + 1, self.video_path)
+        latencies = await self.probe_latency()
+        await pool.stop()
+        return latencies
+
+    def summarize(self, latencies: List[float]) -> Dict:
+        ordered = sorted(latencies)
+        return {
+            "samples": len(ordered),
+            "p50_ms": round(statistics.median(ordered), 3),
+            "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1], 3),
+            "max_ms": round(ordered[-1], 3)
+        }
+
+    def run_all(self):
+        print("⚡ WORKER POOL EVENT LOOP BENCHMARK")
+        print("=" * 50)
+        self.video_path = self.create_sample_video()
+        try:
+            threaded_p99 = []
+            for camera_count in self.camera_counts:
+                for mode, runner in (("inline", self.run_inline), ("threaded", self.run_threaded)):
+                    metrics = self.summarize(asyncio.run(runner(camera_count)))
+                    metrics.update({"mode": mode, "cameras": camera_count})
+                    if mode == "threaded":
+                        threaded_p99.append(metrics["p99_ms"])
+                    self.log_test(f"{mode} x{camera_count}", "INFO",
+                                  f"p50={metrics['p50_ms']}ms p99={metrics['p99_ms']}ms", metrics)
+
+            # p99 must stay flat: the largest fleet may not be much worse than one camera
+            flat = max(threaded_p99) <= max(threaded_p99[0] * 3, threaded_p99[0] + 5)
+            self.log_test("Threaded p99 flat", "PASSED" if flat else "FAILED",
+                          f"p99 by camera count: {threaded_p99}")
+        finally:
+            os.remove(self.video_path)
+        self.save_results()
+
+    def save_results(self):
+        results_file = os.path.join(PROJECT_ROOT, "sharedResource/automationTest/backend/results/worker_pool_loop_benchmark.json")
+        with open(results_file, "w") as f:
+            json.dump({
+                "test_suite": "Worker Pool Event Loop Benchmark",
+                "timestamp": datetime.now().isoformat(),
+                "results": self.test_results
+            }, f, indent=2)
+        print(f"\n📊 Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    benchmark = WorkerPoolLoopBenchmark()
+    benchmark.run_all()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Async Endpoint Load Test - AI Camera Counting System
+Checks that a slow database request no longer holds up the other requests
+of the same beCamera worker:
+
+- baseline: latency of a fast endpoint (/test/cameras) on its own
+- mixed: a table lock taken on a separate connection makes /counts requests
+  block for hold_seconds; while they wait, the fast endpoint is called
+  again and must answer at about its baseline latency
+
+With blocking drivers in async handlers the fast requests queue behind the
+slow ones and take about hold_seconds. Needs a running beCamera service
+(CAMERA_API_URL) and direct access to its database (DB_* environment).
+
+Usage (from project root):
+    python3 sharedResource/automationTest/backend/performance/loadtest_async_endpoints.py
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import psycopg2
+import requests
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+
+class AsyncEndpointLoadTest:
+    def __init__(self, slow_requests: int = 4, fast_requests: int = 40, hold_seconds: float = 3.0):
+        self.base_url_camera = os.getenv("CAMERA_API_URL", "http://localhost:3002/api/v1")
+        self.slow_requests = slow_requests
+        self.fast_requests = fast_requests
+        self.hold_seconds = hold_seconds
+        self.session = requests.Session()
+        self.test_results = []
+
+    def log_test(self, test_name: str, status: str, details: str = "", metrics: Dict = None):
+        """Log test result with metrics"""
+        result = {
+            "test_name": test_name,
+            "status": status,
+            "details": details,
+            "metrics": metrics or {},
+            "timestamp": datetime.now().isoformat()
+        }
+        self.test_results.append(result)
+        print(f"[{status.upper()}] {test_name}: {details}")
+
+    def connect(self):
+        return psycopg2.connect(
+            host=os.getenv("DB_HOST", "localhost"),
+            port=os.getenv("DB_PORT", "5432"),
+            database=os.getenv("DB_NAME", "people_counting_db"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASSWORD", "dev_password")
+        )
+
+    def timed_get(self, path: str) -> Dict:
+        started = time.perf_counter()
+        response = requests.get(f"{self.base_url_camera}{path}", timeout=self.hold_seconds * 5)
+        return {"ms": (time.perf_counter() - started) * 1000, "status": response.status_code}
+
+    def fast_latencies(self, count: int, interval: float = 0.02) -> List[Dict]:
+        """Call the fast endpoint count times, one at a time"""
+        results = []
+        for _ in range(count):
+            results.append(self.timed_get("/test/cameras"))
+            time.sleep(interval)
+        return results
+
+    def summarize(self, results: List[Dict]) -> Dict:
+        latencies = sorted(r["ms"] for r in results)
+        return {
+            "requests": len(results),
+            "errors": len([r for r in results if r["status"] != 200]),
+            "p50_ms": round(statistics.median(latencies), 1),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+            "max_ms": round(latencies[-1], 1)
+        }
+
+    def hold_lock(self, conn, locked: threading.Event):
+        """Block every reader of counting_results for hold_seconds"""
+        cursor = conn.cursor()
+        cursor.execute("LOCK TABLE counting_results IN ACCESS EXCLUSIVE MODE")
+        locked.set()
+        time.sleep(self.hold_seconds)
+        conn.rollback()
+
+    def run_all(self):
+        print("⚡ ASYNC ENDPOINT LOAD TEST")
+        print("=" * 50)
+        try:
+            self.timed_get("/test/cameras")
+        except requests.RequestException as e:
+            self.log_test("camera service", "SKIPPED", f"cannot reach {self.base_url_camera}: {e}")
+            self.save_results()
+            return
+        try:
+            conn = self.connect()
+        except Exception as e:
+            self.log_test("database", "SKIPPED", f"cannot connect: {e}")
+            self.save_results()
+            return
+
+        baseline = self.summarize(self.fast_latencies(self.fast_requests))
+        self.log_test("fast requests alone", "PASSED" if baseline["errors"] == 0 else "FAILED",
+                      f"p50 {baseline['p50_ms']}ms, p95 {baseline['p95_ms']}ms", baseline)
+
+        locked = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.slow_requests + 1) as executor:
+            holder = executor.submit(self.hold_lock, conn, locked)
+            locked.wait()
+            started = time.perf_counter()
+            slow = [executor.submit(self.timed_get, "/counts?limit=10") for _ in range(self.slow_requests)]
+            # Give the slow requests time to reach the lock
+            time.sleep(0.2)
+            mixed = self.summarize(self.fast_latencies(self.fast_requests))
+            fast_done = (time.perf_counter() - started) * 1000
+            slow_results = [future.result() for future in slow]
+            holder.result()
+        conn.close()
+
+        slow_summary = self.summarize(slow_results)
+        # Fast requests pass if they stay far below the time the slow ones are held
+        limit_ms = max(baseline["p95_ms"] * 5, 100.0)
+        serialized = mixed["max_ms"] >= self.hold_seconds * 1000 * 0.5
+        self.log_test(f"fast requests next to {self.slow_requests} blocked requests",
+                      "PASSED" if mixed["p95_ms"] <= limit_ms and not serialized and mixed["errors"] == 0 else "FAILED",
+                      f"p50 {mixed['p50_ms']}ms, p95 {mixed['p95_ms']}ms, max {mixed['max_ms']}ms "
+                      f"(limit {limit_ms:.0f}ms); slow requests p50 {slow_summary['p50_ms']}ms",
+                      {
+                          "hold_seconds": self.hold_seconds,
+                          "fast": mixed,
+                          "slow": slow_summary,
+                          "fast_finished_after_ms": round(fast_done, 1),
+                          "p95_limit_ms": round(limit_ms, 1)
+                      })
+        self.save_results()
+
+    def save_results(self):
+        results_file = os.path.join(PROJECT_ROOT, "sharedResource/automationTest/backend/results/async_endpoint_load_test.json")
+        with open(results_file, "w") as f:
+            json.dump({
+                "test_suite": "Async Endpoint Load Test",
+                "timestamp": datetime.now().isoformat(),
+                "results": self.test_results
+            }, f, indent=2)
+        print(f"\n📊 Results saved to: {results_file}")
+
+
+if __name__ == "__main__":
+    load_test = AsyncEndpointLoadTest()
+    load_test.run_all()
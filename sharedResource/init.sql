@@ -31,7 +31,8 @@ DO $$ BEGIN CREATE TYPE model_type AS ENUM ('detection', 'classification', 'trac
 DO $$ BEGIN CREATE TYPE model_status AS ENUM ('active', 'inactive', 'training', 'error'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 DO $$ BEGIN CREATE TYPE zone_type AS ENUM ('entrance', 'exit', 'area', 'line'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 DO $$ BEGIN CREATE TYPE zone_direction AS ENUM ('in', 'out', 'bidirectional'); EXCEPTION WHEN duplicate_object THEN null; END $$;
-DO $$ BEGIN CREATE TYPE period_type AS ENUM ('hour', 'day', 'week', 'month', 'year'); EXCEPTION WHEN duplicate_object THEN null; END $$;
+DO $$ BEGIN CREATE TYPE period_type AS ENUM ('minute', 'hour', 'day', 'week', 'month', 'year'); EXCEPTION WHEN duplicate_object THEN null; END $$;
+ALTER TYPE period_type ADD VALUE IF NOT EXISTS 'minute' BEFORE 'hour';
 DO $$ BEGIN CREATE TYPE file_type AS ENUM ('media', 'document', 'log', 'backup', 'config'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 DO $$ BEGIN CREATE TYPE migration_status AS ENUM ('pending', 'running', 'completed', 'failed', 'rolled_back'); EXCEPTION WHEN duplicate_object THEN null; END $$;
 DO $$ BEGIN CREATE TYPE log_level AS ENUM ('debug', 'info', 'warning', 'error', 'critical'); EXCEPTION WHEN duplicate_object THEN null; END $$;
@@ -198,9 +199,13 @@ CREATE TABLE IF NOT EXISTS counting_results (
     total_count INTEGER DEFAULT 0,
     confidence DECIMAL(5,4),
     frame_data JSONB DEFAULT '{}',
+    -- Idempotency key set by the camera service; replayed rows are skipped
+    event_id UUID,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
--- Analytics
+-- Idempotency key for databases created before it existed
+ALTER TABLE counting_results ADD COLUMN IF NOT EXISTS event_id UUID;
+-- Analytics (rollups of counting_results, maintained by rollup_counting_results)
 CREATE TABLE IF NOT EXISTS analytics (
     id SERIAL PRIMARY KEY,
     camera_id INTEGER NOT NULL REFERENCES cameras(id) ON DELETE CASCADE,
@@ -210,10 +215,32 @@ CREATE TABLE IF NOT EXISTS analytics (
     period_end TIMESTAMP NOT NULL,
     people_in INTEGER DEFAULT 0,
     people_out INTEGER DEFAULT 0,
+    -- Peak total_count of the period
     total_count INTEGER DEFAULT 0,
     avg_confidence DECIMAL(5,4),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    -- Rows rolled up, and how many of them had a confidence (avg_confidence weight)
+    samples INTEGER DEFAULT 0,
+    confidence_samples INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+-- Event-time watermark per camera and zone: latest counted event minus the
+-- allowed lateness. It does not freeze anything: rollup periods stay mutable,
+-- and a row older than the watermark still updates its periods and is only
+-- counted in late_events. Readers wanting settled numbers should read periods
+-- ending before the watermark and watch late_events for corrections
+CREATE TABLE IF NOT EXISTS analytics_watermarks (
+    camera_id INTEGER NOT NULL REFERENCES cameras(id) ON DELETE CASCADE,
+    zone_id INTEGER NOT NULL REFERENCES zones(id) ON DELETE CASCADE,
+    watermark TIMESTAMP NOT NULL,
+    late_events BIGINT DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (camera_id, zone_id)
+);
+-- Rollup columns for databases created before the rollups
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS samples INTEGER DEFAULT 0;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS confidence_samples INTEGER DEFAULT 0;
+ALTER TABLE analytics ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
 -- Alerts
 CREATE TABLE IF NOT EXISTS alerts (
     id SERIAL PRIMARY KEY,
@@ -365,12 +392,14 @@ CREATE INDEX IF NOT EXISTS idx_counting_results_camera_id ON counting_results(ca
 CREATE INDEX IF NOT EXISTS idx_counting_results_zone_id ON counting_results(zone_id);
 CREATE INDEX IF NOT EXISTS idx_counting_results_timestamp ON counting_results(timestamp);
 CREATE INDEX IF NOT EXISTS idx_counting_results_camera_timestamp ON counting_results(camera_id, timestamp);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_counting_results_event_id ON counting_results(event_id, timestamp);
 -- Analytics indexes
 CREATE INDEX IF NOT EXISTS idx_analytics_camera_id ON analytics(camera_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_zone_id ON analytics(zone_id);
 CREATE INDEX IF NOT EXISTS idx_analytics_period_type ON analytics(period_type);
 CREATE INDEX IF NOT EXISTS idx_analytics_period_start ON analytics(period_start);
 CREATE INDEX IF NOT EXISTS idx_analytics_camera_period ON analytics(camera_id, period_type, period_start);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_period_bucket ON analytics(period_type, period_start, camera_id, zone_id);
 -- Alerts indexes
 CREATE INDEX IF NOT EXISTS idx_alerts_alert_type ON alerts(alert_type);
 CREATE INDEX IF NOT EXISTS idx_alerts_severity ON alerts(severity);
@@ -404,6 +433,108 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+-- Rollup periods maintained in analytics
+CREATE OR REPLACE FUNCTION analytics_periods()
+RETURNS TABLE (period period_type, length INTERVAL) AS $$
+    VALUES ('minute'::period_type, INTERVAL '1 minute'),
+           ('hour'::period_type, INTERVAL '1 hour'),
+           ('day'::period_type, INTERVAL '1 day'),
+           ('week'::period_type, INTERVAL '1 week');
+$$ language 'sql' IMMUTABLE;
+
+-- Incremental rollups: adds the rows of each INSERT into counting_results to
+-- their minute/hour/day/week periods per camera and zone, once per statement
+-- (a COPY batch of the results sink costs one run). Only rows actually
+-- inserted are seen, so ON CONFLICT DO NOTHING replays are not counted twice.
+-- TG_ARGV[0] is the allowed lateness behind which the watermark trails.
+CREATE OR REPLACE FUNCTION rollup_counting_results()
+RETURNS TRIGGER AS $$
+DECLARE
+    lateness INTERVAL := COALESCE(TG_ARGV[0], '5 minutes')::INTERVAL;
+BEGIN
+    -- Late rows are counted against the watermarks before they advance
+    INSERT INTO analytics_watermarks AS w (camera_id, zone_id, watermark, late_events)
+    SELECT n.camera_id, n.zone_id, MAX(n.timestamp) - lateness,
+           COUNT(*) FILTER (WHERE n.timestamp < prev.watermark)
+    FROM inserted_rows n
+    LEFT JOIN analytics_watermarks prev ON prev.camera_id = n.camera_id AND prev.zone_id = n.zone_id
+    GROUP BY n.camera_id, n.zone_id
+    ORDER BY n.camera_id, n.zone_id
+    ON CONFLICT (camera_id, zone_id) DO UPDATE SET
+        watermark = GREATEST(w.watermark, EXCLUDED.watermark),
+        late_events = w.late_events + EXCLUDED.late_events,
+        updated_at = CURRENT_TIMESTAMP;
+
+    INSERT INTO analytics AS a (camera_id, zone_id, period_type, period_start, period_end,
+                                people_in, people_out, total_count, avg_confidence,
+                                samples, confidence_samples)
+    SELECT n.camera_id, n.zone_id, p.period, date_trunc(p.period::TEXT, n.timestamp),
+           date_trunc(p.period::TEXT, n.timestamp) + p.length,
+           SUM(n.count_in), SUM(n.count_out), MAX(n.total_count), AVG(n.confidence),
+           COUNT(*), COUNT(n.confidence)
+    FROM inserted_rows n CROSS JOIN analytics_periods() p
+    GROUP BY 1, 2, 3, 4, 5
+    -- Lock buckets in a fixed order so concurrent writers cannot deadlock
+    ORDER BY 3, 4, 1, 2
+    ON CONFLICT (period_type, period_start, camera_id, zone_id) DO UPDATE SET
+        people_in = a.people_in + EXCLUDED.people_in,
+        people_out = a.people_out + EXCLUDED.people_out,
+        total_count = GREATEST(a.total_count, EXCLUDED.total_count),
+        avg_confidence = COALESCE((COALESCE(a.avg_confidence, 0) * a.confidence_samples
+                                   + COALESCE(EXCLUDED.avg_confidence, 0) * EXCLUDED.confidence_samples)
+                                  / NULLIF(a.confidence_samples + EXCLUDED.confidence_samples, 0),
+                                  a.avg_confidence),
+        samples = a.samples + EXCLUDED.samples,
+        confidence_samples = a.confidence_samples + EXCLUDED.confidence_samples;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Recompute every rollup period overlapping [p_from, p_to) from
+-- counting_results: backfills rows written before the rollup trigger existed,
+-- or repairs a range. Run it over periods that are no longer being written.
+CREATE OR REPLACE FUNCTION rebuild_analytics_rollups(p_from TIMESTAMP, p_to TIMESTAMP,
+                                                     lateness INTERVAL DEFAULT '5 minutes')
+RETURNS INTEGER AS $$
+DECLARE
+    p RECORD;
+    rebuilt INTEGER := 0;
+    n INTEGER;
+BEGIN
+    FOR p IN SELECT * FROM analytics_periods() LOOP
+        DELETE FROM analytics
+        WHERE period_type = p.period
+          AND period_start >= date_trunc(p.period::TEXT, p_from)
+          AND period_start < p_to;
+
+        INSERT INTO analytics (camera_id, zone_id, period_type, period_start, period_end,
+                               people_in, people_out, total_count, avg_confidence,
+                               samples, confidence_samples)
+        SELECT camera_id, zone_id, p.period, date_trunc(p.period::TEXT, timestamp),
+               date_trunc(p.period::TEXT, timestamp) + p.length,
+               SUM(count_in), SUM(count_out), MAX(total_count), AVG(confidence),
+               COUNT(*), COUNT(confidence)
+        FROM counting_results
+        WHERE timestamp >= date_trunc(p.period::TEXT, p_from)
+          AND timestamp < p_to + p.length
+          AND date_trunc(p.period::TEXT, timestamp) < p_to
+        GROUP BY 1, 2, 3, 4, 5;
+        GET DIAGNOSTICS n = ROW_COUNT;
+        rebuilt := rebuilt + n;
+    END LOOP;
+
+    INSERT INTO analytics_watermarks AS w (camera_id, zone_id, watermark)
+    SELECT camera_id, zone_id, MAX(timestamp) - lateness
+    FROM counting_results
+    WHERE timestamp >= p_from AND timestamp < p_to
+    GROUP BY camera_id, zone_id
+    ON CONFLICT (camera_id, zone_id) DO UPDATE SET
+        watermark = GREATEST(w.watermark, EXCLUDED.watermark),
+        updated_at = CURRENT_TIMESTAMP;
+    RETURN rebuilt;
+END;
+$$ language 'plpgsql';
+
 -- Create audit log function
 CREATE OR REPLACE FUNCTION create_audit_log()
 RETURNS TRIGGER AS $$
@@ -474,6 +605,14 @@ CREATE TRIGGER update_alerts_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Roll every counting_results insert up into analytics (allowed lateness 5 minutes)
+DROP TRIGGER IF EXISTS rollup_counting_results ON counting_results;
+CREATE TRIGGER rollup_counting_results
+    AFTER INSERT ON counting_results
+    REFERENCING NEW TABLE AS inserted_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_counting_results('5 minutes');
+
 -- Create audit triggers
 DROP TRIGGER IF EXISTS audit_users ON users;
 CREATE TRIGGER audit_users
@@ -589,5 +728,5 @@ GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO postgres;
 -- COMPLETION LOG
 -- ========================================
 SELECT 'AI Camera Counting System - Unified Database Schema initialization completed successfully!' as status;
-SELECT 'Tables created: users, registration_codes, refresh_tokens, user_sessions, audit_log, ai_models, cameras, zones, camera_events, model_logs, counting_results, analytics, alerts, audit_logs, files, system_logs, migrations, migration_log, deployment_migrations, deployment_execution_logs' as tables;
+SELECT 'Tables created: users, registration_codes, refresh_tokens, user_sessions, audit_log, ai_models, cameras, zones, camera_events, model_logs, counting_results, analytics, analytics_watermarks, alerts, audit_logs, files, system_logs, migrations, migration_log, deployment_migrations, deployment_execution_logs' as tables;
 SELECT 'Sample data inserted: admin user, test users, registration codes, ai models, cameras, zones, count data' as data; 
\ No newline at end of file